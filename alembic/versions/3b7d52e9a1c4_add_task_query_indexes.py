@@ -0,0 +1,34 @@
+"""Add task query indexes
+
+Revision ID: 3b7d52e9a1c4
+Revises: 94c0e21f421a
+Create Date: 2026-10-18 10:02:41.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d52e9a1c4'
+down_revision: Union[str, None] = '94c0e21f421a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tasks_user_id_id', 'tasks', ['user_id', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_tasks_status_id', 'tasks', ['status', 'id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_status_id', table_name='tasks',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_tasks_user_id_id', table_name='tasks',
+                      postgresql_concurrently=True)
@@ -0,0 +1,104 @@
+"""Send task events from triggers
+
+Revision ID: a4c7e9f2b5d8
+Revises: f3b8d1e6a27c
+Create Date: 2026-10-18 19:26:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e9f2b5d8'
+down_revision: Union[str, None] = 'f3b8d1e6a27c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION notify_task_events() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        changes jsonb;
+        message record;
+    BEGIN
+        IF current_setting('task_events.imported', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'INSERT' THEN
+            SELECT jsonb_agg(jsonb_build_object(
+                'user_id', user_id,
+                'event', jsonb_build_object('type', 'created', 'id', id,
+                                            'version', version)
+            ) ORDER BY id) INTO changes FROM new_rows;
+        ELSIF TG_OP = 'UPDATE' THEN
+            SELECT jsonb_agg(jsonb_build_object(
+                'user_id', n.user_id,
+                'event', jsonb_build_object(
+                    'type', CASE WHEN n.status = 'COMPLETED'
+                                 AND o.status <> 'COMPLETED'
+                            THEN 'completed' ELSE 'updated' END,
+                    'id', n.id, 'version', n.version
+                )
+            ) ORDER BY n.id) INTO changes
+            FROM new_rows AS n JOIN old_rows AS o ON o.id = n.id;
+        ELSE
+            -- Nobody listens for the tasks of a deleted user
+            SELECT jsonb_agg(jsonb_build_object(
+                'user_id', user_id,
+                'event', jsonb_build_object('type', 'deleted', 'id', id)
+            ) ORDER BY id) INTO changes FROM old_rows
+            WHERE EXISTS (SELECT 1 FROM users
+                          WHERE users.id = old_rows.user_id);
+        END IF;
+        FOR message IN
+            SELECT jsonb_build_object(
+                'user_id', user_id,
+                'events', jsonb_agg(change -> 'event' ORDER BY n)
+            )::text AS payload
+            FROM (
+                SELECT change, (change ->> 'user_id')::int AS user_id,
+                       row_number() OVER (
+                           PARTITION BY change ->> 'user_id' ORDER BY n
+                       ) - 1 AS position, n
+                FROM jsonb_array_elements(coalesce(changes, '[]'))
+                     WITH ORDINALITY AS e(change, n)
+            ) AS d
+            GROUP BY user_id, position / 100
+        LOOP
+            PERFORM pg_notify('task_events', message.payload);
+        END LOOP;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER task_events_insert AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+    """,
+    """
+    CREATE TRIGGER task_events_update AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+    """,
+    """
+    CREATE TRIGGER task_events_delete AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+    """,
+]
+
+
+def upgrade() -> None:
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER task_events_delete ON tasks')
+    op.execute('DROP TRIGGER task_events_update ON tasks')
+    op.execute('DROP TRIGGER task_events_insert ON tasks')
+    op.execute('DROP FUNCTION notify_task_events()')
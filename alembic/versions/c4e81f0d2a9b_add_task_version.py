@@ -0,0 +1,27 @@
+"""Add task version
+
+Revision ID: c4e81f0d2a9b
+Revises: 3b7d52e9a1c4
+Create Date: 2026-10-18 11:37:05.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81f0d2a9b'
+down_revision: Union[str, None] = '3b7d52e9a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('version', sa.Integer(),
+                                     server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('tasks', 'version')
@@ -0,0 +1,82 @@
+"""Add task search vector
+
+Revision ID: d7f3a9c2b614
+Revises: c4e81f0d2a9b
+Create Date: 2026-10-18 14:12:53.381094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a9c2b614'
+down_revision: Union[str, None] = 'c4e81f0d2a9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows indexed per statement while backfilling existing tasks
+BACKFILL_BATCH_SIZE = 10000
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({0}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({0}description, '')), 'B')"
+)
+
+TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION update_task_search_vector()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR.format('NEW.')};
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER task_search_vector
+    BEFORE INSERT OR UPDATE OF title, description ON tasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_search_vector()
+    """,
+]
+
+
+def upgrade() -> None:
+    # A nullable column without default is added without rewriting the
+    # table, unlike a stored generated column, which would hold an ACCESS
+    # EXCLUSIVE lock on tasks while every row is rewritten.
+    op.add_column('tasks', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                     nullable=True))
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        # Index existing tasks in short transactions, so task writes are
+        # only blocked on the rows of one batch. Until a batch is done its
+        # tasks are not found by search.
+        conn = op.get_bind()
+        max_id = conn.execute(sa.text('SELECT max(id) FROM tasks')).scalar()
+        for start in range(0, max_id or 0, BACKFILL_BATCH_SIZE):
+            conn.execute(
+                sa.text(f'UPDATE tasks SET search_vector = '
+                        f'{SEARCH_VECTOR.format("")} '
+                        f'WHERE id > :start AND id <= :end '
+                        f'AND search_vector IS NULL'),
+                {'start': start, 'end': start + BACKFILL_BATCH_SIZE}
+            )
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'],
+                        unique=False, postgresql_using='gin',
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_search_vector', table_name='tasks',
+                      postgresql_concurrently=True)
+    op.execute('DROP TRIGGER task_search_vector ON tasks')
+    op.execute('DROP FUNCTION update_task_search_vector()')
+    op.drop_column('tasks', 'search_vector')
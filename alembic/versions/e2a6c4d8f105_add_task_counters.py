@@ -0,0 +1,103 @@
+"""Add task counters
+
+Revision ID: e2a6c4d8f105
+Revises: d7f3a9c2b614
+Create Date: 2026-10-18 15:04:27.771942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6c4d8f105'
+down_revision: Union[str, None] = 'd7f3a9c2b614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION update_task_counters() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, count(*) FROM new_rows
+            GROUP BY user_id, status
+            ON CONFLICT (user_id, status) DO UPDATE
+            SET count = task_counters.count + EXCLUDED.count;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE task_counters SET count = task_counters.count - d.n
+            FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+                  GROUP BY user_id, status) AS d
+            WHERE task_counters.user_id = d.user_id
+            AND task_counters.status = d.status;
+        ELSE
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, sum(n) FROM (
+                SELECT user_id, status, -1 AS n FROM old_rows
+                UNION ALL
+                SELECT user_id, status, 1 AS n FROM new_rows
+            ) AS d
+            GROUP BY user_id, status
+            HAVING sum(n) <> 0
+            ON CONFLICT (user_id, status) DO UPDATE
+            SET count = task_counters.count + EXCLUDED.count;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER task_counters_insert AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+    """,
+    """
+    CREATE TRIGGER task_counters_update AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+    """,
+    """
+    CREATE TRIGGER task_counters_delete AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+    """,
+]
+
+
+def upgrade() -> None:
+    op.create_table('task_counters',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('status', postgresql.ENUM(
+                            'NEW', 'IN_PROGRESS', 'COMPLETED',
+                            name='taskstatus', create_type=False),
+                        nullable=False
+                    ),
+                    sa.Column('count', sa.Integer(), server_default='0',
+                              nullable=False),
+                    sa.ForeignKeyConstraint(
+                        ['user_id'], ['users.id'], ondelete='CASCADE'
+                    ),
+                    sa.PrimaryKeyConstraint('user_id', 'status'))
+    # Creating the triggers locks out writes to tasks until this
+    # transaction commits, so the backfill below cannot miss or double
+    # count a concurrent write.
+    for statement in TRIGGERS:
+        op.execute(statement)
+    op.execute(
+        'INSERT INTO task_counters (user_id, status, count) '
+        'SELECT user_id, status, count(*) FROM tasks '
+        'GROUP BY user_id, status'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER task_counters_delete ON tasks')
+    op.execute('DROP TRIGGER task_counters_update ON tasks')
+    op.execute('DROP TRIGGER task_counters_insert ON tasks')
+    op.execute('DROP FUNCTION update_task_counters()')
+    op.drop_table('task_counters')
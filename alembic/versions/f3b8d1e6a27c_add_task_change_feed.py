@@ -0,0 +1,119 @@
+"""Add task change feed
+
+Revision ID: f3b8d1e6a27c
+Revises: e2a6c4d8f105
+Create Date: 2026-10-18 16:42:09.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1e6a27c'
+down_revision: Union[str, None] = 'e2a6c4d8f105'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows stamped per statement while backfilling existing tasks
+BACKFILL_BATCH_SIZE = 10000
+
+# Mirrors app.models: change_seq is the transaction ID shifted left by 24
+# bits plus a counter of the changes made by that transaction.
+
+TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION track_task_changes() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        changes bigint;
+        seq bigint;
+    BEGIN
+        IF TG_OP = 'DELETE' AND NOT EXISTS (
+            SELECT 1 FROM users WHERE id = OLD.user_id
+        ) THEN
+            -- Cascaded from deleting the user
+            RETURN OLD;
+        END IF;
+        changes := coalesce(
+            nullif(current_setting('task_changes.count', true), ''),
+            '0'
+        )::bigint + 1;
+        IF changes >= 1 << 24 THEN
+            RAISE EXCEPTION 'Too many task changes in one transaction';
+        END IF;
+        PERFORM set_config('task_changes.count', changes::text, true);
+        seq := pg_current_xact_id()::text::bigint << 24 | changes;
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO task_tombstones (task_id, user_id, change_seq)
+            VALUES (OLD.id, OLD.user_id, seq)
+            ON CONFLICT (task_id) DO UPDATE
+            SET user_id = EXCLUDED.user_id,
+                change_seq = EXCLUDED.change_seq;
+            RETURN OLD;
+        END IF;
+        NEW.change_seq := seq;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER task_changes_write BEFORE INSERT OR UPDATE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION track_task_changes()
+    """,
+    """
+    CREATE TRIGGER task_changes_delete AFTER DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION track_task_changes()
+    """,
+]
+
+
+def upgrade() -> None:
+    # Adding a column with a constant default does not rewrite the table
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(),
+                                     server_default='0', nullable=False))
+    op.create_table('task_tombstones',
+                    sa.Column('task_id', sa.Integer(), nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('change_seq', sa.BigInteger(),
+                              nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'],
+                                            ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('task_id'))
+    op.create_index('ix_task_tombstones_user_id_change_seq',
+                    'task_tombstones', ['user_id', 'change_seq'],
+                    unique=False)
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        # Stamp existing tasks in short transactions through the trigger,
+        # so task writes are only blocked on the rows of one batch.
+        conn = op.get_bind()
+        max_id = conn.execute(sa.text('SELECT max(id) FROM tasks')).scalar()
+        for start in range(0, max_id or 0, BACKFILL_BATCH_SIZE):
+            conn.execute(
+                sa.text('UPDATE tasks SET change_seq = 0 '
+                        'WHERE id > :start AND id <= :end '
+                        'AND change_seq = 0'),
+                {'start': start, 'end': start + BACKFILL_BATCH_SIZE}
+            )
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        op.create_index('ix_tasks_user_id_change_seq', 'tasks',
+                        ['user_id', 'change_seq'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_user_id_change_seq', table_name='tasks',
+                      postgresql_concurrently=True)
+    op.execute('DROP TRIGGER task_changes_delete ON tasks')
+    op.execute('DROP TRIGGER task_changes_write ON tasks')
+    op.execute('DROP FUNCTION track_task_changes()')
+    op.drop_index('ix_task_tombstones_user_id_change_seq',
+                  table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_column('tasks', 'change_seq')
@@ -0,0 +1,102 @@
+"""Command line entry points.
+
+    python -m app.cli import-tasks --user-id 1 --format csv tasks.csv
+    python -m app.cli reconcile-stats --dry-run
+    python -m app.cli openapi --output openapi.json
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+
+from app.database import SessionLocal
+from app.enums import TransferFormat
+import app.services.importer as import_service
+import app.services.stats as stats_service
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(path: str):
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        while chunk := stream.read(READ_CHUNK_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def import_tasks(args: argparse.Namespace):
+    async with SessionLocal() as db:
+        report = await import_service.import_tasks(
+            db, read_chunks(args.path), args.format, args.user_id
+        )
+    print(report.model_dump_json(indent=2))
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'peak RSS: {peak_rss / 1024:.1f} MiB', file=sys.stderr)
+
+
+async def reconcile_stats(args: argparse.Namespace):
+    async with SessionLocal() as db:
+        drift = await stats_service.reconcile_task_counters(
+            db, apply=not args.dry_run
+        )
+    print(json.dumps([item.model_dump(mode='json') for item in drift],
+                     indent=2))
+    action = 'found' if args.dry_run else 'fixed'
+    print(f'{len(drift)} drifted counters {action}', file=sys.stderr)
+
+
+async def export_openapi(args: argparse.Namespace):
+    # Imported here, the other commands do not need the routes
+    from app.main import app
+
+    schema = json.dumps(app.openapi(), separators=(',', ':'))
+    if args.output == '-':
+        print(schema)
+    else:
+        with open(args.output, 'w') as fh:
+            fh.write(schema)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m app.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser(
+        'import-tasks', help='import tasks from an NDJSON or CSV file'
+    )
+    import_parser.add_argument('path', help="input file, '-' for stdin")
+    import_parser.add_argument('--user-id', type=int, required=True,
+                               help='owner of the imported tasks')
+    import_parser.add_argument('--format', type=TransferFormat,
+                               choices=list(TransferFormat),
+                               metavar='{ndjson,csv}',
+                               default=TransferFormat.NDJSON)
+    import_parser.set_defaults(handler=import_tasks)
+
+    reconcile_parser = commands.add_parser(
+        'reconcile-stats',
+        help='rebuild the task counters from the tasks table'
+    )
+    reconcile_parser.add_argument('--dry-run', action='store_true',
+                                  help='only report drifted counters')
+    reconcile_parser.set_defaults(handler=reconcile_stats)
+
+    openapi_parser = commands.add_parser(
+        'openapi',
+        help='write the OpenAPI schema, for OPENAPI_SCHEMA_PATH'
+    )
+    openapi_parser.add_argument('--output', default='-',
+                                help="output file, '-' for stdout")
+    openapi_parser.set_defaults(handler=export_openapi)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
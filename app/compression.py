@@ -0,0 +1,257 @@
+import zlib
+from functools import lru_cache
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_ENCODINGS,
+    COMPRESSION_LEVELS,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_ROUTE_LEVELS
+)
+from app.etags import encoded_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+# Events must reach the client as soon as they are sent.
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+# Chunks this large are compressed in a worker thread (the codecs release
+# the GIL) instead of blocking the event loop.
+THREAD_MIN_SIZE = 64 * 1024
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED,
+                                            16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+ENCODERS = {'gzip': GzipEncoder}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS['zstd'] = ZstdEncoder
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: str,
+                       encodings: tuple[str, ...]) -> str | None:
+    """
+    Pick the content coding of a response from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding header.
+        encodings (tuple[str, ...]): Codings the server can produce, most
+        preferred first; used to break ties between equal q-values.
+
+    Returns:
+        str | None: The coding to use, or None to send the body as is.
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(','):
+        coding, *params = item.split(';')
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _is_compressible(headers: Headers) -> bool:
+    content_type = headers.get('content-type', '')
+    return (
+        content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+        and 'content-encoding' not in headers
+        and 'no-transform' not in headers.get('cache-control', '')
+    )
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with the best content coding
+    the client accepts (gzip, and br / zstd when installed).
+
+    Bodies are compressed chunk by chunk as the application sends them, so
+    streaming responses are never held in memory. Only the first
+    `min_size` bytes are buffered to decide whether a response is large
+    enough to be worth compressing.
+
+    Levels are looked up per `<METHOD> <route template>` in `route_levels`,
+    falling back to `levels`; a route mapped to None is never compressed.
+    An ETag of a compressed body gets the coding appended (`"1-3-gzip"`),
+    so caches never take it for the uncompressed bytes; app.etags accepts
+    it back in If-None-Match and If-Match.
+
+    Args:
+        min_size (int): Smallest body, in bytes, that is compressed.
+        encodings (list[str]): Codings to offer, most preferred first.
+        levels (dict[str, int]): Default level of every coding.
+        route_levels (dict[str, dict | None]): Per-route overrides.
+        enabled (bool): False passes every response through unchanged.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE,
+                 encodings: list[str] = COMPRESSION_ENCODINGS,
+                 levels: dict[str, int] = COMPRESSION_LEVELS,
+                 route_levels: dict = COMPRESSION_ROUTE_LEVELS,
+                 enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.min_size = min_size
+        self.encodings = tuple(
+            encoding.strip() for encoding in encodings
+            if encoding.strip() in ENCODERS
+        )
+        self.levels = levels
+        self.route_levels = route_levels
+
+    def _level(self, method: str, route, encoding: str) -> int | None:
+        path = getattr(route, 'path', None)
+        overrides = self.route_levels.get(f'{method} {path}', {})
+        if overrides is None:
+            return None
+        return overrides.get(encoding, self.levels[encoding])
+
+    async def __call__(self, scope, receive, send):
+        if (not self.enabled or scope['type'] != 'http'
+                or scope['method'] == 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get('accept-encoding', ''), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        buffered = []
+        buffered_size = 0
+        encoder = None
+        compressing = False
+        passthrough = False
+
+        async def compress(data: bytes, finish: bool) -> bytes:
+            def run():
+                chunk = encoder.compress(data)
+                return chunk + encoder.finish() if finish else chunk
+
+            if len(data) < THREAD_MIN_SIZE:
+                return run()
+            return await run_in_threadpool(run)
+
+        async def send_compressed(message):
+            nonlocal start, buffered_size, encoder, compressing, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                level = self._level(scope['method'], scope.get('route'),
+                                    encoding)
+                if level is None or not _is_compressible(headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Larger bodies of the same URL are compressed
+                headers.add_vary_header('Accept-Encoding')
+                content_length = headers.get('content-length')
+                if (content_length is not None
+                        and int(content_length) < self.min_size):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                encoder = ENCODERS[encoding](level)
+                return
+
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if not compressing:
+                # Hold the first bytes back until the body is known to
+                # reach min_size
+                buffered.append(body)
+                buffered_size += len(body)
+                if more_body and buffered_size < self.min_size:
+                    return
+                body = b''.join(buffered)
+                buffered.clear()
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message | {'body': body})
+                    return
+                headers = MutableHeaders(scope=start)
+                headers['Content-Encoding'] = encoding
+                del headers['Content-Length']
+                etag = headers.get('etag')
+                if etag is not None:
+                    headers['ETag'] = encoded_etag(etag, encoding)
+                await send(start)
+                compressing = True
+
+            chunk = await compress(body, not more_body)
+            if chunk or not more_body:
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
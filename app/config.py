@@ -1,5 +1,7 @@
 from dotenv import load_dotenv
+import json
 import os
+import tempfile
 
 load_dotenv()
 
@@ -10,9 +12,164 @@ DB_USER = os.environ.get('DB_USER')
 DB_PASS = os.environ.get('DB_PASS')
 DB_NAME = os.environ.get('DB_NAME')
 
-DB_URL = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+DB_URL = os.environ.get('DB_URL') or (
+    f'postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+)
+
+""" DB pool config """
+# Applies to every gunicorn worker separately; SQLite uses its default pool.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+# Seconds after which a connection is replaced, -1 keeps it forever.
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', -1))
+DB_POOL_PRE_PING = (
+    os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'
+)
+DB_POOL_USE_LIFO = (
+    os.environ.get('DB_POOL_USE_LIFO', 'false').lower() == 'true'
+)
+
+""" Read replicas config """
+# Comma-separated SQLAlchemy URLs of read replicas of DB_URL.
+DB_REPLICA_URLS = [
+    url.strip()
+    for url in os.environ.get('DB_REPLICA_URLS', '').split(',')
+    if url.strip()
+]
+# Reads of a caller go to the primary for this long after it wrote.
+READ_YOUR_WRITES_SECONDS = float(
+    os.environ.get('READ_YOUR_WRITES_SECONDS', 5)
+)
+# Last write times shared by all workers of a host; keep it on tmpfs.
+READ_YOUR_WRITES_PATH = os.environ.get('READ_YOUR_WRITES_PATH') or (
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'web-task-manager-writes'
+    )
+)
+READ_YOUR_WRITES_SLOTS = int(os.environ.get('READ_YOUR_WRITES_SLOTS', 65536))
+# A failed replica is skipped for this long, then probed before reuse.
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 10))
+REPLICA_PROBE_TIMEOUT_SECONDS = float(
+    os.environ.get('REPLICA_PROBE_TIMEOUT_SECONDS', 1)
+)
+
+""" Debug config """
+# Send X-DB-Query-Count / X-DB-Time-Ms headers with every response.
+DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
+# Requests executing more statements than this are logged as likely N+1.
+QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 10))
+
+""" Internal endpoints config """
+# Required in the X-Internal-Token header of /internal/* requests; while
+# unset, those endpoints answer 404.
+INTERNAL_API_TOKEN = os.environ.get('INTERNAL_API_TOKEN')
+
+""" Startup config """
+# OpenAPI schema generated at build time with `python -m app.cli openapi`,
+# served instead of building it on the first /docs request.
+OPENAPI_SCHEMA_PATH = os.environ.get('OPENAPI_SCHEMA_PATH')
 
 """ JWT config """
 SECRET_KEY = os.environ.get('SECRET_KEY')
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+""" User cache config """
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+# Entries are not invalidated on writes, so this is also how long a worker
+# may keep serving a user that was changed or deleted.
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+# Embed the UserRead fields in the access token so authenticated requests
+# skip the user lookup entirely. Changes to a user are then only picked up
+# once their token expires.
+JWT_EMBED_USER = os.environ.get('JWT_EMBED_USER', 'false').lower() == 'true'
+
+""" Password hashing config """
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+HASHING_POOL_SIZE = int(os.environ.get('HASHING_POOL_SIZE', 2))
+HASHING_QUEUE_LIMIT = int(os.environ.get('HASHING_QUEUE_LIMIT', 64))
+HASHING_RETRY_AFTER_SECONDS = int(
+    os.environ.get('HASHING_RETRY_AFTER_SECONDS', 1)
+)
+
+""" Rate limiting config """
+RATE_LIMIT_ENABLED = (
+    os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+)
+# Bucket table shared by all workers of a host; keep it on tmpfs.
+RATE_LIMIT_PATH = os.environ.get('RATE_LIMIT_PATH') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    'web-task-manager-ratelimit'
+)
+RATE_LIMIT_SLOTS = int(os.environ.get('RATE_LIMIT_SLOTS', 65536))
+# Limits are `<requests>/<second|minute|hour>`, keyed by
+# `<METHOD> <route template>`; authenticated callers are limited per user,
+# anonymous ones per IP.
+RATE_LIMIT_DEFAULT = os.environ.get('RATE_LIMIT_DEFAULT', '600/minute')
+RATE_LIMITS = {
+    'POST /auth/login': '10/minute',
+    'POST /auth/register': '5/minute',
+    'GET /tasks/user/{user_id}': '120/minute',
+    'GET /tasks/export': '10/minute',
+    'POST /tasks/import': '10/minute',
+    **json.loads(os.environ.get('RATE_LIMITS', '{}'))
+}
+
+""" Total count config """
+TOTAL_COUNT_CACHE_TTL_SECONDS = float(
+    os.environ.get('TOTAL_COUNT_CACHE_TTL_SECONDS', 30)
+)
+
+""" Task events config """
+# `postgres` fans events out to every worker through LISTEN/NOTIFY,
+# `memory` only reaches subscribers of the same process; `auto` picks
+# `postgres` for a PostgreSQL DB_URL.
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'auto')
+# Events buffered per subscriber before it is told to resync.
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', 3000))
+
+""" Delta sync config """
+CHANGES_MAX_LIMIT = int(os.environ.get('CHANGES_MAX_LIMIT', 1000))
+
+""" Bulk endpoints config """
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 1000))
+
+""" Export/import config """
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+# Longer NDJSON lines or CSV records (in characters) are rejected.
+IMPORT_MAX_RECORD_LENGTH = int(
+    os.environ.get('IMPORT_MAX_RECORD_LENGTH', 1024 * 1024)
+)
+IMPORT_MAX_REPORTED_ERRORS = int(
+    os.environ.get('IMPORT_MAX_REPORTED_ERRORS', 100)
+)
+
+""" Compression config """
+COMPRESSION_ENABLED = (
+    os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+)
+# Smaller responses are sent as is: their headers dominate and compressing
+# them costs more CPU than it saves on the wire.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+# Preferred first when the client accepts several equally; `br` and `zstd`
+# are skipped unless the brotli / zstandard packages are installed.
+COMPRESSION_ENCODINGS = os.environ.get(
+    'COMPRESSION_ENCODINGS', 'zstd,br,gzip'
+).split(',')
+COMPRESSION_LEVELS = {
+    'gzip': 6,
+    'br': 5,
+    'zstd': 3,
+    **json.loads(os.environ.get('COMPRESSION_LEVELS', '{}'))
+}
+# `<METHOD> <route template>` to levels overriding COMPRESSION_LEVELS, or
+# null to never compress the route.
+COMPRESSION_ROUTE_LEVELS = {
+    'GET /tasks/export': {'gzip': 1, 'br': 1, 'zstd': 1},
+    **json.loads(os.environ.get('COMPRESSION_ROUTE_LEVELS', '{}'))
+}
@@ -1,15 +1,136 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.config import DB_URL
+from fastapi import Request
+from sqlalchemy import make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine
+)
+from app.config import (
+    DB_URL,
+    DB_POOL_SIZE,
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_USE_LIFO,
+    DB_REPLICA_URLS,
+    READ_YOUR_WRITES_SECONDS,
+    READ_YOUR_WRITES_PATH,
+    READ_YOUR_WRITES_SLOTS,
+    REPLICA_RETRY_SECONDS,
+    REPLICA_PROBE_TIMEOUT_SECONDS
+)
+from app.identity import get_client_identity
+from app.instrumentation import instrument_engine
+from app.pool import InstrumentedPool, PoolMetrics
+from app.replicas import RecentWrites, ReplicaSet
 
-engine = create_engine(DB_URL)
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_engine_options(url: str, metrics: PoolMetrics | None = None) -> dict:
+    """
+    Return the pool arguments for `create_async_engine`.
 
-def get_db():
+    SQLite keeps the pool SQLAlchemy picks for it, since a queue pool of
+    file or in-memory connections is neither needed nor supported there.
+    Other pools record checkout waits and timeouts in `metrics`.
+    """
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'poolclass': InstrumentedPool,
+        'metrics': metrics,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_POOL_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        'pool_use_lifo': DB_POOL_USE_LIFO,
+    }
+
+
+def create_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    """
+    Create an instrumented engine whose pool usage is counted in `metrics`.
+    """
+    engine = create_async_engine(url, **get_engine_options(url, metrics))
+    metrics.attach(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+pool_metrics = PoolMetrics()
+engine = create_engine(DB_URL, pool_metrics)
+
+SessionLocal = async_sessionmaker(
+    bind=engine, autoflush=False, expire_on_commit=False
+)
+
+
+# Each replica counts its own pool usage
+replica_pool_metrics = {}
+for url in DB_REPLICA_URLS:
+    metrics = PoolMetrics()
+    replica_pool_metrics[create_engine(url, metrics)] = metrics
+replicas = ReplicaSet(
+    list(replica_pool_metrics),
+    retry_seconds=REPLICA_RETRY_SECONDS,
+    probe_timeout=REPLICA_PROBE_TIMEOUT_SECONDS,
+    pool_metrics=replica_pool_metrics
+)
+recent_writes = RecentWrites(READ_YOUR_WRITES_PATH, READ_YOUR_WRITES_SLOTS)
+
+
+async def get_db(request: Request):
+    """
+    Session on the primary. With replicas configured, a request that may
+    write (any method but GET, HEAD and OPTIONS) starts the caller's
+    read-your-writes window once it is done.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+        if replicas and request.method not in SAFE_METHODS:
+            recent_writes.record(get_client_identity(request))
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only routes.
+
+    Reads go to the replicas round-robin, except for callers that wrote in
+    the last READ_YOUR_WRITES_SECONDS, so they see their own changes, and
+    when no replica is healthy. Without replicas this is the primary.
+    """
+    bind = None
+    if replicas and not recent_writes.is_recent(
+            get_client_identity(request), READ_YOUR_WRITES_SECONDS):
+        bind = await replicas.choose()
+    db = SessionLocal(bind=bind) if bind is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def dialect_insert(db, entity):
+    """
+    Build an INSERT for the session's dialect.
+
+    Unlike the generic `insert()`, the PostgreSQL and SQLite constructs
+    support `on_conflict_do_nothing()` and `on_conflict_do_update()`.
+
+    Args:
+        db (AsyncSession): Database session the statement will run on.
+        entity: Mapped class or table to insert into.
+
+    Returns:
+        Insert: Dialect-specific insert construct.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
@@ -5,3 +5,30 @@ class TaskStatus(PyEnum):
     NEW = 'New'
     IN_PROGRESS = 'In Progress'
     COMPLETED = 'Completed'
+
+
+class BulkItemResult(PyEnum):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    NOT_FOUND = 'not_found'
+
+
+class TransferFormat(PyEnum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+class CountMode(PyEnum):
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATED = 'estimated'
+
+
+class TaskEventType(PyEnum):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    COMPLETED = 'completed'
+    DELETED = 'deleted'
+    IMPORTED = 'imported'
+    RESYNC = 'resync'
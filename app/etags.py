@@ -0,0 +1,109 @@
+import hashlib
+import re
+from typing import Iterable
+
+from fastapi import Response, status
+
+# Versions are stored in a 32-bit integer column; larger values in a header
+# can never match and must not reach the database.
+MAX_VERSION = 2 ** 31 - 1
+MAX_VERSION_DIGITS = len(str(MAX_VERSION))
+# Content codings of CompressionMiddleware, which tags the ETag of an
+# encoded body with its coding
+CODINGS = ('gzip', 'br', 'zstd')
+
+
+def task_etag(task_id: int, version: int) -> str:
+    """
+    Build the strong ETag of a single task.
+    """
+    return f'"{task_id}-{version}"'
+
+
+def list_etag(rows: Iterable[tuple[int, int]]) -> str:
+    """
+    Build the strong ETag of a list of tasks from their IDs and versions.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for task_id, version in rows:
+        digest.update(f'{task_id}-{version},'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """
+    Build the ETag of a representation encoded with a content coding, e.g.
+    `"1-3-gzip"` for `"1-3"`, so it differs from the unencoded one.
+    """
+    return f'{etag[:-1]}-{coding}"'
+
+
+def decoded_etag(etag: str) -> str:
+    """
+    Strip the content coding added by `encoded_etag`, if any.
+    """
+    for coding in CODINGS:
+        suffix = f'-{coding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, whichever content
+    coding the client received it with.
+
+    Args:
+        header (str | None): Value of the If-None-Match header.
+        etag (str): Current ETag of the resource.
+
+    Returns:
+        bool: True if the client already holds the current representation.
+    """
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or any(
+        decoded_etag(candidate.removeprefix('W/')) == etag
+        for candidate in candidates
+    )
+
+
+def if_match_versions(header: str | None,
+                      task_id: int) -> list[int] | None:
+    """
+    Extract the task versions an If-Match header accepts.
+
+    If-Match uses strong comparison, so weak ETags never match, and neither
+    do ETags of other tasks. ETags of compressed responses match the version
+    they were sent for.
+
+    Args:
+        header (str | None): Value of the If-Match header.
+        task_id (int): The ID of the task being written.
+
+    Returns:
+        list[int] | None: Acceptable versions, possibly none, or None if
+        any version is (no header or `*`).
+    """
+    if not header:
+        return None
+    candidates = [value.strip() for value in header.split(',')]
+    if '*' in candidates:
+        return None
+    pattern = re.compile(rf'"{task_id}-([0-9]{{1,{MAX_VERSION_DIGITS}}})"')
+    versions = []
+    for candidate in candidates:
+        match = pattern.fullmatch(decoded_etag(candidate))
+        if match and int(match[1]) <= MAX_VERSION:
+            versions.append(int(match[1]))
+    return versions
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build a bodiless 304 response carrying the current ETag.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={'ETag': etag})
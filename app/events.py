@@ -0,0 +1,337 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+import orjson
+from sqlalchemy import event, func, make_url, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import (
+    DB_URL,
+    EVENTS_BACKEND,
+    EVENTS_QUEUE_SIZE,
+    SSE_HEARTBEAT_SECONDS,
+    SSE_RETRY_MS
+)
+from app.enums import TaskEventType
+
+CHANNEL = 'task_events'
+# Transaction setting telling the task_events triggers to stay quiet
+IMPORT_SETTING = 'task_events.imported'
+PENDING_EVENTS = 'pending_task_events'
+
+RESYNC = {'type': TaskEventType.RESYNC.value}
+CLOSE = object()
+
+
+def task_event(event_type: TaskEventType, task_id: int,
+               version: int | None = None) -> dict:
+    """
+    Build the event of a single task. Events only carry the ID and version,
+    clients fetch the task itself if they need it.
+    """
+    payload = {'type': event_type.value, 'id': task_id}
+    if version is not None:
+        payload['version'] = version
+    return payload
+
+
+class Subscription:
+    """
+    Bounded queue of events for one client, bound to the event loop that
+    consumes it.
+    """
+
+    __slots__ = ('user_id', 'queue', 'loop')
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+
+    def put(self, events: list) -> None:
+        try:
+            for item in events:
+                self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # The client fell behind: drop its backlog and tell it to
+            # refetch instead of blocking the publisher.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            if CLOSE in events:
+                self.queue.put_nowait(CLOSE)
+
+
+class InProcessBroker:
+    """
+    Fan task events out to the subscribers of the current process.
+
+    Events published in a session are held until it commits and dropped on
+    rollback, so clients never see writes that did not happen.
+
+    Args:
+        queue_size (int): Events buffered per subscriber.
+    """
+
+    def __init__(self, queue_size: int):
+        # Room for a resync and a close marker at least
+        self.queue_size = max(queue_size, 2)
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in tuple(self._subscribers.values()))
+
+    async def start(self) -> None:
+        """
+        Make sure events from other processes are received.
+        """
+
+    async def stop(self) -> None:
+        """
+        End every subscription, e.g. on shutdown.
+        """
+        self.broadcast([CLOSE])
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        """
+        Receive the events of a user while the context is open.
+        """
+        await self.start()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    async def publish(self, db: AsyncSession, user_id: int,
+                      events: list[dict]) -> None:
+        """
+        Queue events to be delivered once the session commits.
+        """
+        db.sync_session.info.setdefault(PENDING_EVENTS, []).append(
+            (user_id, events)
+        )
+
+    async def publish_import(self, db: AsyncSession, user_id: int,
+                             count: int) -> None:
+        """
+        Announce `count` tasks imported in the current transaction with a
+        single summary event instead of one event per task.
+        """
+        await self.publish(db, user_id, [
+            {'type': TaskEventType.IMPORTED.value, 'count': count}
+        ])
+
+    def deliver(self, user_id: int, events: list) -> None:
+        """
+        Hand events to the subscribers of a user, from any thread.
+        """
+        self._send(tuple(self._subscribers.get(user_id, ())), events)
+
+    def broadcast(self, events: list) -> None:
+        """
+        Hand events to every subscriber, from any thread.
+        """
+        self._send(
+            tuple(subscription
+                  for subscribers in tuple(self._subscribers.values())
+                  for subscription in tuple(subscribers)),
+            events
+        )
+
+    @staticmethod
+    def _send(subscriptions: tuple, events: list) -> None:
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, events
+                )
+            except RuntimeError:
+                # Its event loop is closed, the subscription is gone.
+                pass
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fan task events out to every worker through PostgreSQL LISTEN/NOTIFY.
+
+    Events are sent by the task_events triggers (TASK_EVENTS_DDL in
+    app/models.py) with NOTIFY from the writing statement itself, which
+    PostgreSQL delivers on commit only, so writes cost no extra statement.
+    Each process keeps one dedicated
+    LISTEN connection, outside the pool, and dispatches notifications to
+    its own subscribers, so idle clients hold no database connection.
+
+    Args:
+        dsn (str): libpq connection string of the database.
+        queue_size (int): Events buffered per subscriber.
+    """
+
+    def __init__(self, dsn: str, queue_size: int):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self._conn = None
+        self._lock: asyncio.Lock | None = None
+
+    async def start(self) -> None:
+        if self._conn is not None and not self._conn.is_closed():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            conn = await asyncpg.connect(self.dsn)
+            conn.add_termination_listener(self._on_terminate)
+            await conn.add_listener(CHANNEL, self._on_notify)
+            self._conn = conn
+
+    async def stop(self) -> None:
+        await super().stop()
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.close()
+
+    async def publish(self, db: AsyncSession, user_id: int,
+                      events: list[dict]) -> None:
+        # Already sent by the triggers of the write
+        pass
+
+    async def publish_import(self, db: AsyncSession, user_id: int,
+                             count: int) -> None:
+        # Must run before the rows are written, so the triggers see the
+        # setting and leave the summary as the only event.
+        payload = orjson.dumps({
+            'user_id': user_id,
+            'events': [{'type': TaskEventType.IMPORTED.value,
+                        'count': count}]
+        }).decode()
+        await db.execute(select(
+            func.set_config(IMPORT_SETTING, 'on', True),
+            func.pg_notify(CHANNEL, payload)
+        ))
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str):
+        message = orjson.loads(payload)
+        self.deliver(message['user_id'], message['events'])
+
+    def _on_terminate(self, conn) -> None:
+        if self._conn is conn:
+            self._conn = None
+        # Notifications sent until the next start() are lost.
+        self.broadcast([RESYNC])
+
+
+def create_broker(url: str, backend: str = EVENTS_BACKEND):
+    """
+    Build the broker configured by EVENTS_BACKEND for a database URL.
+    """
+    url = make_url(url)
+    if backend == 'auto':
+        backend = ('postgres' if url.get_backend_name() == 'postgresql'
+                   else 'memory')
+    if backend == 'postgres':
+        dsn = url.set(drivername='postgresql').render_as_string(
+            hide_password=False
+        )
+        return PostgresBroker(dsn, EVENTS_QUEUE_SIZE)
+    if backend == 'memory':
+        return InProcessBroker(EVENTS_QUEUE_SIZE)
+    raise ValueError(f'Unknown events backend: {backend!r}')
+
+
+broker = create_broker(DB_URL)
+
+
+@event.listens_for(Session, 'after_commit')
+def deliver_pending_events(session: Session):
+    for user_id, events in session.info.pop(PENDING_EVENTS, ()):
+        broker.deliver(user_id, events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_pending_events(session: Session):
+    session.info.pop(PENDING_EVENTS, None)
+
+
+async def publish_task_events(db: AsyncSession, user_id: int,
+                              events: list[dict]) -> None:
+    """
+    Publish task events of a user as part of the current transaction.
+
+    Args:
+        db (AsyncSession): Session of the write, events are delivered when
+        it commits.
+        user_id (int): The ID of the user owning the tasks.
+        events (List[dict]): Events built with `task_event`.
+    """
+    if events:
+        await broker.publish(db, user_id, events)
+
+
+async def publish_import_event(db: AsyncSession, user_id: int,
+                               count: int) -> None:
+    """
+    Publish one `imported` event for tasks of a user about to be written
+    in the current transaction, in place of their individual events.
+
+    Args:
+        db (AsyncSession): Session of the import, the event is delivered
+        when it commits.
+        user_id (int): The ID of the user importing the tasks.
+        count (int): Number of tasks imported.
+    """
+    await broker.publish_import(db, user_id, count)
+
+
+def _encode_sse(item: dict) -> bytes:
+    return b'event: %s\ndata: %s\n\n' % (item['type'].encode(),
+                                         orjson.dumps(item))
+
+
+async def stream_task_events(user_id: int) -> AsyncIterator[bytes]:
+    """
+    Stream the task events of a user as Server-Sent Events.
+
+    A comment is sent every SSE_HEARTBEAT_SECONDS while idle, so proxies
+    keep the connection open and dead clients are noticed. The stream ends
+    when the broker stops.
+
+    Args:
+        user_id (int): The ID of the user whose events to stream.
+
+    Yields:
+        bytes: Encoded SSE messages.
+    """
+    async with broker.subscribe(user_id) as subscription:
+        yield b'retry: %d\n\n' % SSE_RETRY_MS
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(),
+                                              SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await broker.start()
+                yield b': ping\n\n'
+                continue
+
+            chunks = []
+            while item is not CLOSE:
+                chunks.append(_encode_sse(item))
+                if subscription.queue.empty():
+                    break
+                item = subscription.queue.get_nowait()
+            if chunks:
+                yield b''.join(chunks)
+            if item is CLOSE:
+                return
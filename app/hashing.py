@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+from fastapi import HTTPException, status
+
+from app.config import (
+    BCRYPT_ROUNDS,
+    HASHING_POOL_SIZE,
+    HASHING_QUEUE_LIMIT,
+    HASHING_RETRY_AFTER_SECONDS
+)
+
+
+@cache
+def get_pwd_context():
+    """
+    Build the password hashing context on first use, so passlib and bcrypt
+    are not imported by workers until they handle a login or registration.
+
+    Hashes made with any other cost are flagged by `needs_update` and
+    rehashed on the next successful login.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS
+    )
+
+
+class HashingPool:
+    """
+    Bounded thread pool for bcrypt work.
+
+    bcrypt releases the GIL, so a few dedicated threads keep hashing off the
+    event loop and off Starlette's request threadpool. Once `size` jobs are
+    running and `queue_limit` more are waiting, new jobs are rejected with
+    503 instead of piling up behind a login storm.
+
+    Args:
+        size (int): Number of hashing threads.
+        queue_limit (int): Maximum number of jobs waiting for a thread.
+    """
+
+    def __init__(self, size: int, queue_limit: int):
+        self.size = size
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=size,
+                                            thread_name_prefix='hashing')
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on the pool, raises 503 if the queue is full.
+        """
+        if self.pending >= self.size + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": str(HASHING_RETRY_AFTER_SECONDS)},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+
+hashing_pool = HashingPool(size=HASHING_POOL_SIZE,
+                           queue_limit=HASHING_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password on the hashing pool.
+
+    Args:
+        password (str): Plain text password.
+
+    Returns:
+        str: bcrypt hash using the configured cost.
+    """
+    return await hashing_pool.run(get_pwd_context().hash, password)
+
+
+async def verify_password(password: str,
+                          hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify a password on the hashing pool.
+
+    Args:
+        password (str): Plain text password.
+        hashed_password (str): Stored hash.
+
+    Returns:
+        tuple[bool, str | None]: Whether the password matches, and a new
+        hash when the stored one uses outdated parameters.
+    """
+    return await hashing_pool.run(
+        get_pwd_context().verify_and_update, password, hashed_password
+    )
@@ -0,0 +1,23 @@
+import jwt
+from fastapi import Request
+
+from app.config import ALGORITHM, SECRET_KEY
+
+
+def get_client_identity(request: Request) -> str:
+    """
+    Identify the caller without touching the database: the username of a
+    valid bearer token, otherwise the client IP. Behind a proxy listed in
+    FORWARDED_ALLOW_IPS, the server has already set that IP from
+    X-Forwarded-For.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            payload = {}
+        if payload.get('sub'):
+            return f'user:{payload["sub"]}'
+    host = request.client.host if request.client else 'unknown'
+    return f'ip:{host}'
@@ -0,0 +1,139 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+
+from app.config import DEBUG, QUERY_BUDGET
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """
+    Database work done while serving the current request.
+    """
+
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    'request_stats', default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Accumulate the statements executed on `engine` (a sync engine) and the
+    time spent in them into the `RequestStats` of the request that issued
+    them.
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware tracking the database work of every HTTP request.
+
+    Requests issuing more than QUERY_BUDGET statements are logged as likely
+    N+1 patterns. In DEBUG mode the statement count and DB time so far are
+    also sent as `X-DB-Query-Count` and `X-DB-Time-Ms` response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+
+        async def send_with_stats(message):
+            if DEBUG and message['type'] == 'http.response.start':
+                message.setdefault('headers', [])
+                message['headers'] = [
+                    *message['headers'],
+                    (b'x-db-query-count', str(stats.queries).encode()),
+                    (b'x-db-time-ms',
+                     f'{stats.db_time * 1000:.3f}'.encode()),
+                ]
+            await send(message)
+
+        token = request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            request_stats.reset(token)
+            if stats.queries > QUERY_BUDGET:
+                logger.warning(
+                    '%s %s executed %d queries (budget %d) in %.1f ms',
+                    scope['method'], scope['path'], stats.queries,
+                    QUERY_BUDGET, stats.db_time * 1000
+                )
+
+
+class QueryCounter:
+    """
+    Statements captured by `count_queries`.
+    """
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def queries(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine) -> Iterator[QueryCounter]:
+    """
+    Capture every statement executed on `engine` (a sync engine) while the
+    block runs, from any task or thread.
+
+    Args:
+        engine: Engine to watch, e.g. `app.database.engine.sync_engine`.
+
+    Yields:
+        QueryCounter: Statements executed so far.
+    """
+    counter = QueryCounter()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', capture)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'after_cursor_execute', capture)
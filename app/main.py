@@ -1,12 +1,54 @@
+import json
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .routes import tasks, auth
+from .compression import CompressionMiddleware
+from .config import OPENAPI_SCHEMA_PATH
+from .events import broker
+from .instrumentation import QueryStatsMiddleware
+from .metrics import MetricsMiddleware
+from .routes import tasks, auth, internal, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Ends open event streams, so the server does not wait for them
+    await broker.stop()
 
-app = FastAPI(title='Task Manager')
+
+app = FastAPI(title='Task Manager', lifespan=lifespan)
+# Innermost, so route latency includes the time spent compressing
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Outermost, so the request stats it sets are visible to MetricsMiddleware
+app.add_middleware(QueryStatsMiddleware)
 
 app.include_router(tasks.router, prefix='/tasks', tags=['Tasks'])
 app.include_router(auth.router, prefix='/auth', tags=['Auth'])
+app.include_router(internal.router, prefix='/internal')
+app.include_router(metrics.router)
+
+
+def load_openapi_schema(app: FastAPI, path: str | None) -> bool:
+    """
+    Serve a pre-generated OpenAPI schema instead of building it from the
+    routes on the first request to /docs or /openapi.json.
+
+    Returns:
+        bool: Whether a schema was loaded.
+    """
+    if not path or not os.path.exists(path):
+        return False
+    with open(path, 'rb') as fh:
+        app.openapi_schema = json.load(fh)
+    return True
 
 
 @app.get('/')
 async def index():
     return {'message': 'Welcome to the web-task-manager!'}
+
+
+load_openapi_schema(app, OPENAPI_SCHEMA_PATH)
@@ -0,0 +1,137 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+from app.instrumentation import request_stats
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time spent serving a request, by route template.',
+    ['method', 'route']
+)
+REQUESTS = Counter(
+    'http_requests_total',
+    'Requests served, by route template and status code.',
+    ['method', 'route', 'status']
+)
+ERRORS = Counter(
+    'http_request_errors_total',
+    'Requests answered with a 5xx status code.',
+    ['method', 'route', 'status']
+)
+IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'Requests currently being served.',
+    multiprocess_mode='livesum'
+)
+DB_TIME = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing database statements per request.',
+    ['method', 'route'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+
+
+def _route_metrics(method: str, route: str) -> tuple:
+    """
+    Return the labelled latency and DB time children for a route.
+
+    `.labels()` takes a lock and builds the label tuple on every call, so
+    the children are looked up once and reused.
+    """
+    key = (method, route)
+    children = _route_children.get(key)
+    if children is None:
+        children = (
+            REQUEST_LATENCY.labels(method, route),
+            DB_TIME.labels(method, route)
+        )
+        _route_children[key] = children
+    return children
+
+
+def _status_counter(method: str, route: str, status_code: int):
+    key = (method, route, status_code)
+    counter = _status_children.get(key)
+    if counter is None:
+        counter = REQUESTS.labels(method, route, str(status_code))
+        _status_children[key] = counter
+    return counter
+
+
+_route_children: dict[tuple, tuple] = {}
+_status_children: dict[tuple, Counter] = {}
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording Prometheus metrics for every HTTP request.
+
+    Requests are labelled with the template of the matched route (e.g.
+    `/tasks/{task_id}`), so label cardinality does not grow with IDs. DB
+    time is read from the request stats set by `QueryStatsMiddleware`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_PROGRESS.dec()
+
+            route = getattr(scope.get('route'), 'path', UNMATCHED_ROUTE)
+            latency, db_time = _route_metrics(method, route)
+            latency.observe(elapsed)
+            stats = request_stats.get()
+            if stats is not None:
+                db_time.observe(stats.db_time)
+            _status_counter(method, route, status_code).inc()
+            if status_code >= 500:
+                ERRORS.labels(method, route, str(status_code)).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (one directory shared by all
+    gunicorn workers), the values of every worker are aggregated.
+
+    Returns:
+        tuple[bytes, str]: Response body and its content type.
+    """
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,7 @@
 from typing import List, Optional
-from sqlalchemy import ForeignKey, String, Text, Enum
+from sqlalchemy import (
+    DDL, BigInteger, ForeignKey, Index, String, Text, Enum, event
+)
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -37,6 +39,11 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        Index('ix_tasks_user_id_id', 'user_id', 'id'),
+        Index('ix_tasks_status_id', 'status', 'id'),
+        Index('ix_tasks_user_id_change_seq', 'user_id', 'change_seq'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -44,6 +51,15 @@ class Task(Base):
     status: Mapped[TaskStatus] = mapped_column(
         Enum(TaskStatus), default=TaskStatus.NEW, nullable=False
     )
+    # Incremented by every write, used for ETags
+    version: Mapped[int] = mapped_column(
+        default=1, server_default='1', nullable=False
+    )
+    # Position in the change feed, set from a database-wide sequence by the
+    # TASK_CHANGES_DDL triggers on every insert and update
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default='0', nullable=False
+    )
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE'), nullable=False
@@ -55,3 +71,402 @@ class Task(Base):
             f'Task(id={self.id!r}, title={self.title!r}, '
             f'description={self.description!r}, status={self.status!r})'
         )
+
+
+class TaskCounter(Base):
+    """
+    Number of tasks per user and status, maintained by triggers on `tasks`
+    (see TASK_COUNTER_DDL) so every write path keeps it in step within its
+    own transaction.
+    """
+    __tablename__ = 'task_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    status: Mapped[TaskStatus] = mapped_column(
+        Enum(TaskStatus), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(
+        default=0, server_default='0', nullable=False
+    )
+
+
+class TaskTombstone(Base):
+    """
+    Deleted task, recorded by the TASK_CHANGES_DDL triggers so delta sync
+    can report deletions.
+    """
+    __tablename__ = 'task_tombstones'
+    __table_args__ = (
+        Index('ix_task_tombstones_user_id_change_seq',
+              'user_id', 'change_seq'),
+    )
+
+    task_id: Mapped[int] = mapped_column(primary_key=True)
+    # Deleting a user drops its tombstones; the triggers write none for
+    # tasks deleted along with their user, who can never sync again.
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), nullable=False
+    )
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Full-text search over title and description, used by
+# app/services/search.py. Neither structure is mapped: PostgreSQL gets a
+# tsvector column kept up to date by a trigger, with a GIN index (also
+# added by the d7f3a9c2b614 migration), SQLite an external-content FTS5
+# table kept in sync by triggers. A trigger rather than a generated column,
+# since adding a stored generated column rewrites the whole table.
+TASK_SEARCH_DDL = {
+    'postgresql': [
+        'ALTER TABLE tasks ADD COLUMN search_vector tsvector',
+        """
+        CREATE OR REPLACE FUNCTION update_task_search_vector()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.title, '')),
+                          'A') ||
+                setweight(to_tsvector('english',
+                                      coalesce(NEW.description, '')), 'B');
+            RETURN NEW;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER task_search_vector
+        BEFORE INSERT OR UPDATE OF title, description ON tasks
+        FOR EACH ROW EXECUTE FUNCTION update_task_search_vector()
+        """,
+        'CREATE INDEX ix_tasks_search_vector ON tasks '
+        'USING gin (search_vector)',
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description
+        ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in TASK_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Task.__table__, 'after_create',
+                     DDL(statement).execute_if(dialect=dialect))
+event.listen(Task.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS tasks_fts')
+             .execute_if(dialect='sqlite'))
+
+
+# Keep task_counters up to date. PostgreSQL uses statement-level triggers
+# with transition tables, so bulk writes, COPY and cascaded deletes apply
+# one aggregated upsert per statement (also added by the e2a6c4d8f105
+# migration). SQLite only has row-level triggers.
+TASK_COUNTER_DDL = {
+    'postgresql': [
+        """
+        CREATE OR REPLACE FUNCTION update_task_counters() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO task_counters (user_id, status, count)
+                SELECT user_id, status, count(*) FROM new_rows
+                GROUP BY user_id, status
+                ON CONFLICT (user_id, status) DO UPDATE
+                SET count = task_counters.count + EXCLUDED.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE task_counters SET count = task_counters.count - d.n
+                FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+                      GROUP BY user_id, status) AS d
+                WHERE task_counters.user_id = d.user_id
+                AND task_counters.status = d.status;
+            ELSE
+                INSERT INTO task_counters (user_id, status, count)
+                SELECT user_id, status, sum(n) FROM (
+                    SELECT user_id, status, -1 AS n FROM old_rows
+                    UNION ALL
+                    SELECT user_id, status, 1 AS n FROM new_rows
+                ) AS d
+                GROUP BY user_id, status
+                HAVING sum(n) <> 0
+                ON CONFLICT (user_id, status) DO UPDATE
+                SET count = task_counters.count + EXCLUDED.count;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER task_counters_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+        """,
+        """
+        CREATE TRIGGER task_counters_update AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+        """,
+        """
+        CREATE TRIGGER task_counters_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_task_counters()
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE TRIGGER task_counters_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counters (user_id, status, count)
+            VALUES (new.user_id, new.status, 1)
+            ON CONFLICT (user_id, status) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER task_counters_update AFTER UPDATE OF status, user_id
+        ON tasks
+        WHEN old.status IS NOT new.status OR old.user_id IS NOT new.user_id
+        BEGIN
+            UPDATE task_counters SET count = count - 1
+            WHERE user_id = old.user_id AND status = old.status;
+            INSERT INTO task_counters (user_id, status, count)
+            VALUES (new.user_id, new.status, 1)
+            ON CONFLICT (user_id, status) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER task_counters_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_counters SET count = count - 1
+            WHERE user_id = old.user_id AND status = old.status;
+        END
+        """,
+    ],
+}
+
+# Registered on the metadata so both tables exist when the triggers are
+# created.
+for dialect, statements in TASK_COUNTER_DDL.items():
+    for statement in statements:
+        event.listen(Base.metadata, 'after_create',
+                     DDL(statement).execute_if(dialect=dialect))
+
+
+# Stamp every task write with a position in the change feed and record
+# deletions as tombstones, for GET /tasks/changes (also added by the
+# f3b8d1e6a27c migration).
+#
+# On PostgreSQL the position is the ID of the writing (top-level)
+# transaction shifted left by CHANGE_SEQ_XACT_BITS, plus a counter of the
+# changes made by that transaction. No lock is taken: positions follow
+# transaction IDs, and readers only return changes of transactions older
+# than the oldest one still running (see `get_task_changes`), so a
+# watermark never skips a write that commits late. SQLite serializes
+# writers anyway and emulates a sequence with a one-row table.
+#
+# 24 bits let one transaction change about 16M tasks (a cascaded delete of
+# a user counts every task), and leave 39 bits, over 5 * 10**11
+# transaction IDs, before positions outgrow BIGINT.
+CHANGE_SEQ_XACT_BITS = 24
+# Largest position the BIGINT change_seq columns hold
+MAX_CHANGE_SEQ = 2**63 - 1
+
+TASK_CHANGES_DDL = {
+    'postgresql': [
+        f"""
+        CREATE OR REPLACE FUNCTION track_task_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changes bigint;
+            seq bigint;
+        BEGIN
+            IF TG_OP = 'DELETE' AND NOT EXISTS (
+                SELECT 1 FROM users WHERE id = OLD.user_id
+            ) THEN
+                -- Cascaded from deleting the user
+                RETURN OLD;
+            END IF;
+            changes := coalesce(
+                nullif(current_setting('task_changes.count', true), ''),
+                '0'
+            )::bigint + 1;
+            IF changes >= 1 << {CHANGE_SEQ_XACT_BITS} THEN
+                RAISE EXCEPTION 'Too many task changes in one transaction';
+            END IF;
+            PERFORM set_config('task_changes.count', changes::text, true);
+            seq := pg_current_xact_id()::text::bigint
+                   << {CHANGE_SEQ_XACT_BITS} | changes;
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO task_tombstones (task_id, user_id, change_seq)
+                VALUES (OLD.id, OLD.user_id, seq)
+                ON CONFLICT (task_id) DO UPDATE
+                SET user_id = EXCLUDED.user_id,
+                    change_seq = EXCLUDED.change_seq;
+                RETURN OLD;
+            END IF;
+            NEW.change_seq := seq;
+            RETURN NEW;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER task_changes_write BEFORE INSERT OR UPDATE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION track_task_changes()
+        """,
+        """
+        CREATE TRIGGER task_changes_delete AFTER DELETE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION track_task_changes()
+        """,
+    ],
+    'sqlite': [
+        'CREATE TABLE task_change_seq (value INTEGER NOT NULL)',
+        'INSERT INTO task_change_seq (value) VALUES (0)',
+        """
+        CREATE TRIGGER task_changes_insert AFTER INSERT ON tasks BEGIN
+            UPDATE task_change_seq SET value = value + 1;
+            UPDATE tasks SET change_seq = (SELECT value FROM task_change_seq)
+            WHERE id = new.id;
+            -- SQLite may reuse the ID of the most recently deleted task
+            DELETE FROM task_tombstones WHERE task_id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER task_changes_update AFTER UPDATE ON tasks
+        WHEN new.change_seq IS old.change_seq BEGIN
+            UPDATE task_change_seq SET value = value + 1;
+            UPDATE tasks SET change_seq = (SELECT value FROM task_change_seq)
+            WHERE id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER task_changes_delete AFTER DELETE ON tasks
+        WHEN EXISTS (SELECT 1 FROM users WHERE id = old.user_id) BEGIN
+            UPDATE task_change_seq SET value = value + 1;
+            INSERT INTO task_tombstones (task_id, user_id, change_seq)
+            VALUES (old.id, old.user_id,
+                    (SELECT value FROM task_change_seq))
+            ON CONFLICT (task_id) DO UPDATE
+            SET user_id = excluded.user_id,
+                change_seq = excluded.change_seq;
+        END
+        """,
+    ],
+}
+
+for dialect, statements in TASK_CHANGES_DDL.items():
+    for statement in statements:
+        event.listen(Base.metadata, 'after_create',
+                     DDL(statement).execute_if(dialect=dialect))
+event.listen(Base.metadata, 'before_drop',
+             DDL('DROP TABLE IF EXISTS task_change_seq')
+             .execute_if(dialect='sqlite'))
+
+
+# Send task events to GET /tasks/stream clients with NOTIFY from the
+# writing statement itself, so writes need no extra round-trip (also added
+# by the a4c7e9f2b5d8 migration). One notification per user and batch of
+# 100 events stays below the 8000-byte payload limit. The importer sets
+# `task_events.imported` and sends one summary event per chunk instead.
+# SQLite has a single process and publishes from the session
+# (app/events.py).
+TASK_EVENTS_DDL = {
+    'postgresql': [
+        """
+        CREATE OR REPLACE FUNCTION notify_task_events() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changes jsonb;
+            message record;
+        BEGIN
+            IF current_setting('task_events.imported', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                SELECT jsonb_agg(jsonb_build_object(
+                    'user_id', user_id,
+                    'event', jsonb_build_object('type', 'created', 'id', id,
+                                                'version', version)
+                ) ORDER BY id) INTO changes FROM new_rows;
+            ELSIF TG_OP = 'UPDATE' THEN
+                SELECT jsonb_agg(jsonb_build_object(
+                    'user_id', n.user_id,
+                    'event', jsonb_build_object(
+                        'type', CASE WHEN n.status = 'COMPLETED'
+                                     AND o.status <> 'COMPLETED'
+                                THEN 'completed' ELSE 'updated' END,
+                        'id', n.id, 'version', n.version
+                    )
+                ) ORDER BY n.id) INTO changes
+                FROM new_rows AS n JOIN old_rows AS o ON o.id = n.id;
+            ELSE
+                -- Nobody listens for the tasks of a deleted user
+                SELECT jsonb_agg(jsonb_build_object(
+                    'user_id', user_id,
+                    'event', jsonb_build_object('type', 'deleted', 'id', id)
+                ) ORDER BY id) INTO changes FROM old_rows
+                WHERE EXISTS (SELECT 1 FROM users
+                              WHERE users.id = old_rows.user_id);
+            END IF;
+            FOR message IN
+                SELECT jsonb_build_object(
+                    'user_id', user_id,
+                    'events', jsonb_agg(change -> 'event' ORDER BY n)
+                )::text AS payload
+                FROM (
+                    SELECT change, (change ->> 'user_id')::int AS user_id,
+                           row_number() OVER (
+                               PARTITION BY change ->> 'user_id' ORDER BY n
+                           ) - 1 AS position, n
+                    FROM jsonb_array_elements(coalesce(changes, '[]'))
+                         WITH ORDINALITY AS e(change, n)
+                ) AS d
+                GROUP BY user_id, position / 100
+            LOOP
+                PERFORM pg_notify('task_events', message.payload);
+            END LOOP;
+            RETURN NULL;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER task_events_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+        """,
+        """
+        CREATE TRIGGER task_events_update AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+        """,
+        """
+        CREATE TRIGGER task_events_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_task_events()
+        """,
+    ],
+}
+
+for dialect, statements in TASK_EVENTS_DDL.items():
+    for statement in statements:
+        event.listen(Base.metadata, 'after_create',
+                     DDL(statement).execute_if(dialect=dialect))
@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+# Range of the integer primary keys
+MAX_ID = 2**31 - 1
+
+
+def encode_cursor(data: dict) -> str:
+    """
+    Encode keyset pagination state into an opaque cursor string.
+
+    Args:
+        data (dict): Sort key values of the last returned row.
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Cursor received from the client.
+
+    Returns:
+        dict: Sort key values of the last row seen by the client, raises 400
+        if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        data = None
+
+    if not isinstance(data, dict):
+        raise invalid_cursor()
+    return data
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def decode_cursor_id(data: dict) -> int:
+    """
+    Read the task id of a decoded cursor.
+
+    Args:
+        data (dict): Cursor returned by `decode_cursor`.
+
+    Returns:
+        int: The id, raises 400 unless it is an integer (not a bool) in the
+        range of the id column.
+    """
+    last_id = data.get('id')
+    if type(last_id) is not int or not 1 <= last_id <= MAX_ID:
+        raise invalid_cursor()
+    return last_id
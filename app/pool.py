@@ -0,0 +1,121 @@
+import time
+from threading import Lock
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Per-process counters describing how requests use the connection pool.
+
+    Checkouts and checkins are counted through SQLAlchemy pool events.
+    Checkout wait time and timeouts are recorded by `InstrumentedPool`,
+    since the `checkout` event only fires once a connection was obtained.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = Lock()
+
+    def attach(self, engine) -> None:
+        """
+        Count checkouts and checkins of the pool of a (sync) engine.
+        """
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+                     connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def record_wait(self, seconds: float) -> None:
+        """
+        Record the time a checkout spent waiting for a connection.
+        """
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_timeout(self) -> None:
+        """
+        Record a checkout that gave up after `pool_timeout`.
+        """
+        with self._lock:
+            self.timeouts += 1
+
+    def clear(self) -> None:
+        """
+        Reset all counters.
+        """
+        with self._lock:
+            self.checkouts = self.checkins = self.timeouts = self.waits = 0
+            self.wait_seconds = self.max_wait_seconds = 0.0
+
+    def stats(self, pool: Pool) -> dict:
+        """
+        Return the counters together with the current state of `pool`.
+        """
+        stats = {
+            'pool': type(pool).__name__,
+            'checked_out': self.checkouts - self.checkins,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_count': self.waits,
+            'wait_avg_ms': (
+                self.wait_seconds / self.waits * 1000 if self.waits else 0.0
+            ),
+            'wait_max_ms': self.max_wait_seconds * 1000,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return stats
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    `AsyncAdaptedQueuePool` that records checkout wait time and timeouts in
+    `metrics`.
+
+    Every engine passes its own `PoolMetrics` (`create_async_engine(...,
+    metrics=...)`), so the counters of the primary and of each replica
+    stay apart.
+    """
+
+    # Not keyword-only: `create_engine` only passes on the arguments it
+    # finds among the positional parameters of the pool class
+    def __init__(self, creator, metrics: PoolMetrics | None = None, **kw):
+        super().__init__(creator, **kw)
+        self.metrics = metrics if metrics is not None else PoolMetrics()
+
+    def recreate(self) -> 'InstrumentedPool':
+        # Called by `engine.dispose()`; the new pool keeps counting in the
+        # same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
@@ -0,0 +1,173 @@
+import fcntl
+import hashlib
+import math
+import re
+import struct
+import time
+from threading import Lock
+
+from fastapi import HTTPException, Request, status
+
+from app.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_PATH,
+    RATE_LIMIT_SLOTS,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMITS
+)
+from app.identity import get_client_identity
+from app.shm import open_shared_file
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+# Retry-After sent by routes blocked with a zero limit such as `0/minute`
+BLOCKED_RETRY_AFTER_SECONDS = PERIODS['hour']
+
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """
+    Parse a limit such as `60/minute` into a token bucket.
+
+    Args:
+        spec (str): `<requests>/<second|minute|hour>`.
+
+    Returns:
+        tuple[float, float]: Refill rate in tokens per second and bucket
+        capacity, raises ValueError if the spec is malformed. A zero limit
+        gives an empty bucket that is never refilled.
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour)\s*', spec)
+    if match is None:
+        raise ValueError(f'Invalid rate limit: {spec!r}')
+    requests = int(match.group(1))
+    return requests / PERIODS[match.group(2)], float(requests)
+
+
+class SharedTokenBuckets:
+    """
+    Token buckets stored in an mmap-backed file, shared by every process
+    that opens the same path.
+
+    The file is a fixed table of `slots` entries (key hash, tokens, last
+    refill). A key hashes to a group of WAYS consecutive slots, which is
+    locked with `fcntl.lockf` (and a thread lock, since fcntl locks are held
+    per process) while its bucket is read and updated. When a
+    group is full, the least recently used slot is reused. Time is taken
+    from the system-wide monotonic clock, so all workers on a host agree.
+
+    Args:
+        path (str): File backing the table, preferably on tmpfs.
+        slots (int): Number of buckets the table holds.
+    """
+
+    SLOT = struct.Struct('<Qdd')
+    WAYS = 4
+
+    def __init__(self, path: str, slots: int):
+        self.groups = max(slots // self.WAYS, 1)
+        self.size = self.groups * self.WAYS * self.SLOT.size
+        self._fd, self._map = open_shared_file(path, self.size)
+        self._lock = Lock()
+
+    def take(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Take one token from the bucket of `key`.
+
+        Args:
+            key (str): Bucket identity, e.g. route and user.
+            rate (float): Refill rate in tokens per second.
+            capacity (float): Maximum number of tokens.
+
+        Returns:
+            float: 0 if the token was granted, otherwise the number of
+            seconds until one is available.
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, 'little') or 1
+        start = (key_hash % self.groups) * self.WAYS * self.SLOT.size
+        length = self.WAYS * self.SLOT.size
+
+        with self._lock:
+            return self._take(key_hash, start, length, rate, capacity)
+
+    def _take(self, key_hash: int, start: int, length: int, rate: float,
+              capacity: float) -> float:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+        try:
+            now = time.monotonic()
+            offset, tokens, updated = self._find(key_hash, start, now,
+                                                 capacity)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                retry_after = 0.0
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self.SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            return retry_after
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _find(self, key_hash: int, start: int, now: float,
+              capacity: float) -> tuple[int, float, float]:
+        oldest = None
+        for way in range(self.WAYS):
+            offset = start + way * self.SLOT.size
+            slot_hash, tokens, updated = self.SLOT.unpack_from(
+                self._map, offset
+            )
+            if slot_hash == key_hash:
+                return offset, tokens, updated
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        # New key: evict the least recently used slot of the group and
+        # start with a full bucket.
+        return oldest[0], capacity, now
+
+    def clear(self) -> None:
+        """
+        Reset every bucket.
+        """
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[:] = bytes(self.size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+
+buckets = SharedTokenBuckets(RATE_LIMIT_PATH, RATE_LIMIT_SLOTS)
+default_limit = parse_limit(RATE_LIMIT_DEFAULT)
+route_limits = {
+    route: parse_limit(spec) for route, spec in RATE_LIMITS.items()
+}
+
+
+async def rate_limit(request: Request):
+    """
+    Dependency enforcing the token bucket of the current route and caller.
+
+    Limits are looked up by `<METHOD> <route template>` in RATE_LIMITS and
+    fall back to RATE_LIMIT_DEFAULT. Authenticated callers are limited per
+    user, anonymous ones per IP. A zero limit blocks the route.
+
+    Raises:
+        HTTPException: 429 with Retry-After if the bucket is empty.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    route = f'{request.method} {request.scope["route"].path}'
+    rate, capacity = route_limits.get(route, default_limit)
+    if capacity < 1:
+        # The bucket can never hold a token
+        retry_after = BLOCKED_RETRY_AFTER_SECONDS
+    else:
+        retry_after = buckets.take(
+            f'{route}|{get_client_identity(request)}', rate, capacity
+        )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
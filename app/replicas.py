@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import itertools
+import struct
+import time
+from functools import partial
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.pool import PoolMetrics
+from app.shm import open_shared_file
+
+
+class RecentWrites:
+    """
+    Time of the last write per caller, stored in an mmap-backed file shared
+    by every process that opens the same path.
+
+    A caller hashes to one slot holding a `time.monotonic()` timestamp.
+    Callers sharing a slot only make each other read from the primary a
+    bit more often, so slots are neither locked nor verified.
+
+    Args:
+        path (str): File backing the table, preferably on tmpfs.
+        slots (int): Number of timestamps the table holds.
+    """
+
+    SLOT = struct.Struct('<d')
+
+    def __init__(self, path: str, slots: int):
+        self.slots = max(slots, 1)
+        self.size = self.slots * self.SLOT.size
+        self._fd, self._map = open_shared_file(path, self.size)
+
+    def _offset(self, key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        slot = int.from_bytes(digest, 'little') % self.slots
+        return slot * self.SLOT.size
+
+    def record(self, key: str) -> None:
+        """
+        Remember that `key` wrote just now.
+        """
+        self.SLOT.pack_into(self._map, self._offset(key), time.monotonic())
+
+    def is_recent(self, key: str, window: float) -> bool:
+        """
+        Check whether `key` wrote within the last `window` seconds.
+        """
+        written, = self.SLOT.unpack_from(self._map, self._offset(key))
+        return written > 0 and time.monotonic() - written < window
+
+    def clear(self) -> None:
+        """
+        Forget every write.
+        """
+        self._map[:] = bytes(self.size)
+
+
+class ReplicaSet:
+    """
+    Round-robin over read replicas, skipping unhealthy ones.
+
+    A replica whose connection fails (connect error or disconnect) is taken
+    out of rotation for `retry_seconds`. After that it is probed with
+    `SELECT 1` before it receives reads again.
+
+    Args:
+        engines (list[AsyncEngine]): Engines of the replicas.
+        retry_seconds (float): How long a failed replica is skipped.
+        probe_timeout (float): Seconds a probe may take.
+        pool_metrics (dict[AsyncEngine, PoolMetrics]): Pool counters of
+        the replicas, reported by `stats`.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], retry_seconds: float,
+                 probe_timeout: float,
+                 pool_metrics: dict[AsyncEngine, PoolMetrics] | None = None):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self.probe_timeout = probe_timeout
+        self.pool_metrics = pool_metrics or {}
+        self._next = itertools.count()
+        self._down_until: dict[AsyncEngine, float] = {}
+        for engine in engines:
+            event.listen(engine.sync_engine, 'handle_error',
+                         partial(self._on_error, engine))
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        """
+        Take a replica out of rotation for `retry_seconds`.
+        """
+        self._down_until[engine] = time.monotonic() + self.retry_seconds
+
+    async def choose(self) -> AsyncEngine | None:
+        """
+        Return the next healthy replica, or None if there is none.
+        """
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._next) % len(self.engines)]
+            down_until = self._down_until.get(engine)
+            if down_until is None:
+                return engine
+            if time.monotonic() >= down_until and await self._probe(engine):
+                self._down_until.pop(engine, None)
+                return engine
+        return None
+
+    async def _probe(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.probe_timeout):
+                async with engine.connect() as conn:
+                    await conn.execute(text('SELECT 1'))
+        except (exc.DBAPIError, OSError, TimeoutError):
+            self.mark_down(engine)
+            return False
+        return True
+
+    def _on_error(self, engine: AsyncEngine, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(engine)
+
+    def stats(self) -> list[dict]:
+        """
+        Health and pool usage of every replica, for monitoring.
+        """
+        now = time.monotonic()
+        stats = []
+        for engine in self.engines:
+            replica = {
+                'url': engine.url.render_as_string(hide_password=True),
+                'healthy': self._down_until.get(engine, 0) <= now,
+            }
+            metrics = self.pool_metrics.get(engine)
+            if metrics is not None:
+                replica['pool'] = metrics.stats(engine.sync_engine.pool)
+            stats.append(replica)
+        return stats
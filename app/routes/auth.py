@@ -1,24 +1,28 @@
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.auth import UserCreate, UserRead, Token
 import app.services.auth as service
 from app.database import get_db
+from app.ratelimit import rate_limit
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(rate_limit)])
 
 
 @router.post('/register', response_model=UserRead)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    return service.register_user(db, user)
+async def register_user(user: UserCreate,
+                        db: AsyncSession = Depends(get_db)):
+    return await service.register_user(db, user)
 
 
 @router.post('/login', response_model=Token)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(),
-               db: Session = Depends(get_db)):
-    user = service.authenticate_user(db,
-                                     form_data.username,
-                                     password=form_data.password)
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(),
+                     db: AsyncSession = Depends(get_db)):
+    user = await service.authenticate_user(db,
+                                           form_data.username,
+                                           password=form_data.password)
 
-    access_token = service.create_access_token(data={"sub": user.username})
+    access_token = service.create_access_token(
+        data=service.get_token_data(user)
+    )
     return {"access_token": access_token, "token_type": "bearer"}
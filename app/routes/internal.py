@@ -0,0 +1,40 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.config import INTERNAL_API_TOKEN
+from app.database import engine, pool_metrics, replicas
+from app.services.auth import user_cache
+
+
+def verify_internal_token(x_internal_token: str | None = Header(None)):
+    """
+    Only let requests carrying INTERNAL_API_TOKEN through. Without a
+    configured token the internal endpoints do not exist.
+    """
+    if INTERNAL_API_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail='Not Found')
+    if x_internal_token is None or not secrets.compare_digest(
+            x_internal_token.encode(), INTERNAL_API_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail='Invalid internal token')
+
+
+router = APIRouter(include_in_schema=False,
+                   dependencies=[Depends(verify_internal_token)])
+
+
+@router.get('/user-cache', response_model=dict)
+async def get_user_cache_stats():
+    return user_cache.stats()
+
+
+@router.get('/pool', response_model=dict)
+async def get_pool_stats():
+    return pool_metrics.stats(engine.sync_engine.pool)
+
+
+@router.get('/replicas', response_model=list)
+async def get_replica_health():
+    return replicas.stats()
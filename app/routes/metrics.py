@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import render_metrics
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get('/metrics')
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
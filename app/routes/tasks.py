@@ -1,68 +1,239 @@
 from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-
-
-from app.schemas.tasks import TaskCreate, TaskUpdate, TaskRead
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+from app.schemas.tasks import (
+    TaskCreate,
+    TaskUpdate,
+    TaskRead,
+    TaskBulkCreate,
+    TaskBulkStatusUpdate,
+    TaskBulkDelete,
+    TaskBulkResult,
+    TaskImportReport,
+    TaskChanges,
+    TaskStats
+)
 import app.services.tasks as service
-from app.database import get_db
+import app.services.export as export_service
+import app.services.importer as import_service
+import app.services.search as search_service
+import app.services.stats as stats_service
+from app import events
+from app.database import get_db, get_read_db
 from app.services.auth import get_current_user
-from app.enums import TaskStatus
+from app.ratelimit import rate_limit
+from app.enums import CountMode, TaskStatus, TransferFormat
 from app.schemas.auth import UserRead
+from app.models import Task
+from app.etags import (
+    etag_matches,
+    if_match_versions,
+    list_etag,
+    not_modified,
+    task_etag
+)
+from app.serialization import TASK_LIST_COLUMNS, tasks_response
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(rate_limit)])
 
 
 @router.get('/', response_model=List[TaskRead])
-def get_tasks(
-        db: Session = Depends(get_db),
+async def get_tasks(
+        db: AsyncSession = Depends(get_read_db),
         page: int = 1,
         limit: int = 10,
         status: TaskStatus | None = None,
+        after: str | None = None,
+        count: CountMode | None = None,
+        if_none_match: str | None = Header(None),
         current_user: UserRead = Depends(get_current_user)
         ):
-    return service.get_tasks(db, page, limit, status)
+    if if_none_match:
+        versions = await service.get_tasks(db, page, limit, status, after,
+                                           columns=(Task.id, Task.version))
+        etag = list_etag(versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    rows = await service.get_tasks(db, page, limit, status, after,
+                                   columns=TASK_LIST_COLUMNS)
+    headers = {'ETag': list_etag((row.id, row.version) for row in rows)}
+    next_cursor = service.get_next_cursor(rows, limit)
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    if count:
+        total, mode = await service.count_tasks(db, status, count)
+        headers['X-Total-Count'] = str(total)
+        headers['X-Total-Count-Mode'] = mode.value
+    return tasks_response(rows, headers)
 
 
 @router.get('/user/{user_id}', response_model=List[TaskRead])
-def get_user_tasks(user_id: int,
-                   db: Session = Depends(get_db),
-                   current_user: UserRead = Depends(get_current_user)):
-    return service.get_user_tasks(db, user_id)
+async def get_user_tasks(user_id: int,
+                         if_none_match: str | None = Header(None),
+                         db: AsyncSession = Depends(get_read_db),
+                         current_user: UserRead = Depends(get_current_user)):
+    if if_none_match:
+        versions = await service.get_user_tasks(
+            db, user_id, columns=(Task.id, Task.version)
+        )
+        etag = list_etag(versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    rows = await service.get_user_tasks(db, user_id,
+                                        columns=TASK_LIST_COLUMNS)
+    headers = {'ETag': list_etag((row.id, row.version) for row in rows)}
+    return tasks_response(rows, headers)
+
+
+@router.get('/stats', response_model=TaskStats)
+async def get_task_stats(db: AsyncSession = Depends(get_read_db),
+                         current_user: UserRead = Depends(get_current_user)):
+    return await stats_service.get_task_stats(db, current_user.id)
+
+
+@router.get('/changes', response_model=TaskChanges)
+async def get_task_changes(since: int = 0,
+                           limit: int = 100,
+                           db: AsyncSession = Depends(get_read_db),
+                           current_user: UserRead = Depends(get_current_user)):
+    return await service.get_task_changes(db, current_user.id, since, limit)
+
+
+@router.get('/search', response_model=List[TaskRead])
+async def search_tasks(q: str,
+                       limit: int = 10,
+                       after: str | None = None,
+                       db: AsyncSession = Depends(get_read_db),
+                       current_user: UserRead = Depends(get_current_user)):
+    rows = await search_service.search_tasks(db, current_user.id, q,
+                                             limit, after)
+    headers = {}
+    next_cursor = search_service.get_next_search_cursor(rows, limit)
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    return tasks_response((row[:-1] for row in rows), headers)
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_tasks(format: TransferFormat = TransferFormat.NDJSON,
+                       current_user: UserRead = Depends(get_current_user)):
+    return StreamingResponse(
+        export_service.stream_user_tasks(current_user.id, format),
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition':
+                f'attachment; filename="tasks.{format.value}"'
+        }
+    )
+
+
+@router.get('/stream', response_class=StreamingResponse)
+async def stream_task_events(
+        current_user: UserRead = Depends(get_current_user)):
+    return StreamingResponse(
+        events.stream_task_events(current_user.id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@router.post('/import', response_model=TaskImportReport)
+async def import_tasks(request: Request,
+                       format: TransferFormat = TransferFormat.NDJSON,
+                       current_user: UserRead = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_db)):
+    return await import_service.import_tasks(db,
+                                             request.stream(),
+                                             format,
+                                             current_user.id)
+
+
+@router.post('/bulk', response_model=List[TaskBulkResult])
+async def bulk_create_tasks(data: TaskBulkCreate,
+                            current_user: UserRead = Depends(get_current_user),
+                            db: AsyncSession = Depends(get_db)):
+    return await service.bulk_create_tasks(db, data.items, current_user.id)
+
+
+@router.patch('/bulk', response_model=List[TaskBulkResult])
+async def bulk_update_task_status(
+        data: TaskBulkStatusUpdate,
+        current_user: UserRead = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+        ):
+    return await service.bulk_update_task_status(db,
+                                                 data.items,
+                                                 current_user.id)
+
+
+@router.delete('/bulk', response_model=List[TaskBulkResult])
+async def bulk_delete_tasks(data: TaskBulkDelete,
+                            current_user: UserRead = Depends(get_current_user),
+                            db: AsyncSession = Depends(get_db)):
+    return await service.bulk_delete_tasks(db, data.ids, current_user.id)
 
 
 @router.get('/{task_id}', response_model=TaskRead)
-def get_task(task_id: int,
-             db: Session = Depends(get_db),
-             current_user: UserRead = Depends(get_current_user)):
-    return service.get_task_by_id(db, task_id, current_user.id)
+async def get_task(task_id: int,
+                   response: Response,
+                   if_none_match: str | None = Header(None),
+                   db: AsyncSession = Depends(get_read_db),
+                   current_user: UserRead = Depends(get_current_user)):
+    if if_none_match:
+        version = await service.get_task_version(db, task_id, current_user.id)
+        etag = task_etag(task_id, version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    task = await service.get_task_by_id(db, task_id, current_user.id)
+    response.headers['ETag'] = task_etag(task.id, task.version)
+    return task
 
 
 @router.post('/', response_model=TaskRead)
-def create_task(task_data: TaskCreate,
-                current_user: UserRead = Depends(get_current_user),
-                db: Session = Depends(get_db)):
-    return service.create_task(db, task_data, current_user.id)
+async def create_task(task_data: TaskCreate,
+                      response: Response,
+                      current_user: UserRead = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    task = await service.create_task(db, task_data, current_user.id)
+    response.headers['ETag'] = task_etag(task.id, task.version)
+    return task
 
 
 @router.put('/{task_id}', response_model=TaskRead)
-def update_task(task_id: int,
-                task_data: TaskUpdate,
-                current_user: UserRead = Depends(get_current_user),
-                db: Session = Depends(get_db)):
-    return service.update_task(db, task_id, task_data, current_user.id)
+async def update_task(task_id: int,
+                      task_data: TaskUpdate,
+                      response: Response,
+                      if_match: str | None = Header(None),
+                      current_user: UserRead = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    task = await service.update_task(db, task_id, task_data, current_user.id,
+                                     if_match_versions(if_match, task_id))
+    response.headers['ETag'] = task_etag(task.id, task.version)
+    return task
 
 
 @router.delete('/{task_id}', response_model=dict)
-def delete_task(task_id: int,
-                current_user: UserRead = Depends(get_current_user),
-                db: Session = Depends(get_db)):
-    service.delete_task(db, task_id, current_user.id)
+async def delete_task(task_id: int,
+                      current_user: UserRead = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    await service.delete_task(db, task_id, current_user.id)
     return {'detail': 'Task successfully deleted'}
 
 
 @router.patch('/{task_id}/complete', response_model=TaskRead)
-def complete_task(task_id: int,
-                  current_user: UserRead = Depends(get_current_user),
-                  db: Session = Depends(get_db)):
-    return service.mark_task_as_completed(db, task_id, current_user.id)
+async def complete_task(task_id: int,
+                        response: Response,
+                        if_match: str | None = Header(None),
+                        current_user: UserRead = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    task = await service.mark_task_as_completed(
+        db, task_id, current_user.id, if_match_versions(if_match, task_id)
+    )
+    response.headers['ETag'] = task_etag(task.id, task.version)
+    return task
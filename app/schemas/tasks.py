@@ -1,5 +1,7 @@
-from pydantic import BaseModel, ConfigDict
-from app.enums import TaskStatus
+from typing import List
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from app.config import BULK_MAX_ITEMS
+from app.enums import BulkItemResult, TaskStatus
 
 
 class TaskBase(BaseModel):
@@ -29,3 +31,71 @@ class TaskUpdate(BaseModel):
 
 class TaskStatusUpdate(BaseModel):
     status: TaskStatus
+
+
+class TaskBulkCreate(BaseModel):
+    items: List[TaskCreate] = Field(
+        ..., min_length=1, max_length=BULK_MAX_ITEMS
+    )
+
+
+class TaskBulkStatusItem(BaseModel):
+    id: int
+    status: TaskStatus
+
+
+class TaskBulkStatusUpdate(BaseModel):
+    items: List[TaskBulkStatusItem] = Field(
+        ..., min_length=1, max_length=BULK_MAX_ITEMS
+    )
+
+    @field_validator('items')
+    @classmethod
+    def check_unique_ids(cls, items):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError('Task IDs must be unique')
+        return items
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkResult(BaseModel):
+    id: int
+    result: BulkItemResult
+    task: TaskRead | None = None
+
+
+class TaskImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TaskImportReport(BaseModel):
+    inserted: int = 0
+    rejected: int = 0
+    errors: List[TaskImportError] = []
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+
+class TaskChanges(BaseModel):
+    tasks: List[TaskRead] = []
+    deleted: List[int] = []
+    watermark: int
+    has_more: bool = False
+
+
+class TaskStats(BaseModel):
+    new: int = 0
+    in_progress: int = 0
+    completed: int = 0
+    total: int = 0
+
+
+class TaskCounterDrift(BaseModel):
+    user_id: int
+    status: TaskStatus
+    counted: int
+    actual: int
@@ -1,30 +1,43 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from app.models import User
-from app.schemas.auth import UserCreate
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.schemas.auth import UserCreate, UserRead
+from app.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL_SECONDS,
+    JWT_EMBED_USER
+)
 from datetime import datetime, timedelta, timezone
 import jwt
-from passlib.context import CryptContext
-from app.database import get_db
+from app.database import SessionLocal, dialect_insert, engine, get_read_db
+from app.cache import TTLCache
+from app.hashing import hash_password, verify_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# Not invalidated on writes: every worker has its own cache, so a change to
+# a user (made by this app or directly in the database) is only picked up
+# once its entry is older than USER_CACHE_TTL_SECONDS.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
 
 
-def get_user_by_id(db: Session, user_id: int):
+async def get_user_by_id(db: AsyncSession, user_id: int):
     """
     Retrieve a user from the database by their ID.
 
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         user_id (int): The ID of the user to retrieve.
 
     Returns:
         User: The user object if found, raises 404 if not found.
     """
-    db_user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    db_user = result.scalars().first()
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -33,22 +46,21 @@ def get_user_by_id(db: Session, user_id: int):
     return db_user
 
 
-def get_user_by_username(db: Session, username: str):
+async def get_user_by_username(db: AsyncSession, username: str):
     """
     Retrieve a user from the database by their username.
 
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         username (str): The username of the user to retrieve.
 
     Returns:
         User: The user object if found, raises 404 if not found.
     """
-    db_user = (
-        db.query(User)
-        .filter(User.username == username)
-        .first()
+    result = await db.execute(
+        select(User).where(User.username == username)
     )
+    db_user = result.scalars().first()
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,6 +69,27 @@ def get_user_by_username(db: Session, username: str):
     return db_user
 
 
+def get_token_data(user: User) -> dict:
+    """
+    Build the JWT payload identifying a user.
+
+    Args:
+        user (User): The authenticated user.
+
+    Returns:
+        dict: Token payload with the username as subject, plus the UserRead
+        fields when JWT_EMBED_USER is enabled.
+    """
+    data = {"sub": user.username}
+    if JWT_EMBED_USER:
+        data.update({
+            "uid": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name
+        })
+    return data
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """
     Create a JWT access token for user authentication.
@@ -82,17 +115,24 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme),
-                     db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: AsyncSession = Depends(get_read_db)):
     """
     Retrieve the current user based on the provided JWT token.
 
+    The user is taken from the token claims when JWT_EMBED_USER is enabled,
+    otherwise from the per-process user cache, and only hits the database
+    on a cache miss, so changes to the user may take up to
+    USER_CACHE_TTL_SECONDS to show. That lookup may run on a read replica;
+    a user missing there (e.g. registered a moment ago) is looked up on the
+    primary.
+
     Args:
         token (str): The JWT token from the request.
-        db (Session): Database session.
+        db (AsyncSession): Database session.
 
     Returns:
-        User: The current user object if valid, raises 401 if invalid.
+        UserRead: The current user if valid, raises 401 if invalid.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -114,55 +154,76 @@ def get_current_user(token: str = Depends(oauth2_scheme),
     except jwt.InvalidTokenError:
         raise credentials_exception
 
-    user = get_user_by_username(db, username=username)
+    if JWT_EMBED_USER and "uid" in payload:
+        return UserRead(id=payload["uid"],
+                        username=username,
+                        first_name=payload.get("first_name"),
+                        last_name=payload.get("last_name"))
+
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        try:
+            db_user = await get_user_by_username(db, username=username)
+        except HTTPException:
+            if db.bind is engine:
+                raise
+            async with SessionLocal() as primary:
+                db_user = await get_user_by_username(primary,
+                                                     username=username)
+        user = UserRead.model_validate(db_user)
+        user_cache.set(username, user)
 
     return user
 
 
-def register_user(db: Session, user: UserCreate):
+async def register_user(db: AsyncSession, user: UserCreate):
     """
     Create a new user in the database.
 
+    Uses INSERT ... ON CONFLICT DO NOTHING RETURNING, so a duplicate
+    username is detected by the database in the same round-trip and two
+    concurrent registrations cannot both succeed.
+
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         user (UserCreate): User data for registration.
 
     Returns:
         User: The newly created user object, raises 400 if username already
         exists.
     """
-    existing_user = (
-        db.query(User)
-        .filter(User.username == user.username)
-        .first()
+    hashed_password = await hash_password(user.password)
+    result = await db.execute(
+        dialect_insert(db, User)
+        .values(
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            password=hashed_password
+        )
+        .on_conflict_do_nothing(index_elements=[User.username])
+        .returning(User)
     )
-    if existing_user:
+    db_user = result.scalar_one_or_none()
+    if db_user is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-
-    hashed_password = pwd_context.hash(user.password)
-    db_user = User(
-        first_name=user.first_name,
-        last_name=user.last_name,
-        username=user.username,
-        password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """
     Authenticate a user based on username and password.
 
+    If the stored hash uses outdated bcrypt parameters, it is replaced with
+    a fresh hash of the verified password.
+
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         username (str): The username of the user.
         password (str): The password of the user.
 
@@ -170,11 +231,21 @@ def authenticate_user(db: Session, username: str, password: str):
         User: The authenticated user object, raises 401 if credentials are
         invalid.
     """
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not pwd_context.verify(password, user.password):
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_password(password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if new_hash:
+        await db.execute(
+            update(User).where(User.id == user.id).values(password=new_hash)
+        )
+        await db.commit()
     return user
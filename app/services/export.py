@@ -0,0 +1,70 @@
+import csv
+import io
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy import select
+
+from app.config import EXPORT_BATCH_SIZE
+from app.database import SessionLocal
+from app.enums import TransferFormat
+from app.models import Task
+
+EXPORT_COLUMNS = ('id', 'title', 'description', 'status', 'user_id')
+
+MEDIA_TYPES = {
+    TransferFormat.NDJSON: 'application/x-ndjson',
+    TransferFormat.CSV: 'text/csv',
+}
+
+
+def _encode_ndjson(rows) -> bytes:
+    return b''.join(
+        orjson.dumps(dict(zip(EXPORT_COLUMNS, row)),
+                     option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_user_tasks(user_id: int,
+                            fmt: TransferFormat) -> AsyncIterator[bytes]:
+    """
+    Stream all tasks of a user as NDJSON lines or CSV rows.
+
+    Rows are fetched through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE and encoded batch by batch, so memory use does not
+    depend on the number of tasks. The generator opens its own session
+    because request dependencies are closed before a streaming body is
+    sent.
+
+    Args:
+        user_id (int): The ID of the user whose tasks to export.
+        fmt (TransferFormat): Output format.
+
+    Yields:
+        bytes: Encoded chunks of the export.
+    """
+    encode = _encode_csv if fmt == TransferFormat.CSV else _encode_ndjson
+    if fmt == TransferFormat.CSV:
+        yield _encode_csv([EXPORT_COLUMNS])
+
+    query = (
+        select(Task.id, Task.title, Task.description, Task.status,
+               Task.user_id)
+        .where(Task.user_id == user_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async with SessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield encode(
+                (id_, title, description, status.value, owner_id)
+                for id_, title, description, status, owner_id in partition
+            )
@@ -0,0 +1,286 @@
+import codecs
+import csv
+import json
+import time
+from collections import deque
+from typing import AsyncIterable, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_MAX_RECORD_LENGTH,
+    IMPORT_MAX_REPORTED_ERRORS
+)
+from app.enums import TransferFormat
+from app.events import publish_import_event
+from app.models import Task
+from app.schemas.tasks import TaskCreate, TaskImportError, TaskImportReport
+
+COPY_COLUMNS = ('title', 'description', 'status', 'user_id')
+
+
+class RecordTooLong(ValueError):
+    pass
+
+
+class LineBuffer:
+    """
+    Incrementally split a byte stream into lines, iterated by `csv.reader`
+    or directly for NDJSON.
+
+    No more than `max_length` characters of a line are kept: the rest of a
+    longer line is dropped as it arrives and reading it raises
+    `RecordTooLong`, as does reading past `max_length` characters within
+    one record (e.g. a CSV field whose quote is never closed). Callers
+    reset `record_length` when a record starts.
+
+    Args:
+        max_length (int): Longest record, in characters.
+    """
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+        self.line_no = 0
+        self.record_length = 0
+        self.buffered = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._lines = deque()
+        self._pending = ''
+        self._skipping = False
+        self._final = False
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            if self._final:
+                raise StopIteration
+            raise RecordTooLong(
+                f'Record longer than {self.max_length} characters'
+            )
+        line = self._lines.popleft()
+        self.line_no += 1
+        if line is None:
+            raise RecordTooLong(
+                f'Line longer than {self.max_length} characters'
+            )
+        self.buffered -= len(line)
+        self.record_length += len(line) + 1
+        if self.record_length > self.max_length:
+            raise RecordTooLong(
+                f'Record longer than {self.max_length} characters'
+            )
+        return line + '\n'
+
+    def _push(self, line: str | None) -> None:
+        if line is not None and len(line) > self.max_length:
+            line = None
+        self._lines.append(line)
+        if line is not None:
+            self.buffered += len(line)
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        """
+        Consume a chunk of the stream.
+        """
+        *lines, rest = self._decoder.decode(data, final).split('\n')
+        for line in lines:
+            self._push(None if self._skipping else self._pending + line)
+            self._pending, self._skipping = '', False
+
+        if not self._skipping:
+            self._pending += rest
+            if len(self._pending) > self.max_length:
+                self._pending, self._skipping = '', True
+
+        if final:
+            self._final = True
+            if self._pending or self._skipping:
+                self._push(None if self._skipping else self._pending)
+            self._pending, self._skipping = '', False
+
+
+def _next_record(reader, lines: LineBuffer) -> tuple[int, object]:
+    line = lines.line_no + 1
+    lines.record_length = 0
+    try:
+        return line, next(reader)
+    except (RecordTooLong, csv.Error) as exc:
+        return line, exc
+
+
+async def iter_records(chunks: AsyncIterable[bytes],
+                       fmt: TransferFormat,
+                       max_length: int = IMPORT_MAX_RECORD_LENGTH
+                       ) -> AsyncIterator[tuple[int, object]]:
+    """
+    Yield the records of a streamed upload with their line numbers.
+
+    CSV is read by a single `csv.reader`, so quoted fields may span lines
+    and quotes inside unquoted fields are kept as written. A record is
+    only read once `max_length` characters are buffered (or the upload
+    ended), so a record that does not fit is always too long, and memory
+    stays bounded by `max_length` plus one chunk.
+
+    Args:
+        chunks (AsyncIterable[bytes]): Raw body of the upload.
+        fmt (TransferFormat): Format of the upload.
+        max_length (int): Longest record accepted, in characters.
+
+    Yields:
+        tuple[int, object]: Line number where the record starts, and the
+        line (NDJSON), the list of values (CSV) or the error that made the
+        record unreadable.
+    """
+    lines = LineBuffer(max_length)
+    reader = csv.reader(lines) if fmt == TransferFormat.CSV else lines
+    async for chunk in chunks:
+        lines.feed(chunk)
+        while lines.buffered >= max_length:
+            yield _next_record(reader, lines)
+    lines.feed(b'', final=True)
+    while lines:
+        yield _next_record(reader, lines)
+
+
+class TaskParser:
+    """
+    Turn NDJSON or CSV records into `TaskCreate` models.
+
+    Args:
+        fmt (TransferFormat): Format of the records.
+    """
+
+    def __init__(self, fmt: TransferFormat):
+        self.fmt = fmt
+        self.header = None
+
+    def parse(self, record: str | list[str]) -> TaskCreate | None:
+        """
+        Parse one NDJSON line or CSV row, returns None for blank lines and
+        the CSV header.
+
+        Raises:
+            ValueError: If the record is malformed or fails validation.
+        """
+        if self.fmt == TransferFormat.NDJSON:
+            if not record.strip():
+                return None
+            data = json.loads(record)
+        else:
+            if not record:
+                return None
+            if self.header is None:
+                self.header = record
+                return None
+            data = {
+                key: value
+                for key, value in zip(self.header, record)
+                if value != ''
+            }
+
+        if not isinstance(data, dict):
+            raise ValueError('Expected an object')
+        return TaskCreate.model_validate(data)
+
+
+def _format_error(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return '; '.join(
+            f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+            for err in exc.errors()
+        )
+    return str(exc)
+
+
+async def _write_chunk(db: AsyncSession, rows: list[dict]):
+    """
+    Insert validated rows with COPY on PostgreSQL, or executemany elsewhere.
+    """
+    # One summary event per chunk rather than one per imported task
+    await publish_import_event(db, rows[0]['user_id'], len(rows))
+    if db.get_bind().dialect.name == 'postgresql':
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Task.__tablename__,
+            records=[
+                tuple(row[column] for column in COPY_COLUMNS)
+                for row in rows
+            ],
+            columns=COPY_COLUMNS
+        )
+    else:
+        await db.execute(insert(Task), rows)
+    await db.commit()
+
+
+async def import_tasks(db: AsyncSession,
+                       chunks: AsyncIterable[bytes],
+                       fmt: TransferFormat,
+                       user_id: int) -> TaskImportReport:
+    """
+    Import tasks from a streamed NDJSON or CSV upload.
+
+    Records are validated against `TaskCreate` and written in chunks of
+    IMPORT_CHUNK_SIZE, each in its own transaction, so memory use is bounded
+    by the chunk size and IMPORT_MAX_RECORD_LENGTH rather than the upload
+    size. Invalid and oversized records are reported and skipped without
+    aborting the load.
+
+    Args:
+        db (AsyncSession): Database session.
+        chunks (AsyncIterable[bytes]): Raw body of the upload.
+        fmt (TransferFormat): Format of the upload.
+        user_id (int): The ID of the user the tasks are created for.
+
+    Returns:
+        TaskImportReport: Number of inserted and rejected records, the first
+        IMPORT_MAX_REPORTED_ERRORS errors and the ingest throughput.
+    """
+    started = time.perf_counter()
+    report = TaskImportReport()
+    parser = TaskParser(fmt)
+    rows = []
+
+    async for line, record in iter_records(chunks, fmt):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            task = parser.parse(record)
+        except (ValueError, csv.Error) as exc:
+            report.rejected += 1
+            if len(report.errors) < IMPORT_MAX_REPORTED_ERRORS:
+                report.errors.append(
+                    TaskImportError(line=line, error=_format_error(exc))
+                )
+            continue
+
+        if task is None:
+            continue
+        rows.append({
+            'title': task.title,
+            'description': task.description,
+            'status': task.status.name,
+            'user_id': user_id
+        })
+        if len(rows) >= IMPORT_CHUNK_SIZE:
+            await _write_chunk(db, rows)
+            report.inserted += len(rows)
+            rows = []
+
+    if rows:
+        await _write_chunk(db, rows)
+        report.inserted += len(rows)
+
+    report.elapsed_seconds = time.perf_counter() - started
+    if report.elapsed_seconds:
+        report.rows_per_second = report.inserted / report.elapsed_seconds
+    return report
@@ -0,0 +1,119 @@
+import math
+
+from fastapi import HTTPException, status
+from sqlalchemy import column, func, literal_column, or_, and_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Task
+from app.pagination import (
+    encode_cursor,
+    decode_cursor,
+    decode_cursor_id,
+    invalid_cursor
+)
+from app.serialization import TASK_LIST_COLUMNS
+
+tasks_fts = table('tasks_fts', column('rowid'))
+
+
+def _fts5_query(q: str) -> str:
+    """
+    Quote every word of `q` so FTS5 matches them all as plain terms.
+    """
+    return ' '.join('"{}"'.format(word.replace('"', '""'))
+                    for word in q.split())
+
+
+def _ranked_matches(dialect: str, q: str, user_id: int):
+    """
+    Select the tasks of a user matching `q` with their relevance, higher
+    is better.
+    """
+    if dialect == 'postgresql':
+        query = func.plainto_tsquery('english', q)
+        vector = literal_column('tasks.search_vector')
+        rank = func.ts_rank_cd(vector, query)
+        return (
+            select(*TASK_LIST_COLUMNS, rank.label('rank'))
+            .where(Task.user_id == user_id, vector.op('@@')(query))
+        )
+
+    rank = -func.bm25(literal_column('tasks_fts'))
+    return (
+        select(*TASK_LIST_COLUMNS, rank.label('rank'))
+        .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+        .where(
+            Task.user_id == user_id,
+            literal_column('tasks_fts').op('MATCH')(_fts5_query(q))
+        )
+    )
+
+
+async def search_tasks(db: AsyncSession,
+                       user_id: int,
+                       q: str,
+                       limit: int = 10,
+                       after: str | None = None):
+    """
+    Full-text search over the title and description of a user's tasks.
+
+    Matches are ordered by relevance, then by ID, and paged by keyset on
+    (rank, id). PostgreSQL ranks with `ts_rank_cd` over the GIN-indexed
+    `search_vector` column, SQLite with `bm25` over the `tasks_fts` table.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): The ID of the user whose tasks are searched.
+        q (str): Words that must all occur in a task.
+        limit (int): The number of tasks per page.
+        after (str | None): Opaque cursor returned with the previous page.
+
+    Returns:
+        List[Row]: Rows of TASK_LIST_COLUMNS followed by the rank.
+
+    Raises:
+        HTTPException: If the query is empty, limit is less than or equal
+        to 0 or the cursor is invalid.
+    """
+    if not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must not be empty"
+        )
+    if limit <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be greater than 0"
+        )
+
+    matches = _ranked_matches(
+        db.get_bind().dialect.name, q, user_id
+    ).subquery()
+    query = select(matches).order_by(matches.c.rank.desc(), matches.c.id)
+
+    if after is not None:
+        cursor = decode_cursor(after)
+        last_id = decode_cursor_id(cursor)
+        last_rank = cursor.get('rank')
+        if type(last_rank) is not float or not math.isfinite(last_rank):
+            raise invalid_cursor()
+        query = query.where(or_(
+            matches.c.rank < last_rank,
+            and_(matches.c.rank == last_rank, matches.c.id > last_id)
+        ))
+
+    result = await db.execute(query.limit(limit))
+    return result.all()
+
+
+def get_next_search_cursor(rows: list, limit: int):
+    """
+    Build the cursor pointing past the last match of a page.
+
+    Returns:
+        str | None: Cursor for the next page, or None if this page was the
+        last one.
+    """
+    if len(rows) < limit:
+        return None
+    return encode_cursor({'rank': rows[-1].rank, 'id': rows[-1].id})
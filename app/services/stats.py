@@ -0,0 +1,86 @@
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Task, TaskCounter
+from app.schemas.tasks import TaskCounterDrift, TaskStats
+
+
+async def get_task_stats(db: AsyncSession, user_id: int) -> TaskStats:
+    """
+    Count the tasks of a user per status.
+
+    Reads the few `task_counters` rows of the user instead of counting
+    `tasks`, so the cost does not grow with the number of tasks.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): The ID of the user whose tasks are counted.
+
+    Returns:
+        TaskStats: Number of tasks per status and in total.
+    """
+    result = await db.execute(
+        select(TaskCounter.status, TaskCounter.count)
+        .where(TaskCounter.user_id == user_id)
+    )
+    stats = TaskStats()
+    for task_status, count in result:
+        setattr(stats, task_status.name.lower(), count)
+        stats.total += count
+    return stats
+
+
+async def reconcile_task_counters(db: AsyncSession,
+                                  apply: bool = True
+                                  ) -> list[TaskCounterDrift]:
+    """
+    Compare `task_counters` with the actual task counts and rebuild it.
+
+    On PostgreSQL, `tasks` is locked against writes for the duration, so
+    no write slips in between counting and rebuilding.
+
+    Args:
+        db (AsyncSession): Database session.
+        apply (bool): Rebuild the counters; when False only report drift.
+
+    Returns:
+        List[TaskCounterDrift]: Counters that differed from the tasks.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        await db.execute(text('LOCK TABLE tasks IN SHARE MODE'))
+
+    actual_query = (
+        select(Task.user_id, Task.status, func.count())
+        .group_by(Task.user_id, Task.status)
+    )
+    actual = {
+        (user_id, task_status): count
+        for user_id, task_status, count in await db.execute(actual_query)
+    }
+    counted = {
+        (user_id, task_status): count
+        for user_id, task_status, count in await db.execute(
+            select(TaskCounter.user_id, TaskCounter.status,
+                   TaskCounter.count)
+        )
+    }
+
+    drift = []
+    for user_id, task_status in sorted(actual.keys() | counted.keys(),
+                                       key=lambda key: (key[0], key[1].name)):
+        key = (user_id, task_status)
+        if counted.get(key, 0) != actual.get(key, 0):
+            drift.append(TaskCounterDrift(
+                user_id=user_id,
+                status=task_status,
+                counted=counted.get(key, 0),
+                actual=actual.get(key, 0)
+            ))
+
+    if apply and drift:
+        await db.execute(delete(TaskCounter))
+        await db.execute(insert(TaskCounter).from_select(
+            ['user_id', 'status', 'count'], actual_query
+        ))
+    await db.commit()
+    return drift
@@ -1,17 +1,57 @@
-from sqlalchemy.orm import Session
+import json
+from collections import defaultdict
+
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    Text,
+    cast,
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    null,
+    select,
+    text,
+    true,
+    union_all,
+    update
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
-from app.models import Task
-from app.schemas.tasks import TaskCreate, TaskUpdate
-from app.enums import TaskStatus
-
-
-def get_task_by_id(db: Session, task_id: int, user_id: int):
+from app.models import (
+    CHANGE_SEQ_XACT_BITS,
+    MAX_CHANGE_SEQ,
+    Task,
+    TaskTombstone
+)
+from app.schemas.tasks import (
+    TaskChanges,
+    TaskCreate,
+    TaskUpdate,
+    TaskBulkStatusItem,
+    TaskBulkResult
+)
+from app.cache import TTLCache
+from app.config import CHANGES_MAX_LIMIT, TOTAL_COUNT_CACHE_TTL_SECONDS
+from app.enums import BulkItemResult, CountMode, TaskEventType, TaskStatus
+from app.etags import task_etag
+from app.events import publish_task_events, task_event
+from app.pagination import encode_cursor, decode_cursor, decode_cursor_id
+
+# Keyed by the status filter, so it never holds more than a few entries
+total_count_cache = TTLCache(maxsize=len(TaskStatus) + 1,
+                             ttl=TOTAL_COUNT_CACHE_TTL_SECONDS)
+
+
+async def get_task_by_id(db: AsyncSession, task_id: int, user_id: int):
     """
     Retrieve a task from the database by its ID and associated user ID.
 
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         task_id (int): The ID of the task to retrieve.
         user_id (int): The ID of the user to validate ownership.
 
@@ -19,11 +59,10 @@ def get_task_by_id(db: Session, task_id: int, user_id: int):
         Task: The task object if found, raises 404 if not found or not owned
         by user.
     """
-    task = (
-        db.query(Task)
-        .filter(Task.id == task_id, Task.user_id == user_id)
-        .first()
+    result = await db.execute(
+        select(Task).where(Task.id == task_id, Task.user_id == user_id)
     )
+    task = result.scalars().first()
 
     if not task:
         raise HTTPException(
@@ -33,27 +72,66 @@ def get_task_by_id(db: Session, task_id: int, user_id: int):
     return task
 
 
-def get_tasks(db: Session,
-              page: int = 1,
-              limit: int = 10,
-              status: TaskStatus | None = None):
+async def get_task_version(db: AsyncSession, task_id: int, user_id: int):
+    """
+    Retrieve only the version of a task, for cheap conditional requests.
+
+    Args:
+        db (AsyncSession): Database session.
+        task_id (int): The ID of the task.
+        user_id (int): The ID of the user to validate ownership.
+
+    Returns:
+        int: The current version of the task, raises 404 if not found or
+        not owned by user.
+    """
+    result = await db.execute(
+        select(Task.version).where(Task.id == task_id,
+                                   Task.user_id == user_id)
+    )
+    version = result.scalar()
+
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return version
+
+
+async def get_tasks(db: AsyncSession,
+                    page: int = 1,
+                    limit: int = 10,
+                    status: TaskStatus | None = None,
+                    after: str | None = None,
+                    columns: tuple | None = None):
     """
     Retrieve a paginated list of tasks from the database.
 
+    Tasks are ordered by ID. When `after` is given, the page starts right
+    after the task encoded in the cursor (keyset pagination) and `page` is
+    ignored, so deep pages cost the same as the first one.
+
+    When `columns` is given, only those columns are selected and rows are
+    returned instead of `Task` objects.
+
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         page (int): The page number for pagination.
         limit (int): The number of tasks per page.
         status (TaskStatus | None): Optional filter for task status.
+        after (str | None): Opaque cursor returned with the previous page.
+        columns (tuple | None): Optional `Task` columns to select.
 
     Returns:
-        List[Task]: A list of task objects.
+        List[Task] | List[Row]: A list of task objects, or rows of the
+        selected columns.
 
     Raises:
-        HTTPException: If the page is less than 1 or limit is less than or
-        equal to 0.
+        HTTPException: If the page is less than 1, limit is less than or
+        equal to 0 or the cursor is invalid.
     """
-    query = db.query(Task)
+    query = select(*columns) if columns else select(Task)
 
     if page < 1:
         raise HTTPException(
@@ -67,118 +145,508 @@ def get_tasks(db: Session,
         )
 
     if status:
-        query = query.filter(Task.status == status)
+        query = query.where(Task.status == status)
+
+    query = query.order_by(Task.id)
+    if after is not None:
+        last_id = decode_cursor_id(decode_cursor(after))
+        query = query.where(Task.id > last_id)
+    else:
+        query = query.offset((page - 1) * limit)
 
-    tasks = query.offset((page - 1) * limit).limit(limit).all()
-    return tasks
+    result = await db.execute(query.limit(limit))
+    return result.all() if columns else result.scalars().all()
 
 
-def get_user_tasks(db: Session, user_id: int):
+def get_next_cursor(tasks: list, limit: int):
     """
-    Retrieve all tasks associated with a specific user.
+    Build the cursor pointing past the last task of a page.
 
     Args:
-        db (Session): Database session.
+        tasks (list): Tasks or rows returned for the current page.
+        limit (int): The requested page size.
+
+    Returns:
+        str | None: Cursor for the next page, or None if this page was the
+        last one.
+    """
+    if len(tasks) < limit:
+        return None
+    return encode_cursor({'id': tasks[-1].id})
+
+
+async def count_tasks(db: AsyncSession,
+                      status: TaskStatus | None = None,
+                      mode: CountMode = CountMode.EXACT):
+    """
+    Count the tasks listed by `get_tasks` for a status filter.
+
+    `exact` runs COUNT(*). `cached` reuses an exact count for up to
+    TOTAL_COUNT_CACHE_TTL_SECONDS. `estimated` reads the PostgreSQL planner
+    statistics (`reltuples` without a filter, the row estimate of EXPLAIN
+    with one) and costs no table access; it falls back to an exact count
+    on other databases or while the table has never been analyzed.
+
+    Args:
+        db (AsyncSession): Database session.
+        status (TaskStatus | None): Optional filter for task status.
+        mode (CountMode): Accuracy/cost tradeoff.
+
+    Returns:
+        tuple[int, CountMode]: The count and the mode that produced it.
+    """
+    if mode == CountMode.ESTIMATED:
+        estimate = await _estimate_task_count(db, status)
+        if estimate is not None:
+            return estimate, CountMode.ESTIMATED
+        mode = CountMode.EXACT
+
+    if mode == CountMode.CACHED:
+        count = total_count_cache.get(status)
+        if count is not None:
+            return count, CountMode.CACHED
+
+    query = select(func.count()).select_from(Task)
+    if status:
+        query = query.where(Task.status == status)
+    count = (await db.execute(query)).scalar_one()
+    total_count_cache.set(status, count)
+    return count, CountMode.EXACT
+
+
+async def _estimate_task_count(db: AsyncSession,
+                               status: TaskStatus | None):
+    """
+    Row count estimate from PostgreSQL planner statistics, or None.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != 'postgresql':
+        return None
+
+    if status is None:
+        reltuples = (await db.execute(text(
+            "SELECT reltuples FROM pg_class WHERE oid = 'tasks'::regclass"
+        ))).scalar_one()
+        return int(reltuples) if reltuples >= 0 else None
+
+    # The status is a validated enum member, so it is safe to inline
+    query = select(Task.id).where(Task.status == status).compile(
+        dialect=dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = (await db.execute(
+        text(f'EXPLAIN (FORMAT JSON) {query}')
+    )).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+async def get_user_tasks(db: AsyncSession,
+                         user_id: int,
+                         columns: tuple | None = None):
+    """
+    Retrieve all tasks associated with a specific user, ordered by ID.
+
+    Args:
+        db (AsyncSession): Database session.
         user_id (int): The ID of the user whose tasks to retrieve.
+        columns (tuple | None): Optional `Task` columns to select.
 
     Returns:
-        List[Task]: A list of tasks associated with the user.
+        List[Task] | List[Row]: A list of tasks associated with the user,
+        or rows of the selected columns.
+    """
+    query = select(*columns) if columns else select(Task)
+    result = await db.execute(
+        query.where(Task.user_id == user_id).order_by(Task.id)
+    )
+    return result.all() if columns else result.scalars().all()
+
+
+def _change_seq_horizon():
     """
-    tasks = db.query(Task).filter(Task.user_id == user_id).all()
-    return tasks
+    Lowest change_seq a still running PostgreSQL transaction may write: the
+    oldest transaction ID in the statement's snapshot, shifted like the
+    positions written by `track_task_changes()`.
+    """
+    xmin = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    return cast(cast(xmin, Text), BigInteger).op('<<')(
+        literal(CHANGE_SEQ_XACT_BITS, Integer)
+    )
 
 
-def create_task(db: Session, task_data: TaskCreate, user_id: int):
+async def get_task_changes(db: AsyncSession,
+                           user_id: int,
+                           since: int = 0,
+                           limit: int = 100) -> TaskChanges:
+    """
+    Retrieve the tasks of a user changed or deleted after a watermark.
+
+    Changed tasks and tombstones are read in change order from their
+    (user_id, change_seq) indexes in a single statement, so the cost
+    depends on the number of changes rather than the number of tasks. A
+    task changed several times since the watermark is returned once.
+
+    On PostgreSQL only changes of transactions older than the oldest one
+    still running are returned, so a write that commits late can never
+    end up below a watermark already handed out. Changes therefore show up
+    once every transaction that started before them has ended.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): The ID of the user whose changes to return.
+        since (int): Watermark returned by the previous sync, 0 for all.
+        limit (int): Maximum number of changes to return.
+
+    Returns:
+        TaskChanges: Changed tasks, IDs of deleted tasks, the watermark to
+        pass next time and whether more changes are waiting.
+
+    Raises:
+        HTTPException: If since is not between 0 and MAX_CHANGE_SEQ or
+        limit is not between 1 and CHANGES_MAX_LIMIT.
+    """
+    if not 0 <= since <= MAX_CHANGE_SEQ:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Watermark must be between 0 and {MAX_CHANGE_SEQ}"
+        )
+    if not 0 < limit <= CHANGES_MAX_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Limit must be between 1 and {CHANGES_MAX_LIMIT}"
+        )
+
+    task_filter = [Task.user_id == user_id, Task.change_seq > since]
+    tombstone_filter = [TaskTombstone.user_id == user_id,
+                        TaskTombstone.change_seq > since]
+    if db.get_bind().dialect.name == 'postgresql':
+        task_filter.append(Task.change_seq < _change_seq_horizon())
+        tombstone_filter.append(
+            TaskTombstone.change_seq < _change_seq_horizon()
+        )
+
+    changed = (
+        select(Task.id, Task.title, Task.description, Task.status,
+               Task.user_id, Task.change_seq, false().label('deleted'))
+        .where(*task_filter)
+        .order_by(Task.change_seq)
+        .limit(limit + 1)
+        .subquery()
+    )
+    deleted = (
+        # Typed NULLs, PostgreSQL cannot unite untyped ones with the enum
+        select(TaskTombstone.task_id,
+               cast(null(), Task.title.type).label('title'),
+               cast(null(), Task.description.type).label('description'),
+               cast(null(), Task.status.type).label('status'),
+               TaskTombstone.user_id, TaskTombstone.change_seq,
+               true().label('deleted'))
+        .where(*tombstone_filter)
+        .order_by(TaskTombstone.change_seq)
+        .limit(limit + 1)
+        .subquery()
+    )
+    changes = union_all(select(changed), select(deleted)).subquery()
+    result = await db.execute(
+        select(changes).order_by(changes.c.change_seq).limit(limit + 1)
+    )
+    rows = result.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return TaskChanges(
+        tasks=[
+            {'id': row.id, 'title': row.title,
+             'description': row.description, 'status': row.status,
+             'user_id': row.user_id}
+            for row in rows if not row.deleted
+        ],
+        deleted=[row.id for row in rows if row.deleted],
+        watermark=rows[-1].change_seq if rows else since,
+        has_more=has_more
+    )
+
+
+async def create_task(db: AsyncSession,
+                      task_data: TaskCreate,
+                      user_id: int):
     """
     Create a new task in the database.
 
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         task_data (TaskCreate): Task data for the new task.
         user_id (int): The ID of the user creating the task.
 
     Returns:
         Task: The newly created task object.
     """
-    new_task = Task(**task_data.model_dump(), user_id=user_id)
-    db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    result = await db.execute(
+        insert(Task)
+        .values(**task_data.model_dump(), user_id=user_id)
+        .returning(Task)
+    )
+    new_task = result.scalar_one()
+    await publish_task_events(db, user_id, [
+        task_event(TaskEventType.CREATED, new_task.id, new_task.version)
+    ])
+    await db.commit()
     return new_task
 
 
-def update_task(db: Session,
-                task_id: int,
-                task_data: TaskUpdate,
-                user_id: int):
+async def update_task(db: AsyncSession,
+                      task_id: int,
+                      task_data: TaskUpdate,
+                      user_id: int,
+                      versions: list[int] | None = None):
     """
     Update an existing task in the database.
 
+    The ownership check, the version check, the write and the version bump
+    happen in a single compare-and-swap UPDATE ... RETURNING statement.
+    No explicit lock is taken: writers only wait on the row lock of the
+    same task (and on the status counter row of the same user when the
+    status changes) until the other transaction commits.
+
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         task_id (int): The ID of the task to update.
         task_data (TaskUpdate): New data for the task.
         user_id (int): The ID of the user updating the task.
+        versions (list[int] | None): Versions the client expects the task
+            to be at (from If-Match), None to accept any.
 
     Returns:
         Task: The updated task object, raises 404 if task not found or not
-        owned by user.
+        owned by user, 412 if its version is not one of `versions`.
     """
-    task = get_task_by_id(db, task_id, user_id)
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
+    result = await db.execute(
+        _versioned_update(task_id, user_id, versions)
+        .values(
+            **task_data.model_dump(exclude_unset=True),
+            version=Task.version + 1
         )
-
-    update_data = task_data.model_dump(exclude_unset=True)
-    for k, v in update_data.items():
-        setattr(task, k, v)
-    db.commit()
-    db.refresh(task)
-    return task
+        .returning(Task)
+    )
+    return await _commit_returned_task(db, result.scalar_one_or_none(),
+                                       TaskEventType.UPDATED,
+                                       task_id, user_id, versions)
 
 
-def delete_task(db: Session, task_id: int, user_id: int):
+async def delete_task(db: AsyncSession, task_id: int, user_id: int):
     """
     Delete an existing task from the database.
 
     Args:
-        db (Session): Database session.
+        db (AsyncSession): Database session.
         task_id (int): The ID of the task to delete.
         user_id (int): The ID of the user deleting the task.
 
     Raises:
         HTTPException: If the task is not found or not owned by user.
     """
-    task = get_task_by_id(db, task_id, user_id)
-    if not task:
+    result = await db.execute(
+        delete(Task).where(Task.id == task_id, Task.user_id == user_id)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
+    await publish_task_events(db, user_id, [
+        task_event(TaskEventType.DELETED, task_id)
+    ])
+    await db.commit()
 
-    db.delete(task)
-    db.commit()
 
-
-def mark_task_as_completed(db: Session, task_id: int, user_id: int):
+async def mark_task_as_completed(db: AsyncSession,
+                                 task_id: int,
+                                 user_id: int,
+                                 versions: list[int] | None = None):
     """
     Mark a task as completed in the database.
 
     Args:
-        db (Session): Database session for executing the update.
+        db (AsyncSession): Database session for executing the update.
         task_id (int): The ID of the task to be marked as completed.
         user_id (int): The ID of the user who owns the task.
+        versions (list[int] | None): Versions the client expects the task
+            to be at (from If-Match), None to accept any.
 
     Returns:
         Task: The updated task object with the new status.
 
     Raises:
-        HTTPException: If the task is not found or does not belong to the user.
+        HTTPException: If the task is not found or does not belong to the
+        user (404), or its version is not one of `versions` (412).
+    """
+    result = await db.execute(
+        _versioned_update(task_id, user_id, versions)
+        .values(status=TaskStatus.COMPLETED, version=Task.version + 1)
+        .returning(Task)
+    )
+    return await _commit_returned_task(db, result.scalar_one_or_none(),
+                                       TaskEventType.COMPLETED,
+                                       task_id, user_id, versions)
+
+
+def _versioned_update(task_id: int, user_id: int,
+                      versions: list[int] | None):
+    """
+    UPDATE of a user's task, limited to `versions` when given.
+    """
+    query = update(Task).where(Task.id == task_id, Task.user_id == user_id)
+    if versions is not None:
+        query = query.where(Task.version.in_(versions))
+    return query
+
+
+async def _commit_returned_task(db: AsyncSession,
+                                task: Task | None,
+                                event_type: TaskEventType,
+                                task_id: int,
+                                user_id: int,
+                                versions: list[int] | None):
     """
-    task = get_task_by_id(db, task_id, user_id)
-    task.status = TaskStatus.COMPLETED
-    db.commit()
-    db.refresh(task)
+    Publish and commit a single-row write.
+
+    When the write matched no task, the current version is only looked up
+    if a version was expected, to tell a conflict (412, with the current
+    ETag) from a missing task (404).
+    """
+    if task is None:
+        current = None
+        if versions is not None:
+            current = await db.scalar(
+                select(Task.version)
+                .where(Task.id == task_id, Task.user_id == user_id)
+            )
+        await db.rollback()
+        if current is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Task has been modified",
+                headers={'ETag': task_etag(task_id, current)}
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    await publish_task_events(db, task.user_id, [
+        task_event(event_type, task.id, task.version)
+    ])
+    await db.commit()
     return task
+
+
+async def bulk_create_tasks(db: AsyncSession,
+                            items: list[TaskCreate],
+                            user_id: int):
+    """
+    Create many tasks with a single INSERT ... RETURNING statement.
+
+    Args:
+        db (AsyncSession): Database session.
+        items (List[TaskCreate]): Data for the new tasks.
+        user_id (int): The ID of the user creating the tasks.
+
+    Returns:
+        List[TaskBulkResult]: One result per item, in request order.
+    """
+    result = await db.execute(
+        insert(Task).returning(Task, sort_by_parameter_order=True),
+        [{**item.model_dump(), 'user_id': user_id} for item in items]
+    )
+    tasks = result.scalars().all()
+    await publish_task_events(db, user_id, [
+        task_event(TaskEventType.CREATED, task.id, task.version)
+        for task in tasks
+    ])
+    await db.commit()
+    return [
+        TaskBulkResult(id=task.id, result=BulkItemResult.CREATED, task=task)
+        for task in tasks
+    ]
+
+
+async def bulk_update_task_status(db: AsyncSession,
+                                  items: list[TaskBulkStatusItem],
+                                  user_id: int):
+    """
+    Update the status of many tasks in one transaction.
+
+    Items are grouped by target status, so at most one UPDATE ... RETURNING
+    statement is issued per status. Tasks not owned by the user are left
+    untouched and reported as not found.
+
+    Args:
+        db (AsyncSession): Database session.
+        items (List[TaskBulkStatusItem]): Task IDs with their new status.
+        user_id (int): The ID of the user updating the tasks.
+
+    Returns:
+        List[TaskBulkResult]: One result per item, in request order.
+    """
+    ids_by_status = defaultdict(list)
+    for item in items:
+        ids_by_status[item.status].append(item.id)
+
+    updated = {}
+    for new_status, task_ids in ids_by_status.items():
+        result = await db.execute(
+            update(Task)
+            .where(Task.id.in_(task_ids), Task.user_id == user_id)
+            .values(status=new_status, version=Task.version + 1)
+            .returning(Task)
+        )
+        updated.update((task.id, task) for task in result.scalars())
+    await publish_task_events(db, user_id, [
+        task_event(TaskEventType.UPDATED, task.id, task.version)
+        for task in updated.values()
+    ])
+    await db.commit()
+
+    return [
+        TaskBulkResult(id=item.id,
+                       result=BulkItemResult.UPDATED,
+                       task=updated[item.id])
+        if item.id in updated else
+        TaskBulkResult(id=item.id, result=BulkItemResult.NOT_FOUND)
+        for item in items
+    ]
+
+
+async def bulk_delete_tasks(db: AsyncSession,
+                            task_ids: list[int],
+                            user_id: int):
+    """
+    Delete many tasks with a single DELETE ... RETURNING statement.
+
+    Args:
+        db (AsyncSession): Database session.
+        task_ids (List[int]): IDs of the tasks to delete.
+        user_id (int): The ID of the user deleting the tasks.
+
+    Returns:
+        List[TaskBulkResult]: One result per ID, in request order. Tasks
+        not owned by the user are reported as not found.
+    """
+    result = await db.execute(
+        delete(Task)
+        .where(Task.id.in_(task_ids), Task.user_id == user_id)
+        .returning(Task.id)
+    )
+    deleted = set(result.scalars())
+    await publish_task_events(db, user_id, [
+        task_event(TaskEventType.DELETED, task_id) for task_id in deleted
+    ])
+    await db.commit()
+
+    return [
+        TaskBulkResult(id=task_id,
+                       result=BulkItemResult.DELETED
+                       if task_id in deleted else BulkItemResult.NOT_FOUND)
+        for task_id in task_ids
+    ]
@@ -0,0 +1,21 @@
+import mmap
+import os
+
+
+def open_shared_file(path: str, size: int) -> tuple[int, mmap.mmap]:
+    """
+    Map a file shared by every process that opens the same path, creating
+    it or growing it to `size` bytes if needed. New bytes read as zeros.
+
+    Args:
+        path (str): File to map, preferably on tmpfs.
+        size (int): Number of bytes mapped.
+
+    Returns:
+        tuple[int, mmap.mmap]: The open file descriptor, e.g. for
+        `fcntl.lockf`, and the shared mapping.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    if os.fstat(fd).st_size < size:
+        os.ftruncate(fd, size)
+    return fd, mmap.mmap(fd, size)
@@ -0,0 +1,108 @@
+"""Measure bytes on the wire against CPU time of response compression.
+
+Builds task list bodies of several sizes the way `/tasks/user/{user_id}`
+serializes them (orjson, titles and descriptions drawn from the Zipf
+vocabulary of the search benchmark) and compresses each with every
+available coding and level through the encoders of `CompressionMiddleware`,
+feeding streamed bodies in --chunk-size pieces like the export route.
+
+For each size, coding and level it reports the compressed size, the ratio
+and the median CPU time per response; `saved_kb_per_cpu_ms` tells how
+much bandwidth each millisecond of a worker buys.
+
+    python -m benchmarks.compression --sizes 512 1024 16384 1048576
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+import orjson
+
+from benchmarks.search import sentence
+
+LEVELS = {
+    'gzip': (1, 4, 6, 9),
+    'br': (1, 3, 5, 9),
+    'zstd': (1, 3, 6, 12),
+}
+
+
+def task_list(size: int) -> bytes:
+    """
+    Serialize random tasks until the body reaches `size` bytes.
+    """
+    rng = random.Random(size)
+    tasks, length = [], 2
+    while length < size:
+        task = {
+            'id': len(tasks) + 1,
+            'title': sentence(rng, 4),
+            'description': sentence(rng, rng.randint(0, 60)),
+            'status': rng.choice(('New', 'In Progress', 'Completed')),
+            'user_id': 1,
+            'version': rng.randint(1, 5),
+        }
+        tasks.append(task)
+        length += len(orjson.dumps(task)) + 1
+    return orjson.dumps(tasks)[:max(size, 2)]
+
+
+def compress(encoder, body: bytes, chunk_size: int) -> int:
+    size = 0
+    for start in range(0, len(body), chunk_size):
+        size += len(encoder.compress(body[start:start + chunk_size]))
+    return size + len(encoder.finish())
+
+
+def measure(encoder_class, level: int, body: bytes, chunk_size: int,
+            runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.process_time()
+        size = compress(encoder_class(level), body, chunk_size)
+        timings.append(time.process_time() - started)
+    cpu_ms = statistics.median(timings) * 1000
+    saved_kb = (len(body) - size) / 1024
+    return {
+        'bytes': size,
+        'ratio': round(len(body) / size, 2),
+        'cpu_ms': round(cpu_ms, 3),
+        'saved_kb_per_cpu_ms': round(saved_kb / cpu_ms, 1) if cpu_ms else None,
+    }
+
+
+def main(args):
+    os.environ.setdefault('DB_URL', 'sqlite+aiosqlite://')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    from app.compression import ENCODERS
+
+    results = []
+    for size in args.sizes:
+        body = task_list(size)
+        # Enough runs for a stable median without taking minutes on 10 MB
+        runs = max(3, min(args.runs, args.runs * 65536 // size))
+        row = {'size': len(body), 'runs': runs, 'codings': {}}
+        for encoding, encoder_class in ENCODERS.items():
+            for level in LEVELS[encoding]:
+                row['codings'][f'{encoding}-{level}'] = measure(
+                    encoder_class, level, body, args.chunk_size, runs
+                )
+        results.append(row)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[256, 1024, 4096, 65536, 1048576, 10485760],
+                        help='uncompressed body sizes in bytes')
+    parser.add_argument('--chunk-size', type=int, default=65536,
+                        help='size of the body chunks fed to the encoder')
+    parser.add_argument('--runs', type=int, default=200,
+                        help='repetitions of the smallest bodies')
+    args = parser.parse_args()
+
+    main(args)
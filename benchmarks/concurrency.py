@@ -0,0 +1,123 @@
+"""Measure how route throughput scales with concurrency under DB latency.
+
+Seeds a database and drives real task routes through the harness of
+`benchmarks.load`, while every statement first waits --latency seconds,
+standing in for the round-trip to a remote PostgreSQL server. With
+`--mode await` the wait yields the event loop, as asyncpg and aiosqlite
+do; with `--mode block` it holds the loop, as a synchronous driver or any
+other blocking call inside an async route would. `--mode threadpool`
+reproduces the stack before the async rewrite, sync `def` handlers on a
+blocking driver: the wait is a blocking sleep run through Starlette's
+`run_in_threadpool`, whose 40 threads cap how many requests wait at once.
+
+Each route runs at every --concurrency; throughput and p50/p95/p99 latency
+are reported as JSON. Concurrency beyond the connection pool (pool size
+plus overflow) waits for a connection, so throughput levels off there.
+SQLite also runs one write at a time; pass --db-url of a scratch
+PostgreSQL database to see writes scale.
+
+    python -m benchmarks.concurrency --latency 0.005 --concurrency 1 10 50
+    python -m benchmarks.concurrency --mode block
+    DB_POOL_SIZE=200 python -m benchmarks.concurrency --mode threadpool \
+        --latency 1 --concurrency 40 120
+
+Compare the last run with `--mode await`: past 40 clients the threadpool
+stack stops gaining throughput while the async one keeps scaling. The
+connection pool must be larger than 40 for that ceiling to show.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.load import SCENARIOS, build_context, run_scenario
+
+ROUTES = [
+    'GET /tasks/{task_id}',
+    'GET /tasks/user/{user_id}',
+    'POST /tasks/',
+    'PUT /tasks/{task_id}',
+]
+
+
+def inject_latency(sync_engine, latency: float, mode: str) -> None:
+    """
+    Delay every statement `sync_engine` executes by `latency` seconds.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+    from starlette.concurrency import run_in_threadpool
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def wait(conn, cursor, statement, parameters, context, executemany):
+        # Runs inside the greenlet of the async engine
+        if mode == 'await':
+            await_only(asyncio.sleep(latency))
+        elif mode == 'threadpool':
+            await_only(run_in_threadpool(time.sleep, latency))
+        else:
+            time.sleep(latency)
+
+
+async def main(args):
+    import httpx
+
+    from app.database import engine
+    from app.main import app
+
+    ctx = await build_context(args.users, args.tasks)
+    inject_latency(engine.sync_engine, args.latency, args.mode)
+
+    scenarios = [
+        scenario for scenario in SCENARIOS if scenario.route in args.routes
+    ]
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url='http://bench') as client:
+        for concurrency in args.concurrency:
+            for scenario in scenarios:
+                result = await run_scenario(
+                    client, ctx, scenario, args.requests, concurrency
+                )
+                results.append({'concurrency': concurrency, **result})
+    await engine.dispose()
+
+    print(json.dumps({
+        'mode': args.mode,
+        'latency_ms': args.latency * 1000,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url',
+                        help='async SQLAlchemy URL of a scratch database')
+    parser.add_argument('--users', type=int, default=10,
+                        help='number of users to seed')
+    parser.add_argument('--tasks', type=int, default=1000,
+                        help='number of tasks to seed per user')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests sent to each route per concurrency')
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 10, 50],
+                        help='numbers of concurrent clients to compare')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='injected latency per statement in seconds')
+    parser.add_argument('--mode', choices=('await', 'block', 'threadpool'),
+                        default='await',
+                        help='whether the latency yields the loop, blocks '
+                             'it, or blocks one of the 40 pool threads')
+    parser.add_argument('--routes', nargs='+', default=ROUTES,
+                        help='routes to drive, as named by benchmarks.load')
+    args = parser.parse_args()
+
+    os.environ['DB_URL'] = args.db_url or 'sqlite+aiosqlite:///{}'.format(
+        os.path.join(tempfile.mkdtemp(), 'bench.db')
+    )
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    asyncio.run(main(args))
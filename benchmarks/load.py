@@ -0,0 +1,381 @@
+"""Load-test every task and auth route against a seeded database.
+
+Each route is driven through the in-process ASGI transport by a fixed
+number of concurrent clients. Throughput and p50/p95/p99 latency are
+reported as JSON. A report saved with --save-baseline can be passed as
+--baseline to a later run, which then exits with status 1 if any route got
+slower (p95) or lost throughput by more than --tolerance.
+
+GET /tasks/stream never ends on its own: each of its requests is closed
+as soon as it has subscribed, so it measures opening a stream.
+
+The database is a fresh SQLite file unless --db-url is given; point that
+at a scratch PostgreSQL database, it is seeded and written to. Auth routes
+are dominated by bcrypt, so their cost follows BCRYPT_ROUNDS.
+
+    python -m benchmarks.load --users 10 --tasks 1000 --requests 500
+    python -m benchmarks.load --save-baseline baseline.json
+    python -m benchmarks.load --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+BULK_SIZE = 10
+IMPORT_SIZE = 100
+
+
+@dataclass
+class Context:
+    headers: dict
+    user_id: int
+    task_ids: list
+    seed_tasks: Callable[[int], Awaitable[list]]
+    run_id: str
+
+
+@dataclass
+class Scenario:
+    """
+    One route under load.
+
+    `build(ctx, i, ids)` returns the (method, url, request kwargs) of the
+    i-th request. `consumes` tasks are seeded for each request beforehand
+    and passed as `ids`, for routes that delete what they touch.
+    `stream` routes are closed by the harness once subscribed.
+    """
+
+    route: str
+    build: Callable
+    consumes: int = 0
+    stream: bool = False
+
+
+def _task_id(ctx, i):
+    return ctx.task_ids[i % len(ctx.task_ids)]
+
+
+def _import_body(i):
+    return ''.join(
+        json.dumps({'title': f'Imported {i}-{n}'}) + '\n'
+        for n in range(IMPORT_SIZE)
+    ).encode()
+
+
+SCENARIOS = [
+    Scenario('GET /tasks/', lambda ctx, i, ids: (
+        'GET', '/tasks/', {'params': {'page': i % 10 + 1, 'limit': 20}}
+    )),
+    Scenario('GET /tasks/ (status)', lambda ctx, i, ids: (
+        'GET', '/tasks/', {'params': {'status': 'Completed', 'limit': 20}}
+    )),
+    Scenario('GET /tasks/user/{user_id}', lambda ctx, i, ids: (
+        'GET', f'/tasks/user/{ctx.user_id}', {}
+    )),
+    Scenario('GET /tasks/stats', lambda ctx, i, ids: (
+        'GET', '/tasks/stats', {}
+    )),
+    Scenario('GET /tasks/changes', lambda ctx, i, ids: (
+        'GET', '/tasks/changes', {'params': {'since': 0, 'limit': 100}}
+    )),
+    Scenario('GET /tasks/search', lambda ctx, i, ids: (
+        'GET', '/tasks/search',
+        {'params': {'q': f'task {i % 10}', 'limit': 20}}
+    )),
+    Scenario('GET /tasks/stream', lambda ctx, i, ids: (
+        'GET', '/tasks/stream', {}
+    ), stream=True),
+    Scenario('GET /tasks/export', lambda ctx, i, ids: (
+        'GET', '/tasks/export', {}
+    )),
+    Scenario('POST /tasks/import', lambda ctx, i, ids: (
+        'POST', '/tasks/import', {'content': _import_body(i)}
+    )),
+    Scenario('POST /tasks/bulk', lambda ctx, i, ids: (
+        'POST', '/tasks/bulk', {'json': {'items': [
+            {'title': f'Bulk {i}-{n}'} for n in range(BULK_SIZE)
+        ]}}
+    )),
+    Scenario('PATCH /tasks/bulk', lambda ctx, i, ids: (
+        'PATCH', '/tasks/bulk', {'json': {'items': [
+            {'id': _task_id(ctx, i * BULK_SIZE + n), 'status': 'In Progress'}
+            for n in range(BULK_SIZE)
+        ]}}
+    )),
+    Scenario('DELETE /tasks/bulk', lambda ctx, i, ids: (
+        'DELETE', '/tasks/bulk', {'json': {'ids': ids}}
+    ), consumes=BULK_SIZE),
+    Scenario('GET /tasks/{task_id}', lambda ctx, i, ids: (
+        'GET', f'/tasks/{_task_id(ctx, i)}', {}
+    )),
+    Scenario('POST /tasks/', lambda ctx, i, ids: (
+        'POST', '/tasks/', {'json': {'title': f'Task {i}'}}
+    )),
+    Scenario('PUT /tasks/{task_id}', lambda ctx, i, ids: (
+        'PUT', f'/tasks/{_task_id(ctx, i)}', {'json': {'title': f'Put {i}'}}
+    )),
+    Scenario('DELETE /tasks/{task_id}', lambda ctx, i, ids: (
+        'DELETE', f'/tasks/{ids[0]}', {}
+    ), consumes=1),
+    Scenario('PATCH /tasks/{task_id}/complete', lambda ctx, i, ids: (
+        'PATCH', f'/tasks/{_task_id(ctx, i)}/complete', {}
+    )),
+    Scenario('POST /auth/register', lambda ctx, i, ids: (
+        'POST', '/auth/register', {'json': {
+            'first_name': 'Bench',
+            'username': f'bench-{ctx.run_id}-new-{i}',
+            'password': 'benchmark'
+        }}
+    )),
+    Scenario('POST /auth/login', lambda ctx, i, ids: (
+        'POST', '/auth/login',
+        {'data': {'username': f'bench-{ctx.run_id}-0',
+                  'password': 'benchmark'}}
+    )),
+]
+
+
+async def seed(users: int, tasks: int,
+               run_id: str) -> tuple[int, list, Callable]:
+    """
+    Create the schema and `users` users with `tasks` tasks each. Usernames
+    include `run_id`, so a database can be reused across runs.
+
+    Returns:
+        tuple: ID of the first user, IDs of its tasks, and a coroutine
+        function seeding `n` more tasks for that user.
+    """
+    from sqlalchemy import insert, select
+
+    from app.database import SessionLocal, engine
+    from app.enums import TaskStatus
+    from app.hashing import hash_password
+    from app.models import Base, Task, User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    password = await hash_password('benchmark')
+    async with SessionLocal() as db:
+        user_ids = (await db.scalars(
+            insert(User).returning(User.id),
+            [{'first_name': 'Bench', 'username': f'bench-{run_id}-{n}',
+              'password': password} for n in range(users)]
+        )).all()
+        statuses = list(TaskStatus)
+        for user_id in user_ids:
+            await db.execute(insert(Task), [
+                {'title': f'Task {n}',
+                 'description': f'Description of task {n}',
+                 'status': statuses[n % len(statuses)].name,
+                 'user_id': user_id}
+                for n in range(tasks)
+            ])
+        await db.commit()
+        task_ids = (await db.scalars(
+            select(Task.id).where(Task.user_id == user_ids[0])
+            .order_by(Task.id)
+        )).all()
+
+    async def seed_tasks(n: int) -> list:
+        async with SessionLocal() as db:
+            ids = (await db.scalars(
+                insert(Task).returning(Task.id),
+                [{'title': f'Disposable {m}', 'status': 'NEW',
+                  'user_id': user_ids[0]} for m in range(n)]
+            )).all()
+            await db.commit()
+        return list(ids)
+
+    return user_ids[0], list(task_ids), seed_tasks
+
+
+def percentile(latencies: list, pct: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100)[pct - 1]
+
+
+async def close_streams(done: asyncio.Event) -> None:
+    """
+    End every subscribed event stream until `done` is set.
+    """
+    from app.events import CLOSE, broker
+
+    while not done.is_set():
+        if broker.subscriber_count:
+            broker.broadcast([CLOSE])
+        await asyncio.sleep(0.001)
+
+
+async def run_scenario(client, ctx: Context, scenario: Scenario,
+                       requests: int, concurrency: int) -> dict:
+    ids = []
+    if scenario.consumes:
+        seeded = await ctx.seed_tasks(scenario.consumes * requests)
+        ids = [
+            seeded[i:i + scenario.consumes]
+            for i in range(0, len(seeded), scenario.consumes)
+        ]
+    calls = [
+        scenario.build(ctx, i, ids[i] if ids else None)
+        for i in range(requests)
+    ]
+    latencies = []
+    errors = 0
+    pending = iter(calls)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in pending:
+            started = time.perf_counter()
+            response = await client.request(
+                method, url, headers=ctx.headers, **kwargs
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    done = asyncio.Event()
+    closer = (asyncio.create_task(close_streams(done)) if scenario.stream
+              else None)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        done.set()
+        if closer is not None:
+            await closer
+    return {
+        'route': scenario.route,
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Return the routes that regressed against `baseline`.
+    """
+    previous = {result['route']: result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result['route'])
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append({
+                'route': result['route'], 'metric': 'p95_ms',
+                'baseline': base['p95_ms'], 'current': result['p95_ms']
+            })
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append({
+                'route': result['route'], 'metric': 'rps',
+                'baseline': base['rps'], 'current': result['rps']
+            })
+        if result['errors'] > base['errors']:
+            regressions.append({
+                'route': result['route'], 'metric': 'errors',
+                'baseline': base['errors'], 'current': result['errors']
+            })
+    return regressions
+
+
+async def build_context(users: int, tasks: int) -> Context:
+    """
+    Seed the database and log in as its first user.
+    """
+    from app.services.auth import create_access_token
+
+    run_id = str(int(time.time()))
+    user_id, task_ids, seed_tasks = await seed(users, tasks, run_id)
+    token = create_access_token({'sub': f'bench-{run_id}-0'})
+    return Context(
+        headers={'Authorization': f'Bearer {token}'},
+        user_id=user_id,
+        task_ids=task_ids,
+        seed_tasks=seed_tasks,
+        run_id=run_id
+    )
+
+
+async def main(args) -> int:
+    import httpx
+
+    from app.database import engine
+    from app.main import app
+
+    ctx = await build_context(args.users, args.tasks)
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.routes
+        or any(part in scenario.route for part in args.routes)
+    ]
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url='http://bench') as client:
+        for scenario in scenarios:
+            results.append(await run_scenario(
+                client, ctx, scenario, args.requests, args.concurrency
+            ))
+    await engine.dispose()
+
+    report = {
+        'users': args.users,
+        'tasks_per_user': args.tasks,
+        'concurrency': args.concurrency,
+        'results': results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        report['regressions'] = regressions
+    print(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url',
+                        help='async SQLAlchemy URL of a scratch database')
+    parser.add_argument('--users', type=int, default=10,
+                        help='number of users to seed')
+    parser.add_argument('--tasks', type=int, default=1000,
+                        help='number of tasks to seed per user')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests sent to each route')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='number of concurrent clients')
+    parser.add_argument('--routes', nargs='*',
+                        help='only run routes containing one of these')
+    parser.add_argument('--baseline',
+                        help='report to compare against')
+    parser.add_argument('--save-baseline',
+                        help='store the results as a baseline report')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression (default 0.2)')
+    args = parser.parse_args()
+
+    os.environ['DB_URL'] = args.db_url or 'sqlite+aiosqlite:///{}'.format(
+        os.path.join(tempfile.mkdtemp(), 'bench.db')
+    )
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    sys.exit(asyncio.run(main(args)))
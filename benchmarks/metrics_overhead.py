@@ -0,0 +1,71 @@
+"""Measure the per-request overhead of the Prometheus metrics middleware.
+
+A minimal ASGI app is called directly, with and without `MetricsMiddleware`,
+so the difference is the cost of the middleware alone. With --multiprocess
+the metrics are written to a temporary PROMETHEUS_MULTIPROC_DIR, as they
+are under gunicorn.
+
+    python -m benchmarks.metrics_overhead --requests 100000 --multiprocess
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+
+class Route:
+    path = '/tasks/{task_id}'
+
+
+async def bare_app(scope, receive, send):
+    scope['route'] = Route
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+async def receive():
+    return {'type': 'http.request', 'body': b''}
+
+
+async def send(message):
+    pass
+
+
+async def measure(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/tasks/1'}
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main(requests: int):
+    from app.metrics import MetricsMiddleware
+
+    wrapped = MetricsMiddleware(bare_app)
+    await measure(wrapped, min(requests, 1000))
+
+    bare = await measure(bare_app, requests)
+    instrumented = await measure(wrapped, requests)
+    print(json.dumps({
+        'requests': requests,
+        'multiprocess': 'PROMETHEUS_MULTIPROC_DIR' in os.environ,
+        'bare_us': round(bare * 1e6, 2),
+        'instrumented_us': round(instrumented * 1e6, 2),
+        'overhead_us': round((instrumented - bare) * 1e6, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100000,
+                        help='number of requests to time per variant')
+    parser.add_argument('--multiprocess', action='store_true',
+                        help='write metrics to a PROMETHEUS_MULTIPROC_DIR')
+    args = parser.parse_args()
+    if args.multiprocess:
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp()
+    asyncio.run(main(args.requests))
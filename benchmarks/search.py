@@ -0,0 +1,144 @@
+"""Measure full-text task search on a large dataset.
+
+Seeds --tasks tasks (one million by default) spread over --users users,
+with titles and descriptions drawn from a Zipf-distributed vocabulary of
+5000 words, then times `search_tasks` for random one- and two-word queries
+against the previous approach of loading all tasks of the user and
+filtering them in Python.
+
+The database is a fresh SQLite file (FTS5) unless --db-url points at a
+scratch PostgreSQL database (tsvector + GIN).
+
+    python -m benchmarks.search --tasks 1000000 --users 100 --queries 200
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+SYLLABLES = ('ba', 'ko', 're', 'mi', 'tu', 'sen', 'dal', 'vor', 'pin',
+             'las', 'ge', 'nu', 'fri', 'tam', 'zo', 'quel')
+# Pseudo-words with a Zipf-like frequency, like words in real task text:
+# a few very common ones and a long tail.
+WORDS = sorted({
+    a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES
+})[:5000]
+CUM_WEIGHTS = list(itertools.accumulate(
+    1 / rank for rank in range(1, len(WORDS) + 1)
+))
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=words))
+
+
+async def seed(tasks: int, users: int, batch: int = 20000):
+    from sqlalchemy import insert
+
+    from app.database import SessionLocal, engine
+    from app.models import Base, Task, User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(0)
+    async with SessionLocal() as db:
+        user_ids = (await db.scalars(
+            insert(User).returning(User.id),
+            [{'first_name': 'Bench', 'username': f'search-{time.time()}-{n}',
+              'password': 'x'} for n in range(users)]
+        )).all()
+        for start in range(0, tasks, batch):
+            await db.execute(insert(Task), [
+                {'title': sentence(rng, 4),
+                 'description': sentence(rng, 20),
+                 'status': 'NEW',
+                 'user_id': user_ids[n % users]}
+                for n in range(start, min(start + batch, tasks))
+            ])
+            await db.commit()
+    return list(user_ids)
+
+
+async def time_queries(queries, run) -> dict:
+    latencies = []
+    for user_id, q in queries:
+        started = time.perf_counter()
+        await run(user_id, q)
+        latencies.append(time.perf_counter() - started)
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        'queries': len(latencies),
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+    }
+
+
+async def main(args):
+    from app.database import SessionLocal, engine
+    from app.services.search import search_tasks
+    from app.services.tasks import get_user_tasks
+
+    started = time.perf_counter()
+    user_ids = await seed(args.tasks, args.users)
+    seeded = time.perf_counter() - started
+
+    rng = random.Random(1)
+    queries = [
+        (rng.choice(user_ids), sentence(rng, 1 + n % 2))
+        for n in range(args.queries)
+    ]
+
+    async def indexed(user_id, q):
+        async with SessionLocal() as db:
+            await search_tasks(db, user_id, q, limit=args.limit)
+
+    async def client_side(user_id, q):
+        words = q.split()
+        async with SessionLocal() as db:
+            tasks = await get_user_tasks(db, user_id)
+        matches = [
+            task for task in tasks
+            if all(word in f'{task.title} {task.description}'
+                   for word in words)
+        ]
+        return matches[:args.limit]
+
+    results = {
+        'tasks': args.tasks,
+        'users': args.users,
+        'seed_s': round(seeded, 1),
+        'search_tasks': await time_queries(queries, indexed),
+        'get_user_tasks + filter': await time_queries(
+            queries[:max(args.queries // 10, 2)], client_side
+        ),
+    }
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-url',
+                        help='async SQLAlchemy URL of a scratch database')
+    parser.add_argument('--tasks', type=int, default=1000000,
+                        help='number of tasks to seed')
+    parser.add_argument('--users', type=int, default=100,
+                        help='number of users owning them')
+    parser.add_argument('--queries', type=int, default=200,
+                        help='number of search queries to time')
+    parser.add_argument('--limit', type=int, default=20,
+                        help='page size')
+    args = parser.parse_args()
+
+    os.environ['DB_URL'] = args.db_url or 'sqlite+aiosqlite:///{}'.format(
+        os.path.join(tempfile.mkdtemp(), 'bench.db')
+    )
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    asyncio.run(main(args))
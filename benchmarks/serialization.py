@@ -0,0 +1,108 @@
+"""Compare the list serialization paths for task pages.
+
+The default FastAPI path loads `Task` entities, validates each one through
+`TaskRead` (from_attributes) and encodes the result with the stdlib json
+module. The fast path used by the list endpoints selects column tuples and
+encodes them with orjson.
+
+    python -m benchmarks.serialization --rows 20000 --limit 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.enums import TaskStatus
+from app.models import Base, Task, User
+from app.schemas.tasks import TaskRead
+from app.serialization import TASK_LIST_COLUMNS, task_rows_to_dicts
+
+task_list_adapter = TypeAdapter(List[TaskRead])
+
+
+def pydantic_path(tasks) -> bytes:
+    # Mirrors FastAPI's serialize_response + JSONResponse.render
+    validated = task_list_adapter.validate_python(tasks, from_attributes=True)
+    content = task_list_adapter.dump_python(validated, mode='json')
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      separators=(',', ':')).encode()
+
+
+def fast_path(rows) -> bytes:
+    return orjson.dumps(task_rows_to_dicts(rows))
+
+
+async def seed(session_factory, rows: int):
+    async with session_factory() as db:
+        db.add(User(id=1, first_name='Bench', username='bench',
+                    password='x'))
+        await db.execute(insert(Task), [
+            {'title': f'Task {i}',
+             'description': f'Description of task {i} ' * 4,
+             'status': list(TaskStatus)[i % 3],
+             'user_id': 1}
+            for i in range(rows)
+        ])
+        await db.commit()
+
+
+async def measure(session_factory, rows: int, limit: int, fast: bool):
+    pages = 0
+    started = time.perf_counter()
+    async with session_factory() as db:
+        for offset in range(0, rows, limit):
+            if fast:
+                query = select(*TASK_LIST_COLUMNS)
+            else:
+                query = select(Task)
+            result = await db.execute(
+                query.order_by(Task.id).offset(offset).limit(limit)
+            )
+            if fast:
+                fast_path(result.all())
+            else:
+                pydantic_path(result.scalars().all())
+                db.expunge_all()
+            pages += 1
+    elapsed = time.perf_counter() - started
+    return {
+        'path': 'orjson tuples' if fast else 'pydantic TaskRead',
+        'pages': pages,
+        'limit': limit,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_s': round(rows / elapsed),
+    }
+
+
+async def main(rows: int, limit: int):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, rows)
+
+    results = [
+        await measure(session_factory, rows, limit, fast=False),
+        await measure(session_factory, rows, limit, fast=True),
+    ]
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='number of tasks to seed and page through')
+    parser.add_argument('--limit', type=int, default=500,
+                        help='page size')
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit))
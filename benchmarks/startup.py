@@ -0,0 +1,124 @@
+"""Measure how long a worker takes to serve its first requests.
+
+Each run starts a fresh interpreter that imports `app.main` and sends its
+first `GET /` and `GET /openapi.json` through the in-process ASGI
+transport, once with the schema built from the routes and once with a
+schema pre-generated by `python -m app.cli openapi` (OPENAPI_SCHEMA_PATH).
+The same interpreter then forks, like gunicorn with --preload, and the
+child times its first `GET /`, which is what a recycled worker costs when
+the application was loaded by the master.
+
+Medians over --runs runs are reported as JSON, in milliseconds.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def first_requests(app, urls) -> dict:
+    import httpx
+
+    timings = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url='http://bench') as client:
+        for url in urls:
+            started = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            timings[url] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def measure():
+    """
+    Run in a fresh interpreter; prints the timings of one run as JSON.
+    """
+    started = time.perf_counter()
+    from app.main import app
+    import_ms = (time.perf_counter() - started) * 1000
+    timings = asyncio.run(first_requests(app, ['/', '/openapi.json']))
+
+    read, write = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        asyncio.run(first_requests(app, ['/']))
+        os.write(write, str((time.perf_counter() - forked) * 1000).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        preloaded_ms = float(pipe.read())
+    os.waitpid(pid, 0)
+
+    print(json.dumps({
+        'import_ms': import_ms,
+        'first_response_ms': import_ms + timings['/'],
+        'first_openapi_ms': timings['/openapi.json'],
+        'preloaded_first_response_ms': preloaded_ms,
+    }))
+
+
+def run(env: dict, runs: int) -> dict:
+    samples = [
+        json.loads(subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--measure'],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout)
+        for _ in range(runs)
+    ]
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in samples[0]
+    }
+
+
+def main(args):
+    workdir = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        'DB_URL': 'sqlite+aiosqlite:///{}'.format(
+            os.path.join(workdir, 'bench.db')
+        ),
+        'SECRET_KEY': 'benchmark',
+        'RATE_LIMIT_PATH': os.path.join(workdir, 'ratelimit'),
+        'READ_YOUR_WRITES_PATH': os.path.join(workdir, 'writes'),
+    }
+    env.pop('OPENAPI_SCHEMA_PATH', None)
+
+    schema_path = os.path.join(workdir, 'openapi.json')
+    subprocess.run(
+        [sys.executable, '-m', 'app.cli', 'openapi', '--output', schema_path],
+        env=env, check=True
+    )
+
+    print(json.dumps({
+        'runs': args.runs,
+        'built schema': run(env, args.runs),
+        'pre-generated schema': run(
+            {**env, 'OPENAPI_SCHEMA_PATH': schema_path}, args.runs
+        ),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='fresh interpreters to start per mode')
+    parser.add_argument('--measure', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure()
+    else:
+        main(args)
@@ -0,0 +1,61 @@
+"""Gunicorn settings, picked up by `gunicorn --config gunicorn.conf.py`.
+
+When PROMETHEUS_MULTIPROC_DIR is set, every worker writes its metrics to
+that directory and `/metrics` aggregates them. The directory is emptied on
+start so values of a previous run are not reported.
+
+With GUNICORN_PRELOAD=true the application is imported once by the master
+and workers are forked from it, so a recycled or added worker serves its
+first request without importing anything. Objects created by the master are
+frozen out of the garbage collector before forking, which keeps workers
+from touching (and copying) the pages they share with it, and the database
+engines drop the master's pool in each worker.
+
+Anonymous callers are rate limited per client address. Behind a reverse
+proxy every request comes from the proxy, so list its addresses in
+FORWARDED_ALLOW_IPS: the uvicorn workers then take the client address from
+X-Forwarded-For, but only on connections from those addresses, so clients
+cannot pick their own rate limit bucket by sending the header themselves.
+"""
+import gc
+import os
+import shutil
+import sys
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+# Comma-separated proxies whose X-Forwarded-For headers are trusted
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def when_ready(server):
+    if preload_app:
+        # Loaded lazily otherwise; do it once here so workers inherit it
+        from app.hashing import get_pwd_context
+        get_pwd_context()
+        from app.main import app
+        app.openapi()
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if 'app.database' in sys.modules:
+        from app.database import engine, replicas
+        for shared in [engine, *replicas.engines]:
+            # Leave the master's connections, if any, to the master
+            shared.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,34 +1,120 @@
-from unittest.mock import MagicMock
-import pytest
-from app.main import app
-from app.database import get_db
-from app.models import User
-from app.services.auth import get_current_user
+import os
+import tempfile
 
-mock_session = MagicMock()
-mock_user = User(id=1, username='user', password='password')
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ.setdefault('DB_URL', f'sqlite+aiosqlite:///{TEST_DB_PATH}')
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('INTERNAL_API_TOKEN', 'test-internal-token')
+os.environ.setdefault('RATE_LIMIT_PATH',
+                      os.path.join(tempfile.mkdtemp(), 'ratelimit'))
+os.environ.setdefault('READ_YOUR_WRITES_PATH',
+                      os.path.join(tempfile.mkdtemp(), 'writes'))
 
+import threading  # noqa: E402
+import time  # noqa: E402
+from contextlib import contextmanager  # noqa: E402
 
-def override_get_db():
-    try:
-        yield mock_session
-    finally:
-        pass
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.database import engine, recent_writes  # noqa: E402
+from app.instrumentation import count_queries  # noqa: E402
+from app.main import app  # noqa: E402
+from app.hashing import get_pwd_context  # noqa: E402
+from app.enums import TaskStatus  # noqa: E402
+from app.events import CLOSE, broker  # noqa: E402
+from app.models import Base, Task, User  # noqa: E402
+from app.ratelimit import buckets  # noqa: E402
+from app.services.auth import get_current_user, user_cache  # noqa: E402
+from app.services.tasks import total_count_cache  # noqa: E402
+
+sync_engine = create_engine(f'sqlite:///{TEST_DB_PATH}')
+mock_user = User(id=1, first_name='User', username='user',
+                 password=get_pwd_context().hash('password'))
 
 
 def override_get_current_user():
     return mock_user
 
 
-app.dependency_overrides[get_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
 
 
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        db.add(User(id=mock_user.id,
+                    first_name=mock_user.first_name,
+                    username=mock_user.username,
+                    password=mock_user.password))
+        db.commit()
+    yield
+    Base.metadata.drop_all(sync_engine)
+    user_cache.clear()
+    buckets.clear()
+    total_count_cache.clear()
+    recent_writes.clear()
+
+
+@pytest.fixture
+def db_session():
+    with Session(sync_engine) as db:
+        yield db
+
+
 @pytest.fixture
-def mock_db_session():
-    return mock_session
+def mock_task(db_session):
+    task = Task(id=1,
+                title="Test Task",
+                description="Task Description",
+                status=TaskStatus.NEW,
+                user_id=1)
+    db_session.add(task)
+    db_session.commit()
+    return task
 
 
 @pytest.fixture
 def mock_user_session():
     return mock_user
+
+
+@pytest.fixture
+def assert_num_queries():
+    """
+    Context manager asserting the exact number of statements executed
+    against the application engine inside the block.
+    """
+    @contextmanager
+    def assert_num_queries(expected: int):
+        with count_queries(engine.sync_engine) as counter:
+            yield counter
+        assert counter.queries == expected, (
+            f'{expected} queries expected, {counter.queries} executed:\n'
+            + '\n'.join(counter.statements)
+        )
+
+    return assert_num_queries
+
+
+@pytest.fixture
+def close_event_streams():
+    """
+    End task event streams as soon as they are subscribed, so requests to
+    /tasks/stream return instead of streaming forever.
+    """
+    done = threading.Event()
+
+    def close_subscribed():
+        while not done.is_set():
+            if broker.subscriber_count:
+                broker.broadcast([CLOSE])
+            time.sleep(0.01)
+
+    closer = threading.Thread(target=close_subscribed, daemon=True)
+    closer.start()
+    yield
+    done.set()
+    closer.join()
@@ -1,27 +1,24 @@
+import asyncio
+from passlib.hash import bcrypt
+from app.config import INTERNAL_API_TOKEN
 from app.main import app
-from fastapi.testclient import TestClient
+from app.hashing import get_pwd_context, hashing_pool
+from app.database import SessionLocal
 from app.models import User
+import app.services.auth as service
+from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
 
-def test_register_user_success(mock_db_session):
+def test_register_user_success():
     data = {
         'first_name': 'New',
         'last_name': 'User',
-        'username': 'user',
+        'username': 'newuser',
         'password': 'password123'
     }
 
-    query = mock_db_session.query.return_value
-    filter_result = query.filter.return_value
-    filter_result.first.return_value = None
-
-    # Тут имитирую автоинкремент(Потом подумать)
-    mock_db_session.add = lambda user: setattr(user, 'id', 1)
-    mock_db_session.commit = lambda: None
-    mock_db_session.refresh = lambda user: None
-
     response = client.post('/auth/register/', json=data)
     print(response.json())
     assert response.status_code == 200
@@ -30,16 +27,13 @@ def test_register_user_success(mock_db_session):
     assert r_json['username'] == data['username']
 
 
-def test_register_user_already_exists(mock_db_session):
+def test_register_user_already_exists():
     data = {
         'first_name': 'Existing',
         'last_name': 'User',
         'username': 'user',
         'password': 'password123'
     }
-    query = mock_db_session.query.return_value
-    filter_result = query.filter.return_value
-    filter_result.first.return_value = True
 
     response = client.post('/auth/register/', json=data)
 
@@ -48,20 +42,13 @@ def test_register_user_already_exists(mock_db_session):
     assert r_json['detail'] == 'Username already registered'
 
 
-def test_register_user_invalid_password(mock_db_session):
+def test_register_user_invalid_password():
     data = {
         'first_name': 'New',
         'last_name': 'User',
-        'username': 'user',
+        'username': 'newuser',
         'password': '123'  # length < 6
     }
-    query = mock_db_session.query.return_value
-    filter_result = query.filter.return_value
-    filter_result.first.return_value = None
-
-    mock_db_session.add = lambda user: setattr(user, 'id', 1)
-    mock_db_session.commit = lambda: None
-    mock_db_session.refresh = lambda user: None
 
     response = client.post('/auth/register/', json=data)
     assert response.status_code == 422
@@ -71,14 +58,11 @@ def test_register_user_invalid_password(mock_db_session):
     assert error['ctx']['min_length'] == 6
 
 
-def test_login_user_failure(mock_db_session):
+def test_login_user_failure():
     data = {
-        'username': 'user',
+        'username': 'unknown',
         'password': 'password'
     }
-    query = mock_db_session.query.return_value
-    filter_result = query.filter.return_value
-    filter_result.first.return_value = None
 
     response = client.post('/auth/login/', data=data)
     print(response.json())
@@ -87,22 +71,98 @@ def test_login_user_failure(mock_db_session):
     assert r_json['detail'] == 'Invalid username or password'
 
 
-def test_login_user_success(mock_db_session):
+def test_login_user_wrong_password():
     data = {
         'username': 'user',
-        'password': 'password'
+        'password': 'wrong-password'
     }
 
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    response = client.post('/auth/login/', data=data)
+    assert response.status_code == 401
 
-    mock_user = User(username="user",
-                     password=pwd_context.hash(data['password']))
-    query = mock_db_session.query.return_value
-    filter_result = query.filter.return_value
-    filter_result.first.return_value = mock_user
+
+def test_login_user_success():
+    data = {
+        'username': 'user',
+        'password': 'password'
+    }
 
     response = client.post('/auth/login/', data=data)
     assert response.status_code == 200
     print(response.json())
     assert 'access_token' in response.json()
+
+
+async def resolve_current_user(token):
+    async with SessionLocal() as db:
+        return await service.get_current_user(token, db)
+
+
+def test_current_user_is_cached():
+    token = service.create_access_token(data={'sub': 'user'})
+
+    first = asyncio.run(resolve_current_user(token))
+    second = asyncio.run(resolve_current_user(token))
+
+    assert first == second
+    assert first.username == 'user'
+    stats = service.user_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+    response = client.get('/internal/user-cache',
+                          headers={'X-Internal-Token': INTERNAL_API_TOKEN})
+    assert response.status_code == 200
+    assert response.json()['hits'] == 1
+
+
+def test_cached_user_reloaded_after_ttl(db_session, mocker):
+    clock = mocker.patch('app.cache.time')
+    clock.monotonic.return_value = 0
+    token = service.create_access_token(data={'sub': 'user'})
+    asyncio.run(resolve_current_user(token))
+
+    user = db_session.get(User, 1)
+    user.first_name = 'Renamed'
+    db_session.commit()
+
+    assert asyncio.run(resolve_current_user(token)).first_name == 'User'
+    clock.monotonic.return_value = service.user_cache.ttl
+    assert asyncio.run(resolve_current_user(token)).first_name == 'Renamed'
+
+
+def test_current_user_from_token_claims(mocker):
+    mocker.patch.object(service, 'JWT_EMBED_USER', True)
+    user = User(id=42, first_name='Token', last_name=None, username='ghost')
+    token = service.create_access_token(data=service.get_token_data(user))
+
+    current_user = asyncio.run(resolve_current_user(token))
+
+    assert current_user.id == 42
+    assert current_user.username == 'ghost'
+    assert service.user_cache.stats()['misses'] == 0
+
+
+def test_login_rehashes_outdated_password(db_session):
+    user = db_session.get(User, 1)
+    user.password = bcrypt.using(rounds=5).hash('password')
+    db_session.commit()
+
+    response = client.post('/auth/login/',
+                           data={'username': 'user', 'password': 'password'})
+
+    assert response.status_code == 200
+    db_session.refresh(user)
+    assert not get_pwd_context().needs_update(user.password)
+    assert get_pwd_context().verify('password', user.password)
+
+
+def test_login_rejected_when_hashing_queue_full(mocker):
+    mocker.patch.object(hashing_pool, 'queue_limit', 0)
+    mocker.patch.object(hashing_pool, 'pending', hashing_pool.size)
+
+    response = client.post('/auth/login/',
+                           data={'username': 'user', 'password': 'password'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,20 @@
+from fastapi.routing import APIRoute
+
+from app.main import app
+from benchmarks.load import SCENARIOS
+
+
+def test_every_route_has_a_load_scenario():
+    covered = {
+        tuple(scenario.route.split(' ')[:2]) for scenario in SCENARIOS
+    }
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.endpoint.__module__ in ('app.routes.tasks',
+                                          'app.routes.auth')
+        for method in route.methods
+    }
+
+    assert routes - covered == set()
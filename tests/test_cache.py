@@ -0,0 +1,38 @@
+from app.cache import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_cache_entries_expire(mocker):
+    clock = mocker.patch('app.cache.time.monotonic', return_value=100.0)
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+
+    clock.return_value = 109.0
+    assert cache.get('a') == 1
+    clock.return_value = 111.0
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
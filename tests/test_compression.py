@@ -0,0 +1,263 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate_encoding
+from app.main import app
+from app.models import Task
+
+client = TestClient(app)
+
+CHUNK = json.dumps([{'id': n, 'title': f'Task {n}'}
+                    for n in range(2000)]).encode()
+
+
+def make_app(**options) -> FastAPI:
+    inner = FastAPI()
+
+    @inner.get('/small')
+    async def small():
+        return Response(b'{}', media_type='application/json')
+
+    @inner.get('/large')
+    async def large():
+        return Response(CHUNK, media_type='application/json')
+
+    @inner.get('/tagged')
+    async def tagged():
+        return Response(CHUNK, media_type='application/json',
+                        headers={'ETag': '"1-3"'})
+
+    @inner.get('/binary')
+    async def binary():
+        return Response(CHUNK, media_type='application/octet-stream')
+
+    @inner.get('/events')
+    async def events():
+        return StreamingResponse(iter([CHUNK]),
+                                 media_type='text/event-stream')
+
+    @inner.get('/stream')
+    async def stream(chunks: int = 3, size: int = len(CHUNK)):
+        async def generate():
+            for n in range(chunks):
+                log.append(('yield', n))
+                yield CHUNK[:size]
+        return StreamingResponse(generate(), media_type='application/json')
+
+    log = inner.state.log = []
+    inner.add_middleware(CompressionMiddleware, **options)
+    return inner
+
+
+def request(asgi_app, path: str, accept_encoding: str = 'gzip') -> list:
+    """
+    Call the app directly, returning the ASGI messages it sent and logging
+    them next to the chunks the app produced.
+    """
+    log = asgi_app.state.log
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'raw_path': b'',
+        'root_path': '', 'scheme': 'http', 'query_string': query.encode(),
+        'server': ('test', 80), 'client': ('test', 1), 'http_version': '1.1',
+        'headers': [(b'accept-encoding', accept_encoding.encode())],
+    }
+    messages = []
+    requests = [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        log.append(('send', message['type']))
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages
+
+
+def response_headers(messages: list) -> dict:
+    return {key.decode(): value.decode()
+            for key, value in messages[0]['headers']}
+
+
+def response_body(messages: list) -> bytes:
+    return b''.join(message.get('body', b'') for message in messages[1:])
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip', 'gzip'),
+    ('gzip, deflate', 'gzip'),
+    ('GZIP;q=0.5', 'gzip'),
+    ('gzip;q=0', None),
+    ('deflate', None),
+    ('identity', None),
+    ('', None),
+    ('*', 'zstd'),
+    ('br, zstd', 'zstd'),
+    ('gzip, br;q=0.9, zstd;q=0.8', 'gzip'),
+    ('*;q=0.1, br', 'br'),
+    ('gzip;q=bad, br', 'br'),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ('zstd', 'br', 'gzip')) == expected
+
+
+def test_negotiate_encoding_only_picks_offered():
+    assert negotiate_encoding('br, gzip;q=0.5', ('gzip',)) == 'gzip'
+    assert negotiate_encoding('br', ('gzip',)) is None
+
+
+def test_large_response_is_compressed():
+    messages = request(make_app(), '/large')
+
+    headers = response_headers(messages)
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['vary'] == 'Accept-Encoding'
+    assert 'content-length' not in headers
+    body = response_body(messages)
+    assert len(body) < len(CHUNK)
+    assert gzip.decompress(body) == CHUNK
+
+
+def test_compressed_response_etag_names_the_coding():
+    compressed = request(make_app(), '/tagged')
+    identity = request(make_app(), '/tagged', 'identity')
+
+    assert response_headers(compressed)['etag'] == '"1-3-gzip"'
+    assert response_headers(identity)['etag'] == '"1-3"'
+
+
+@pytest.mark.parametrize('path, accept_encoding', [
+    ('/small', 'gzip'),
+    ('/large', 'identity'),
+    ('/binary', 'gzip'),
+    ('/events', 'gzip'),
+])
+def test_response_is_not_compressed(path, accept_encoding):
+    messages = request(make_app(), path, accept_encoding)
+
+    assert 'content-encoding' not in response_headers(messages)
+    assert response_body(messages) == (b'{}' if path == '/small' else CHUNK)
+
+
+def test_small_response_varies_on_accept_encoding():
+    messages = request(make_app(), '/small')
+
+    assert response_headers(messages)['vary'] == 'Accept-Encoding'
+
+
+def test_streaming_response_is_compressed_incrementally():
+    inner = make_app()
+
+    messages = request(inner, '/stream?chunks=3')
+
+    assert response_headers(messages)['content-encoding'] == 'gzip'
+    assert gzip.decompress(response_body(messages)) == CHUNK * 3
+    # Compressed bytes leave before the app produced the last chunk
+    first_body = inner.state.log.index(('send', 'http.response.body'))
+    assert first_body < inner.state.log.index(('yield', 2))
+
+
+def test_short_stream_is_not_compressed():
+    messages = request(make_app(min_size=1000), '/stream?chunks=3&size=300')
+
+    headers = response_headers(messages)
+    assert 'content-encoding' not in headers
+    assert headers['vary'] == 'Accept-Encoding'
+    assert response_body(messages) == CHUNK[:300] * 3
+
+
+def test_stream_is_compressed_once_it_reaches_min_size():
+    messages = request(make_app(min_size=1000), '/stream?chunks=5&size=300')
+
+    assert response_headers(messages)['content-encoding'] == 'gzip'
+    assert gzip.decompress(response_body(messages)) == CHUNK[:300] * 5
+
+
+def test_route_levels():
+    fast = response_body(request(
+        make_app(route_levels={'GET /large': {'gzip': 1}}), '/large'
+    ))
+    best = response_body(request(
+        make_app(route_levels={'GET /large': {'gzip': 9}}), '/large'
+    ))
+
+    assert gzip.decompress(fast) == gzip.decompress(best) == CHUNK
+    # zlib records the fastest and best levels in the gzip XFL byte
+    assert (fast[8], best[8]) == (4, 2)
+
+
+def test_route_can_disable_compression():
+    messages = request(make_app(route_levels={'GET /large': None}), '/large')
+
+    assert 'content-encoding' not in response_headers(messages)
+    assert response_body(messages) == CHUNK
+
+
+def test_disabled():
+    messages = request(make_app(enabled=False), '/large')
+
+    assert 'content-encoding' not in response_headers(messages)
+
+
+@pytest.mark.parametrize('encoding, module', [
+    ('br', 'brotli'),
+    ('zstd', 'zstandard'),
+])
+def test_optional_encodings(encoding, module):
+    pytest.importorskip(module)
+
+    messages = request(make_app(), '/stream?chunks=3', encoding)
+
+    assert response_headers(messages)['content-encoding'] == encoding
+    assert len(response_body(messages)) < len(CHUNK)
+
+
+def test_task_list_is_compressed(db_session):
+    db_session.add_all([
+        Task(title=f'Task {n}', description='Long description ' * 20,
+             user_id=1)
+        for n in range(50)
+    ])
+    db_session.commit()
+
+    response = client.get('/tasks/user/1',
+                          headers={'Accept-Encoding': 'gzip'})
+    identity = client.get('/tasks/user/1',
+                          headers={'Accept-Encoding': 'identity'})
+
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-encoding' not in identity.headers
+    assert response.json() == identity.json()
+    assert len(response.json()) == 50
+    assert response.num_bytes_downloaded < len(identity.content) / 5
+
+
+def test_compressed_task_list_etag_revalidates(db_session):
+    db_session.add_all([
+        Task(title=f'Task {n}', description='Long description ' * 20,
+             user_id=1)
+        for n in range(50)
+    ])
+    db_session.commit()
+
+    response = client.get('/tasks/user/1',
+                          headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['etag']
+    cached = client.get('/tasks/user/1',
+                        headers={'Accept-Encoding': 'gzip',
+                                 'If-None-Match': etag})
+
+    assert etag.endswith('-gzip"')
+    assert cached.status_code == 304
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.database import SessionLocal
+from app.events import (
+    CLOSE,
+    RESYNC,
+    InProcessBroker,
+    PostgresBroker,
+    broker,
+    create_broker,
+    publish_import_event,
+    publish_task_events,
+    task_event
+)
+from app.enums import TaskEventType
+from app.main import app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def wait_for_subscriber():
+    deadline = time.monotonic() + 5
+    while not broker.subscriber_count:
+        assert time.monotonic() < deadline, 'stream never subscribed'
+        time.sleep(0.01)
+
+
+def test_create_broker():
+    assert isinstance(create_broker('sqlite+aiosqlite:///x.db'),
+                      InProcessBroker)
+    postgres = create_broker('postgresql+asyncpg://u:p@db:5432/tasks')
+    assert isinstance(postgres, PostgresBroker)
+    assert postgres.dsn == 'postgresql://u:p@db:5432/tasks'
+    assert isinstance(
+        create_broker('postgresql+asyncpg://u:p@db/tasks', 'memory'),
+        InProcessBroker
+    )
+    with pytest.raises(ValueError):
+        create_broker('sqlite:///x.db', 'redis')
+
+
+def test_events_are_delivered_on_commit_only():
+    async def publish(commit):
+        async with broker.subscribe(1) as subscription:
+            async with SessionLocal() as db:
+                await publish_task_events(db, 1, [
+                    task_event(TaskEventType.DELETED, 7)
+                ])
+                if commit:
+                    await db.commit()
+                else:
+                    await db.rollback()
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait()
+                    for _ in range(subscription.queue.qsize())]
+
+    assert asyncio.run(publish(commit=False)) == []
+    assert asyncio.run(publish(commit=True)) == [
+        {'type': 'deleted', 'id': 7}
+    ]
+
+
+def test_import_event_is_a_single_summary():
+    async def publish():
+        async with broker.subscribe(1) as subscription:
+            async with SessionLocal() as db:
+                await publish_import_event(db, 1, 250)
+                await db.commit()
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait()
+                    for _ in range(subscription.queue.qsize())]
+
+    assert asyncio.run(publish()) == [{'type': 'imported', 'count': 250}]
+
+
+def test_slow_subscriber_is_told_to_resync():
+    async def overflow():
+        local = InProcessBroker(queue_size=3)
+        async with local.subscribe(1) as subscription:
+            local.deliver(1, [task_event(TaskEventType.UPDATED, n, 2)
+                              for n in range(5)])
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait()
+                    for _ in range(subscription.queue.qsize())]
+
+    assert asyncio.run(overflow()) == [RESYNC]
+
+
+def test_stream_receives_task_events(mock_task):
+    with ThreadPoolExecutor(1) as executor:
+        stream = executor.submit(client.get, '/tasks/stream')
+        wait_for_subscriber()
+        created = client.post('/tasks/', json={'title': 'Pushed'}).json()
+        client.patch('/tasks/1/complete')
+        client.delete('/tasks/1')
+        broker.broadcast([CLOSE])
+        response = stream.result(timeout=5)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.text.split('\n\n')[:4] == [
+        'retry: 3000',
+        'event: created\ndata: {"type":"created","id":%d,"version":1}'
+        % created['id'],
+        'event: completed\ndata: {"type":"completed","id":1,"version":2}',
+        'event: deleted\ndata: {"type":"deleted","id":1}',
+    ]
+
+
+def test_stream_only_receives_own_events(mock_task):
+    with ThreadPoolExecutor(1) as executor:
+        stream = executor.submit(client.get, '/tasks/stream')
+        wait_for_subscriber()
+        broker.deliver(2, [task_event(TaskEventType.DELETED, 99)])
+        broker.broadcast([CLOSE])
+        response = stream.result(timeout=5)
+
+    assert 'deleted' not in response.text
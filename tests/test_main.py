@@ -1,4 +1,5 @@
-from app.main import app
+from app import cli
+from app.main import app, load_openapi_schema
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
@@ -10,3 +11,25 @@ def test_main():
     assert response.status_code == 200
     r_json = response.json()
     assert r_json['message'] == 'Welcome to the web-task-manager!'
+
+
+def test_openapi_schema_is_exported_and_loaded(tmp_path, monkeypatch):
+    path = tmp_path / 'openapi.json'
+    cli.main(['openapi', '--output', str(path)])
+
+    expected = app.openapi()
+    monkeypatch.setattr(app, 'openapi_schema', None)
+    assert load_openapi_schema(app, str(path))
+
+    response = client.get('/openapi.json')
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_missing_openapi_schema_is_built(monkeypatch):
+    monkeypatch.setattr(app, 'openapi_schema', None)
+
+    assert not load_openapi_schema(app, None)
+    assert not load_openapi_schema(app, '/nonexistent/openapi.json')
+    assert app.openapi_schema is None
+    assert client.get('/openapi.json').json()['paths']
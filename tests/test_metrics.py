@@ -0,0 +1,47 @@
+from prometheus_client import REGISTRY
+
+from app.main import app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_use_route_template():
+    labels = {'method': 'GET', 'route': '/tasks/{task_id}'}
+    before = sample('http_requests_total', status='404', **labels)
+    db_before = sample('http_request_db_duration_seconds_count', **labels)
+
+    response = client.get('/tasks/42')
+
+    assert response.status_code == 404
+    assert sample('http_requests_total', status='404', **labels) == before + 1
+    assert (
+        sample('http_request_db_duration_seconds_count', **labels)
+        == db_before + 1
+    )
+    assert sample('http_request_db_duration_seconds_sum', **labels) > 0
+    assert sample('http_requests_in_progress') == 0
+
+
+def test_metrics_unmatched_route():
+    labels = {'method': 'GET', 'route': '<unmatched>', 'status': '404'}
+    before = sample('http_requests_total', **labels)
+
+    client.get('/does-not-exist/123')
+
+    assert sample('http_requests_total', **labels) == before + 1
+
+
+def test_metrics_endpoint():
+    client.get('/')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'http_request_duration_seconds_bucket' in response.text
+    assert 'route="/"' in response.text
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import DB_URL, INTERNAL_API_TOKEN
+from app.database import get_engine_options
+from app.main import app
+from app.pool import InstrumentedPool, PoolMetrics
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def make_engine(metrics):
+    engine = create_async_engine(
+        DB_URL,
+        poolclass=InstrumentedPool,
+        metrics=metrics,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1
+    )
+    metrics.attach(engine.sync_engine)
+    return engine
+
+
+@pytest.fixture
+def metered_engine():
+    engine = make_engine(PoolMetrics())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def test_pool_records_checkouts_and_timeouts(metered_engine):
+    metrics = metered_engine.sync_engine.pool.metrics
+
+    async def exhaust_pool():
+        async with metered_engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            with pytest.raises(exc.TimeoutError):
+                async with metered_engine.connect():
+                    pass
+            return metrics.stats(metered_engine.sync_engine.pool)
+
+    busy = asyncio.run(exhaust_pool())
+    assert busy['checked_out'] == 1
+    assert busy['size'] == 1
+    assert busy['checked_in'] == 0
+    assert busy['timeouts'] == 1
+    assert busy['wait_count'] == 1
+
+    idle = metrics.stats(metered_engine.sync_engine.pool)
+    assert idle['checked_out'] == 0
+    assert idle['checked_in'] == 1
+
+
+def test_engines_count_separately():
+    first, second = PoolMetrics(), PoolMetrics()
+    engines = [make_engine(first), make_engine(second)]
+
+    async def connect(engine):
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    asyncio.run(connect(engines[0]))
+    # Disposing recreates the pool, which keeps counting in the same metrics
+    asyncio.run(engines[0].dispose())
+    asyncio.run(connect(engines[0]))
+    asyncio.run(engines[1].dispose())
+
+    assert (first.checkouts, first.waits) == (2, 2)
+    assert (second.checkouts, second.waits) == (0, 0)
+    assert engines[0].sync_engine.pool.metrics is first
+    asyncio.run(engines[0].dispose())
+
+
+def test_engine_options():
+    assert get_engine_options('sqlite+aiosqlite:///tasks.db') == {}
+
+    metrics = PoolMetrics()
+    options = get_engine_options('postgresql+asyncpg://u:p@db/tasks',
+                                 metrics)
+    assert options['poolclass'] is InstrumentedPool
+    assert options['pool_size'] == 5
+    assert options['metrics'] is metrics
+
+
+def test_pool_stats_endpoint():
+    response = client.get('/internal/pool',
+                          headers={'X-Internal-Token': INTERNAL_API_TOKEN})
+
+    assert response.status_code == 200
+    assert {'checked_out', 'timeouts', 'wait_avg_ms'} <= response.json().keys()
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({}, 403),
+    ({'X-Internal-Token': 'wrong'}, 403),
+])
+def test_internal_endpoints_require_token(headers, expected):
+    for url in ('/internal/pool', '/internal/replicas',
+                '/internal/user-cache'):
+        assert client.get(url, headers=headers).status_code == expected
+
+
+def test_internal_endpoints_disabled_without_token(mocker):
+    mocker.patch('app.routes.internal.INTERNAL_API_TOKEN', None)
+
+    response = client.get('/internal/pool',
+                          headers={'X-Internal-Token': INTERNAL_API_TOKEN})
+
+    assert response.status_code == 404
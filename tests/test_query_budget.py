@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.config import INTERNAL_API_TOKEN
+from app.main import app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+USER = {
+    'first_name': 'New',
+    'last_name': 'User',
+    'username': 'newuser',
+    'password': 'password123'
+}
+INTERNAL = {'headers': {'X-Internal-Token': INTERNAL_API_TOKEN}}
+
+# (method, route template, url, request kwargs, expected statements)
+ROUTE_BUDGETS = [
+    ('GET', '/', '/', {}, 0),
+    ('GET', '/tasks/', '/tasks/', {}, 1),
+    ('GET', '/tasks/user/{user_id}', '/tasks/user/1', {}, 1),
+    ('GET', '/tasks/stats', '/tasks/stats', {}, 1),
+    ('GET', '/tasks/changes', '/tasks/changes', {}, 1),
+    ('GET', '/tasks/search', '/tasks/search', {'params': {'q': 'test'}}, 1),
+    ('GET', '/tasks/export', '/tasks/export', {}, 1),
+    ('GET', '/tasks/stream', '/tasks/stream', {}, 0),
+    ('POST', '/tasks/import', '/tasks/import',
+     {'content': b'{"title": "Imported"}\n'}, 1),
+    # SQLite cannot return a sorted multi-row INSERT, so SQLAlchemy sends
+    # one statement per item there; PostgreSQL sends one per batch.
+    ('POST', '/tasks/bulk', '/tasks/bulk',
+     {'json': {'items': [{'title': 'A'}, {'title': 'B'}]}}, 2),
+    ('PATCH', '/tasks/bulk', '/tasks/bulk',
+     {'json': {'items': [{'id': 1, 'status': 'Completed'}]}}, 1),
+    ('DELETE', '/tasks/bulk', '/tasks/bulk', {'json': {'ids': [1, 2]}}, 1),
+    ('GET', '/tasks/{task_id}', '/tasks/1', {}, 1),
+    ('POST', '/tasks/', '/tasks/', {'json': {'title': 'New Task'}}, 1),
+    ('PUT', '/tasks/{task_id}', '/tasks/1', {'json': {'title': 'New'}}, 1),
+    ('DELETE', '/tasks/{task_id}', '/tasks/1', {}, 1),
+    ('PATCH', '/tasks/{task_id}/complete', '/tasks/1/complete', {}, 1),
+    ('POST', '/auth/register', '/auth/register', {'json': USER}, 1),
+    ('POST', '/auth/login', '/auth/login',
+     {'data': {'username': 'user', 'password': 'password'}}, 1),
+    ('GET', '/internal/user-cache', '/internal/user-cache', INTERNAL, 0),
+    ('GET', '/internal/pool', '/internal/pool', INTERNAL, 0),
+    ('GET', '/internal/replicas', '/internal/replicas', INTERNAL, 0),
+    ('GET', '/metrics', '/metrics', {}, 0),
+]
+
+
+@pytest.mark.parametrize(
+    'method, url, kwargs, expected',
+    [budget[:1] + budget[2:] for budget in ROUTE_BUDGETS],
+    ids=[f'{budget[0]} {budget[1]}' for budget in ROUTE_BUDGETS]
+)
+def test_route_query_budget(mock_task, assert_num_queries,
+                            close_event_streams,
+                            method, url, kwargs, expected):
+    with assert_num_queries(expected):
+        response = client.request(method, url, **kwargs)
+
+    assert response.status_code < 400
+
+
+def test_every_route_has_a_budget():
+    covered = {(method, path) for method, path, *_ in ROUTE_BUDGETS}
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.endpoint.__module__.startswith('app.')
+        for method in route.methods
+    }
+
+    assert routes - covered == set()
+
+
+def test_debug_query_headers(mock_task, mocker):
+    mocker.patch('app.instrumentation.DEBUG', True)
+
+    response = client.get('/tasks/1')
+
+    assert response.headers['X-DB-Query-Count'] == '1'
+    assert float(response.headers['X-DB-Time-Ms']) > 0
+
+
+def test_query_budget_exceeded_is_logged(mock_task, mocker, caplog):
+    mocker.patch('app.instrumentation.QUERY_BUDGET', 0)
+
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        client.get('/tasks/1')
+
+    assert 'GET /tasks/1 executed 1 queries (budget 0)' in caplog.text
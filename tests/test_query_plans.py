@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.enums import TaskStatus
+from app.models import Task
+from app.pagination import encode_cursor
+from app.schemas.tasks import TaskUpdate
+import app.services.auth as auth_service
+import app.services.tasks as task_service
+
+SERVICE_QUERIES = {
+    'get_task_by_id': lambda db: task_service.get_task_by_id(db, 1, 1),
+    'get_task_version': lambda db: task_service.get_task_version(db, 1, 1),
+    'get_tasks_status': lambda db: task_service.get_tasks(
+        db, status=TaskStatus.NEW
+    ),
+    'get_tasks_after': lambda db: task_service.get_tasks(
+        db, after=encode_cursor({'id': 1})
+    ),
+    'get_user_tasks': lambda db: task_service.get_user_tasks(db, 1),
+    'get_task_changes': lambda db: task_service.get_task_changes(db, 1, 5),
+    'update_task': lambda db: task_service.update_task(
+        db, 1, TaskUpdate(title='Updated'), 1
+    ),
+    'mark_task_as_completed': lambda db: (
+        task_service.mark_task_as_completed(db, 1, 1)
+    ),
+    'delete_task': lambda db: task_service.delete_task(db, 1, 1),
+    'get_user_by_id': lambda db: auth_service.get_user_by_id(db, 1),
+    'get_user_by_username': lambda db: auth_service.get_user_by_username(
+        db, 'user'
+    ),
+}
+
+
+@pytest.fixture
+def tasks(db_session):
+    db_session.add_all(
+        Task(title=f'Task {i}', user_id=1, status=TaskStatus.NEW)
+        for i in range(20)
+    )
+    db_session.commit()
+
+
+async def run_service_query(name):
+    async with SessionLocal() as db:
+        await SERVICE_QUERIES[name](db)
+
+
+@pytest.mark.parametrize('name', SERVICE_QUERIES)
+def test_service_query_uses_index(tasks, db_session, name):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        asyncio.run(run_service_query(name))
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+
+    assert statements
+    conn = db_session.connection()
+    for statement, parameters in statements:
+        plan = conn.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {statement}', parameters
+        ).all()
+        details = [row[-1] for row in plan]
+        # Scans of subqueries (anon_N) only read rows already searched
+        assert not any(
+            detail.startswith('SCAN ') and ' USING ' not in detail
+            and not detail.startswith('SCAN anon_')
+            for detail in details
+        ), f'{name} falls back to a full scan: {details}'
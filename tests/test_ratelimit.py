@@ -0,0 +1,92 @@
+import multiprocessing
+
+import pytest
+
+from app.main import app
+from app.ratelimit import SharedTokenBuckets, parse_limit
+from app.services.auth import create_access_token
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def drain(path, results):
+    table = SharedTokenBuckets(path, slots=64)
+    results.put(sum(
+        table.take('key', rate=0.001, capacity=10) == 0 for _ in range(10)
+    ))
+
+
+def test_parse_limit():
+    assert parse_limit('60/minute') == (1.0, 60.0)
+    assert parse_limit('5 / second') == (5.0, 5.0)
+    assert parse_limit('0/minute') == (0.0, 0.0)
+    with pytest.raises(ValueError):
+        parse_limit('often')
+
+
+def test_bucket_is_shared_between_tables(tmp_path):
+    path = str(tmp_path / 'buckets')
+    first = SharedTokenBuckets(path, slots=64)
+    second = SharedTokenBuckets(path, slots=64)
+
+    assert first.take('key', rate=0.5, capacity=2) == 0
+    assert second.take('key', rate=0.5, capacity=2) == 0
+    assert first.take('key', rate=0.5, capacity=2) == pytest.approx(2, 0.1)
+    assert second.take('other', rate=0.5, capacity=2) == 0
+
+
+def test_bucket_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'buckets')
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [
+        context.Process(target=drain, args=(path, results))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(results.get() for _ in workers) == 10
+
+
+def test_rate_limited_route(mock_task, mocker, assert_num_queries):
+    mocker.patch.dict('app.ratelimit.route_limits',
+                      {'GET /tasks/{task_id}': (0.01, 1.0)})
+
+    assert client.get('/tasks/1').status_code == 200
+    with assert_num_queries(0):
+        response = client.get('/tasks/1')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '100'
+
+
+def test_zero_limit_blocks_route(mock_task, mocker, assert_num_queries):
+    mocker.patch.dict('app.ratelimit.route_limits',
+                      {'GET /tasks/{task_id}': parse_limit('0/minute')})
+
+    with assert_num_queries(0):
+        response = client.get('/tasks/1')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3600'
+    assert client.get('/tasks/').status_code == 200
+
+
+def test_rate_limit_is_per_user(mock_task, mocker):
+    mocker.patch.dict('app.ratelimit.route_limits',
+                      {'GET /tasks/{task_id}': (0.01, 1.0)})
+    first = create_access_token({'sub': 'first'})
+    second = create_access_token({'sub': 'second'})
+
+    for token in (first, second):
+        response = client.get('/tasks/1',
+                              headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+
+    response = client.get('/tasks/1',
+                          headers={'Authorization': f'Bearer {first}'})
+    assert response.status_code == 429
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from app.config import INTERNAL_API_TOKEN
+from app.enums import TaskStatus
+from app.main import app
+from app.models import Base, Task, User
+from app.pool import PoolMetrics
+from app.replicas import RecentWrites, ReplicaSet
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def make_replica(path, title):
+    """
+    Create a SQLite database standing in for a replica, with one task.
+    """
+    sync_engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        db.add(User(id=1, first_name='User', username='user',
+                    password='x'))
+        db.add(Task(id=1, title=title, status=TaskStatus.NEW, user_id=1))
+        db.commit()
+    sync_engine.dispose()
+    return create_async_engine(f'sqlite+aiosqlite:///{path}')
+
+
+@pytest.fixture
+def replicas(tmp_path, mocker):
+    engines = [
+        make_replica(tmp_path / f'replica{n}.db', f'Replica {n}')
+        for n in range(2)
+    ]
+    pool_metrics = {engine: PoolMetrics() for engine in engines}
+    for engine, metrics in pool_metrics.items():
+        metrics.attach(engine.sync_engine)
+    replica_set = ReplicaSet(engines, retry_seconds=60, probe_timeout=1,
+                             pool_metrics=pool_metrics)
+    mocker.patch('app.database.replicas', replica_set)
+    mocker.patch('app.routes.internal.replicas', replica_set)
+    yield replica_set
+    for engine in engines:
+        asyncio.run(engine.dispose())
+
+
+def test_reads_go_to_replicas_round_robin(mock_task, replicas):
+    titles = [client.get('/tasks/1').json()['title'] for _ in range(4)]
+
+    assert titles == ['Replica 0', 'Replica 1', 'Replica 0', 'Replica 1']
+
+
+def test_read_your_writes(mock_task, replicas, mocker):
+    client.put('/tasks/1', json={'title': 'Written'})
+
+    assert client.get('/tasks/1').json()['title'] == 'Written'
+    assert client.get('/tasks/').json()[0]['title'] == 'Written'
+
+    mocker.patch('app.database.READ_YOUR_WRITES_SECONDS', 0)
+    assert client.get('/tasks/1').json()['title'].startswith('Replica')
+
+
+def test_unhealthy_replica_falls_back_to_primary(mock_task, tmp_path,
+                                                 mocker):
+    broken = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path}/missing/replica.db'
+    )
+    replica_set = ReplicaSet([broken], retry_seconds=60, probe_timeout=1)
+    mocker.patch('app.database.replicas', replica_set)
+
+    with pytest.raises(OperationalError):
+        client.get('/tasks/1')
+    # Taken out of rotation by the failure
+    assert client.get('/tasks/1').json()['title'] == 'Test Task'
+
+    replica_set.retry_seconds = 0
+    replica_set.mark_down(broken)
+    # Due for a retry, but the probe fails too
+    assert client.get('/tasks/1').json()['title'] == 'Test Task'
+
+
+def test_replica_health_endpoint(mock_task, replicas):
+    client.get('/tasks/1')
+    replicas.mark_down(replicas.engines[1])
+
+    response = client.get('/internal/replicas',
+                          headers={'X-Internal-Token': INTERNAL_API_TOKEN})
+
+    assert [replica['healthy'] for replica in response.json()] == [
+        True, False
+    ]
+    # Every replica reports its own pool usage
+    assert [replica['pool']['checkouts'] for replica in response.json()] == [
+        1, 0
+    ]
+
+
+def test_recent_writes_are_shared(tmp_path):
+    path = str(tmp_path / 'writes')
+    first = RecentWrites(path, slots=64)
+    second = RecentWrites(path, slots=64)
+
+    first.record('user:alice')
+
+    assert second.is_recent('user:alice', window=5)
+    assert not second.is_recent('user:bob', window=5)
+    assert not second.is_recent('user:alice', window=0)
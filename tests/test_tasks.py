@@ -1,16 +1,21 @@
+import asyncio
+import csv
+import io
+import json
+
 import pytest
+from sqlalchemy import delete, func, select, text
+from app import cli
 from app.main import app
 from fastapi.testclient import TestClient
-from app.models import Task
+from app.enums import TaskStatus, TransferFormat
+from app.etags import if_match_versions
+from app.models import Task, TaskCounter, TaskTombstone, User
+from app.pagination import encode_cursor
+import app.services.importer as import_service
 
 client = TestClient(app)
 
-mock_task = Task(id=1,
-                 title="Test Task",
-                 description="Task Description",
-                 status="New",
-                 user_id=1)
-
 
 @pytest.fixture
 def token():
@@ -41,11 +46,7 @@ def test_create_task(token):
     assert r_json["status"] == data["status"]
 
 
-def test_read_task(mock_db_session):
-
-    query = mock_db_session.query.return_value
-    query.filter.return_value.first.return_value = mock_task
-
+def test_read_task(mock_task):
     response = client.get(
         f'/tasks/{mock_task.id}'
     )
@@ -54,16 +55,13 @@ def test_read_task(mock_db_session):
     assert r_json['title'] == mock_task.title
 
 
-def test_update_task(mock_db_session):
+def test_update_task(mock_task):
     updated_data = {
         'title': 'Updated Task',
         'description': 'Updated Description',
         'status': 'In Progress'
     }
 
-    query = mock_db_session.query.return_value
-    query.filter.return_value.first.return_value = mock_task
-
     response = client.put(f'/tasks/{mock_task.id}', json=updated_data)
 
     assert response.status_code == 200
@@ -73,41 +71,661 @@ def test_update_task(mock_db_session):
     assert r_json['status'] == updated_data['status']
 
 
-def test_update_task_failure(mock_db_session):
+def test_update_task_failure():
     updated_data = {
         'title': 'Updated Task',
         'description': 'Updated Description',
         'status': 'In Progress'
     }
 
-    query = mock_db_session.query.return_value
-    query.filter.return_value.first.return_value = None
-
-    response = client.put(f'/tasks/{mock_task.id}', json=updated_data)
+    response = client.put('/tasks/1', json=updated_data)
 
     assert response.status_code == 404
     r_json = response.json()
     assert r_json['detail'] == 'Task not found'
 
 
-def test_delete_task(mock_db_session):
-    query = mock_db_session.query.return_value
-    query.filter.return_value.first.return_value = mock_task
-
-    mock_db_session.commit = lambda: None
-
+def test_delete_task(mock_task):
     response = client.delete(f'/tasks/{mock_task.id}')
 
     assert response.status_code == 200
     assert response.json() == {'detail': 'Task successfully deleted'}
+    assert client.get(f'/tasks/{mock_task.id}').status_code == 404
 
 
-def test_delete_task_failure(mock_db_session):
-    query = mock_db_session.query.return_value
-    query.filter.return_value.first.return_value = None
-
-    response = client.delete(f'/tasks/{mock_task.id}')
+def test_delete_task_failure():
+    response = client.delete('/tasks/1')
 
     assert response.status_code == 404
     r_json = response.json()
     assert r_json['detail'] == 'Task not found'
+
+
+def test_complete_task(mock_task):
+    response = client.patch(f'/tasks/{mock_task.id}/complete')
+
+    assert response.status_code == 200
+    assert response.json()['status'] == 'Completed'
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('put', '/tasks/1', {'title': 'Updated Task'}),
+    ('patch', '/tasks/1/complete', None),
+    ('delete', '/tasks/1', None),
+    ('post', '/tasks/', {'title': 'New Task'}),
+])
+def test_write_is_single_statement(mock_task, assert_num_queries,
+                                   method, url, body):
+    with assert_num_queries(1):
+        response = client.request(method, url, json=body)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('put', '/tasks/1', {'title': 'Updated Task'}),
+    ('patch', '/tasks/1/complete', None),
+])
+def test_write_if_match(mock_task, assert_num_queries, method, url, body):
+    with assert_num_queries(1):
+        response = client.request(method, url, json=body,
+                                  headers={'If-Match': '"1-1"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"1-2"'
+
+    with assert_num_queries(2):
+        stale = client.request(method, url, json=body,
+                               headers={'If-Match': '"1-1"'})
+    assert stale.status_code == 412
+    assert stale.headers['ETag'] == '"1-2"'
+
+    response = client.request(method, url, json=body,
+                              headers={'If-Match': 'W/"1-2", "1-2"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"1-3"'
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('*', None),
+    ('"1-2"', [2]),
+    ('"1-2", W/"1-3", "2-4", "1-5"', [2, 5]),
+    ('"1-2-gzip", "1-3-br", "1-4-deflate"', [2, 3]),
+    ('"1-\xb2"', []),
+    ('"1-\uff11"', []),
+    ('"1-99999999999999999999"', []),
+    ('"1-2147483648"', []),
+    ('"1-"', []),
+])
+def test_if_match_versions(header, expected):
+    assert if_match_versions(header, 1) == expected
+
+
+def test_write_if_match_non_ascii_version(mock_task):
+    response = client.put('/tasks/1', json={'title': 'Updated Task'},
+                          headers={'If-Match': b'"1-\xb2"'})
+
+    assert response.status_code == 412
+
+
+def test_update_if_match_lost_update_is_rejected(mock_task, db_session):
+    etag = client.get('/tasks/1').headers['ETag']
+
+    first = client.put('/tasks/1', json={'title': 'First'},
+                       headers={'If-Match': etag})
+    second = client.put('/tasks/1', json={'title': 'Second'},
+                        headers={'If-Match': etag})
+
+    assert first.status_code == 200
+    assert second.status_code == 412
+    db_session.expire_all()
+    assert db_session.get(Task, 1).title == 'First'
+
+
+@pytest.mark.parametrize('if_match, expected', [
+    ('*', 200),
+    ('"2-1"', 412),
+    ('W/"1-1"', 412),
+])
+def test_update_if_match_forms(mock_task, if_match, expected):
+    response = client.put('/tasks/1', json={'title': 'Updated'},
+                          headers={'If-Match': if_match})
+
+    assert response.status_code == expected
+
+
+def test_update_if_match_not_found():
+    response = client.put('/tasks/1', json={'title': 'Updated'},
+                          headers={'If-Match': '"1-1"'})
+
+    assert response.status_code == 404
+
+
+def test_create_task_etag():
+    response = client.post('/tasks/', json={'title': 'New Task'})
+
+    assert response.headers['ETag'] == f'"{response.json()["id"]}-1"'
+
+
+def test_update_foreign_task_not_found(db_session):
+    db_session.add(Task(id=2, title='Foreign Task', user_id=2))
+    db_session.commit()
+
+    response = client.put('/tasks/2', json={'title': 'Hijacked'})
+
+    assert response.status_code == 404
+    db_session.expire_all()
+    assert db_session.get(Task, 2).title == 'Foreign Task'
+
+
+def test_get_tasks_next_cursor(mock_task):
+    response = client.get('/tasks/?limit=1')
+
+    assert response.status_code == 200
+    assert response.json()[0]['id'] == mock_task.id
+    cursor = response.headers['X-Next-Cursor']
+
+    response = client.get(f'/tasks/?limit=1&after={cursor}')
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert 'X-Next-Cursor' not in response.headers
+
+
+@pytest.fixture
+def listed_tasks(db_session):
+    db_session.add_all([
+        Task(title='First', status=TaskStatus.NEW, user_id=1),
+        Task(title='Second', status=TaskStatus.NEW, user_id=1),
+        Task(title='Third', status=TaskStatus.COMPLETED, user_id=1),
+    ])
+    db_session.commit()
+
+
+def test_get_tasks_total_count(listed_tasks):
+    assert 'X-Total-Count' not in client.get('/tasks/').headers
+
+    response = client.get('/tasks/?limit=1&count=exact')
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Mode'] == 'exact'
+
+    response = client.get('/tasks/?status=Completed&count=exact')
+    assert response.headers['X-Total-Count'] == '1'
+
+
+def test_get_tasks_cached_total_count(listed_tasks, db_session,
+                                      assert_num_queries):
+    response = client.get('/tasks/?count=cached')
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Mode'] == 'exact'
+
+    db_session.add(Task(title='Fourth', user_id=1))
+    db_session.commit()
+
+    with assert_num_queries(1):
+        response = client.get('/tasks/?count=cached')
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Mode'] == 'cached'
+
+    response = client.get('/tasks/?count=cached&status=New')
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Mode'] == 'exact'
+
+
+def test_get_tasks_estimated_total_count_falls_back(listed_tasks):
+    response = client.get('/tasks/?count=estimated')
+
+    assert response.headers['X-Total-Count'] == '3'
+    assert response.headers['X-Total-Count-Mode'] == 'exact'
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    encode_cursor({'id': True}),
+    encode_cursor({'id': 0}),
+    encode_cursor({'id': 10**30}),
+    encode_cursor({'id': 1.5}),
+])
+def test_get_tasks_invalid_cursor(cursor):
+    response = client.get('/tasks/', params={'after': cursor})
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid cursor'
+
+
+def test_bulk_create_tasks():
+    items = [{'title': f'Task {i}'} for i in range(3)]
+
+    response = client.post('/tasks/bulk', json={'items': items})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [r['result'] for r in results] == ['created'] * 3
+    assert [r['task']['title'] for r in results] == ['Task 0', 'Task 1',
+                                                     'Task 2']
+    assert all(r['task']['user_id'] == 1 for r in results)
+
+
+def test_bulk_create_tasks_empty():
+    response = client.post('/tasks/bulk', json={'items': []})
+
+    assert response.status_code == 422
+
+
+def test_bulk_update_task_status(mock_task, db_session):
+    db_session.add(Task(id=2, title='Foreign Task', user_id=2))
+    db_session.commit()
+    items = [
+        {'id': mock_task.id, 'status': 'Completed'},
+        {'id': 2, 'status': 'Completed'},
+        {'id': 3, 'status': 'In Progress'},
+    ]
+
+    response = client.patch('/tasks/bulk', json={'items': items})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [r['result'] for r in results] == ['updated', 'not_found',
+                                              'not_found']
+    assert results[0]['task']['status'] == 'Completed'
+    db_session.expire_all()
+    assert db_session.get(Task, 2).status == TaskStatus.NEW
+
+
+def test_bulk_update_task_status_duplicate_ids():
+    items = [{'id': 1, 'status': 'Completed'}, {'id': 1, 'status': 'New'}]
+
+    response = client.patch('/tasks/bulk', json={'items': items})
+
+    assert response.status_code == 422
+
+
+def test_bulk_delete_tasks(mock_task, db_session):
+    db_session.add(Task(id=2, title='Foreign Task', user_id=2))
+    db_session.commit()
+
+    response = client.request('DELETE', '/tasks/bulk',
+                              json={'ids': [mock_task.id, 2]})
+
+    assert response.status_code == 200
+    assert [r['result'] for r in response.json()] == ['deleted', 'not_found']
+    assert client.get(f'/tasks/{mock_task.id}').status_code == 404
+    db_session.expire_all()
+    assert db_session.get(Task, 2) is not None
+
+
+def test_search_tasks(db_session):
+    db_session.add_all([
+        Task(id=1, title='Buy milk', user_id=1),
+        Task(id=2, title='Groceries', description='milk, bread and more milk',
+             user_id=1),
+        Task(id=3, title='Walk the dog', user_id=1),
+        Task(id=4, title='Buy milk', user_id=2),
+    ])
+    db_session.commit()
+
+    response = client.get('/tasks/search?q=milk')
+
+    assert response.status_code == 200
+    assert sorted(task['id'] for task in response.json()) == [1, 2]
+
+    response = client.get('/tasks/search?q=buy milk')
+    assert [task['id'] for task in response.json()] == [1]
+
+
+def test_search_tasks_keyset_pages(db_session):
+    db_session.add_all(
+        Task(title=f'Report {i}', description='report ' * (i % 3),
+             user_id=1)
+        for i in range(7)
+    )
+    db_session.commit()
+
+    seen, url = [], '/tasks/search?q=report&limit=3'
+    while url:
+        response = client.get(url)
+        seen += [task['id'] for task in response.json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = cursor and f'/tasks/search?q=report&limit=3&after={cursor}'
+
+    assert sorted(seen) == list(range(1, 8))
+
+
+@pytest.mark.parametrize('cursor', [
+    {'rank': 1.5, 'id': True},
+    {'rank': 1.5, 'id': 10**30},
+    {'rank': 1, 'id': 1},
+    {'rank': float('nan'), 'id': 1},
+    {'rank': float('inf'), 'id': 1},
+    {'rank': 'high', 'id': 1},
+])
+def test_search_tasks_invalid_cursor(cursor):
+    response = client.get('/tasks/search', params={
+        'q': 'report', 'after': encode_cursor(cursor)
+    })
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid cursor'
+
+
+def test_search_tasks_follows_updates(mock_task):
+    client.put(f'/tasks/{mock_task.id}', json={'title': 'Renamed'})
+
+    assert client.get('/tasks/search?q=test').json() == []
+    assert len(client.get('/tasks/search?q=renamed').json()) == 1
+
+
+def test_search_tasks_empty_query():
+    response = client.get('/tasks/search?q=%20')
+
+    assert response.status_code == 400
+
+
+def test_export_tasks_ndjson(mock_task, db_session):
+    db_session.add(Task(id=2, title='Foreign Task', user_id=2))
+    db_session.commit()
+
+    response = client.get('/tasks/export')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{
+        'id': mock_task.id,
+        'title': mock_task.title,
+        'description': mock_task.description,
+        'status': 'New',
+        'user_id': 1
+    }]
+
+
+def test_export_tasks_csv(mock_task):
+    response = client.get('/tasks/export?format=csv')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows == [
+        ['id', 'title', 'description', 'status', 'user_id'],
+        ['1', 'Test Task', 'Task Description', 'New', '1'],
+    ]
+
+
+def test_import_tasks_ndjson(db_session):
+    body = '\n'.join([
+        json.dumps({'title': 'Imported 1'}),
+        json.dumps({'title': 'Imported 2', 'status': 'Completed'}),
+        json.dumps({'description': 'missing title'}),
+        'not json',
+        '',
+    ])
+
+    response = client.post('/tasks/import', content=body)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['inserted'] == 2
+    assert report['rejected'] == 2
+    assert [e['line'] for e in report['errors']] == [3, 4]
+    assert 'title' in report['errors'][0]['error']
+    tasks = db_session.query(Task).order_by(Task.id).all()
+    assert [t.title for t in tasks] == ['Imported 1', 'Imported 2']
+    assert tasks[1].status == TaskStatus.COMPLETED
+    assert all(t.user_id == 1 for t in tasks)
+
+
+def test_import_tasks_csv(db_session):
+    body = (
+        'title,description,status\r\n'
+        'Imported,"Multi\nline",In Progress\r\n'
+        'Bad status,,Unknown\r\n'
+    )
+
+    response = client.post('/tasks/import?format=csv', content=body)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['inserted'] == 1
+    assert report['rejected'] == 1
+    assert report['errors'][0]['line'] == 4
+    task = db_session.query(Task).one()
+    assert task.description == 'Multi\nline'
+    assert task.status == TaskStatus.IN_PROGRESS
+
+
+def test_import_tasks_cli(tmp_path, db_session, capsys):
+    path = tmp_path / 'tasks.ndjson'
+    path.write_text(json.dumps({'title': 'From CLI'}) + '\n')
+
+    cli.main(['import-tasks', '--user-id', '1', str(path)])
+
+    assert json.loads(capsys.readouterr().out)['inserted'] == 1
+    assert db_session.query(Task).one().title == 'From CLI'
+
+
+def test_task_stats_follow_writes():
+    ids = [
+        result['id'] for result in client.post('/tasks/bulk', json={
+            'items': [{'title': f'Task {i}'} for i in range(4)]
+        }).json()
+    ]
+    client.post('/tasks/import', content=b'{"title": "Imported"}\n')
+    client.patch(f'/tasks/{ids[0]}/complete')
+    client.put(f'/tasks/{ids[1]}', json={'status': 'In Progress'})
+    client.put(f'/tasks/{ids[1]}', json={'title': 'Renamed'})
+    client.patch('/tasks/bulk',
+                 json={'items': [{'id': ids[2], 'status': 'Completed'}]})
+    client.delete(f'/tasks/{ids[3]}')
+
+    response = client.get('/tasks/stats')
+
+    assert response.status_code == 200
+    assert response.json() == {
+        'new': 1, 'in_progress': 1, 'completed': 2, 'total': 4
+    }
+
+
+def test_task_stats_follow_user_delete(mock_task, db_session):
+    db_session.delete(db_session.get(User, 1))
+    db_session.commit()
+
+    counter = db_session.get(TaskCounter, (1, TaskStatus.NEW))
+    assert counter is None or counter.count == 0
+
+
+def test_reconcile_stats_cli(mock_task, db_session, capsys):
+    db_session.get(TaskCounter, (1, TaskStatus.NEW)).count = 7
+    db_session.add(TaskCounter(user_id=1, status=TaskStatus.COMPLETED,
+                               count=2))
+    db_session.commit()
+
+    cli.main(['reconcile-stats', '--dry-run'])
+    drift = json.loads(capsys.readouterr().out)
+    assert drift == [
+        {'user_id': 1, 'status': 'Completed', 'counted': 2, 'actual': 0},
+        {'user_id': 1, 'status': 'New', 'counted': 7, 'actual': 1},
+    ]
+
+    cli.main(['reconcile-stats'])
+    assert len(json.loads(capsys.readouterr().out)) == 2
+    assert client.get('/tasks/stats').json()['total'] == 1
+
+    cli.main(['reconcile-stats'])
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_task_changes_since_watermark(mock_task):
+    first = client.get('/tasks/changes')
+    assert first.status_code == 200
+    assert first.json()['tasks'] == [{
+        'id': 1, 'title': 'Test Task', 'description': 'Task Description',
+        'status': 'New', 'user_id': 1
+    }]
+    assert first.json()['deleted'] == []
+    assert first.json()['has_more'] is False
+    watermark = first.json()['watermark']
+
+    unchanged = client.get('/tasks/changes', params={'since': watermark})
+    assert unchanged.json() == {
+        'tasks': [], 'deleted': [], 'watermark': watermark,
+        'has_more': False
+    }
+
+    created = client.post('/tasks/', json={'title': 'New'}).json()
+    client.put(f'/tasks/{created["id"]}', json={'title': 'Renamed'})
+    client.delete('/tasks/1')
+
+    changes = client.get('/tasks/changes',
+                         params={'since': watermark}).json()
+    assert [task['title'] for task in changes['tasks']] == ['Renamed']
+    assert changes['deleted'] == [1]
+    assert changes['watermark'] > watermark
+
+    assert client.get('/tasks/changes', params={
+        'since': changes['watermark']
+    }).json()['tasks'] == []
+
+
+def test_task_changes_pages(db_session):
+    client.post('/tasks/bulk', json={
+        'items': [{'title': f'Task {i}'} for i in range(5)]
+    })
+
+    titles, since, has_more = [], 0, True
+    while has_more:
+        page = client.get('/tasks/changes',
+                          params={'since': since, 'limit': 2}).json()
+        titles += [task['title'] for task in page['tasks']]
+        since, has_more = page['watermark'], page['has_more']
+
+    assert titles == [f'Task {i}' for i in range(5)]
+
+
+def test_deleting_user_drops_tombstones(db_session):
+    db_session.add(User(id=2, first_name='Other', username='other',
+                        password='x'))
+    db_session.add_all([Task(id=n, title=f'Task {n}', user_id=2)
+                        for n in range(1, 4)])
+    db_session.commit()
+    db_session.delete(db_session.get(Task, 1))
+    db_session.commit()
+    assert db_session.scalar(select(func.count(TaskTombstone.task_id))) == 1
+
+    db_session.execute(text('PRAGMA foreign_keys = ON'))
+    db_session.execute(delete(User).where(User.id == 2))
+    db_session.commit()
+
+    assert db_session.scalar(select(func.count(Task.id))) == 0
+    assert db_session.scalar(select(func.count(TaskTombstone.task_id))) == 0
+
+
+def test_task_changes_invalid_params():
+    assert client.get('/tasks/changes',
+                      params={'since': -1}).status_code == 400
+    assert client.get('/tasks/changes',
+                      params={'since': 2**63}).status_code == 400
+    assert client.get('/tasks/changes',
+                      params={'limit': 0}).status_code == 400
+
+
+def test_read_task_etag(mock_task):
+    response = client.get(f'/tasks/{mock_task.id}')
+    etag = response.headers['ETag']
+
+    response = client.get(f'/tasks/{mock_task.id}',
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['ETag'] == etag
+
+    client.patch(f'/tasks/{mock_task.id}/complete')
+
+    response = client.get(f'/tasks/{mock_task.id}',
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json()['status'] == 'Completed'
+
+
+def test_read_task_etag_not_found():
+    response = client.get('/tasks/1', headers={'If-None-Match': '"1-1"'})
+
+    assert response.status_code == 404
+
+
+def test_list_tasks_etag(mock_task):
+    for url in ('/tasks/', f'/tasks/user/{mock_task.user_id}'):
+        etag = client.get(url).headers['ETag']
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        response = client.get(url, headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert response.headers['ETag'] == etag
+
+
+def test_list_tasks_response_shape(mock_task):
+    response = client.get(f'/tasks/user/{mock_task.user_id}')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json() == [{
+        'id': mock_task.id,
+        'title': mock_task.title,
+        'description': mock_task.description,
+        'status': 'New',
+        'user_id': mock_task.user_id
+    }]
+
+
+def test_import_tasks_csv_stray_quote(db_session):
+    body = 'title,description\n5" nail,box\nSecond,b\nThird,c\n'
+
+    response = client.post('/tasks/import?format=csv', content=body)
+
+    assert response.json()['inserted'] == 3
+    titles = [t.title for t in db_session.query(Task).order_by(Task.id)]
+    assert titles == ['5" nail', 'Second', 'Third']
+
+
+def read_records(fmt: TransferFormat, body: str, max_length: int) -> list:
+    async def chunks():
+        data = body.encode()
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+
+    async def read():
+        return [record async for record in import_service.iter_records(
+            chunks(), fmt, max_length
+        )]
+
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize('fmt, body, expected', [
+    (TransferFormat.NDJSON,
+     '{"title": "a"}\n{"title": "' + 'x' * 100 + '"}\n{"title": "b"}\n',
+     [(1, '{"title": "a"}\n'), (2, None), (3, '{"title": "b"}\n')]),
+    (TransferFormat.NDJSON, '{"title": "a"}\n{"title": "' + 'x' * 100,
+     [(1, '{"title": "a"}\n'), (2, None)]),
+    (TransferFormat.CSV, 'title\n"a\nb",c\nd\n',
+     [(1, ['title']), (2, ['a\nb', 'c']), (4, ['d'])]),
+])
+def test_import_reads_records_in_chunks(fmt, body, expected):
+    records = [
+        (line, None if isinstance(record, import_service.RecordTooLong)
+         else record)
+        for line, record in read_records(fmt, body, max_length=40)
+    ]
+
+    assert records == expected
+
+
+def test_import_rejects_unterminated_csv_quote():
+    records = read_records(TransferFormat.CSV,
+                           'title\na\n"' + 'x\n' * 50, max_length=40)
+
+    assert records[:2] == [(1, ['title']), (2, ['a'])]
+    assert isinstance(records[2][1], import_service.RecordTooLong)
+    assert records[2][0] == 3